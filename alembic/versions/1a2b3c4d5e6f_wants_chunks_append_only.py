@@ -0,0 +1,92 @@
+"""wants_raw_chunks as append-only stream log
+
+Revision ID: 1a2b3c4d5e6f
+Revises: ef12ab34cd56
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "1a2b3c4d5e6f"
+down_revision = "ef12ab34cd56"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "wants_raw_chunks",
+        sa.Column("seq", sa.BigInteger(), sa.Identity(), nullable=False),
+    )
+    op.add_column(
+        "wants_raw_chunks",
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=True),
+    )
+
+    # Для draft строки потока становятся источником правды. Раньше
+    # удалённые через /stream/remove строки оставались в chunks, а chunk мог
+    # содержать несколько строк, поэтому лог draft-ов пересобирается из
+    # текущего raw_wants_stream: одна непустая строка — один chunk.
+    op.execute(
+        """
+        DELETE FROM wants_raw_chunks c
+        USING wants_raw w
+        WHERE c.wants_raw_id = w.id
+          AND w.status = 'draft'
+          AND c.exercise = 'stream'
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO wants_raw_chunks (id, wants_raw_id, exercise, text, created_at)
+        SELECT gen_random_uuid(), w.id, 'stream', line.text, w.updated_at
+        FROM wants_raw w
+        CROSS JOIN LATERAL unnest(string_to_array(w.raw_wants_stream, E'\\n'))
+            WITH ORDINALITY AS line(text, n)
+        WHERE w.status = 'draft'
+          AND btrim(line.text) <> ''
+        ORDER BY w.id, line.n
+        """
+    )
+
+    op.drop_index(
+        "ix_wants_raw_chunks_wants_raw_id_created_at",
+        table_name="wants_raw_chunks",
+    )
+    op.create_index(
+        "ix_wants_raw_chunks_live_seq",
+        "wants_raw_chunks",
+        ["wants_raw_id", "exercise", "seq"],
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    # Вернуть draft-ам собранный текст потока: после апгрейда append его не пишет.
+    op.execute(
+        """
+        UPDATE wants_raw w
+        SET raw_wants_stream = s.text
+        FROM (
+            SELECT wants_raw_id, string_agg(text, E'\\n' ORDER BY seq) AS text
+            FROM wants_raw_chunks
+            WHERE exercise = 'stream' AND deleted_at IS NULL
+            GROUP BY wants_raw_id
+        ) s
+        WHERE w.id = s.wants_raw_id
+          AND w.status = 'draft'
+        """
+    )
+    op.drop_index("ix_wants_raw_chunks_live_seq", table_name="wants_raw_chunks")
+    op.execute("DELETE FROM wants_raw_chunks WHERE deleted_at IS NOT NULL")
+    op.create_index(
+        "ix_wants_raw_chunks_wants_raw_id_created_at",
+        "wants_raw_chunks",
+        ["wants_raw_id", "created_at"],
+    )
+    op.drop_column("wants_raw_chunks", "deleted_at")
+    op.drop_column("wants_raw_chunks", "seq")
@@ -0,0 +1,44 @@
+"""indexes for keyset pagination
+
+Revision ID: 2b3c4d5e6f70
+Revises: 1a2b3c4d5e6f
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "2b3c4d5e6f70"
+down_revision = "1a2b3c4d5e6f"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # keyset_page идёт по (created_at desc, id desc) — обратный проход этих индексов.
+    # life_wheels уже покрыт ix_life_wheels_user_id_created_at.
+    op.create_index(
+        "ix_wants_raw_user_completed_created",
+        "wants_raw",
+        ["user_id", "created_at", "id"],
+        postgresql_where=sa.text("status = 'completed'"),
+    )
+    op.create_index(
+        "ix_users_created_at_id",
+        "users",
+        ["created_at", "id"],
+    )
+    op.create_index(
+        "ix_promo_codes_created_at_id",
+        "promo_codes",
+        ["created_at", "id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_promo_codes_created_at_id", table_name="promo_codes")
+    op.drop_index("ix_users_created_at_id", table_name="users")
+    op.drop_index("ix_wants_raw_user_completed_created", table_name="wants_raw")
@@ -0,0 +1,118 @@
+"""future story draft answers as a keyed child table
+
+Revision ID: 3c4d5e6f7081
+Revises: 2b3c4d5e6f70
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "3c4d5e6f7081"
+down_revision = "2b3c4d5e6f70"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "future_story_draft_answers",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("draft_id", sa.UUID(), nullable=False),
+        sa.Column("area_id", sa.String(), nullable=False),
+        sa.Column("question", sa.Text(), nullable=False),
+        sa.Column("answer", sa.Text(), nullable=False),
+        sa.Column("seq", sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(
+            ["draft_id"],
+            ["future_story_drafts.id"],
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "draft_id",
+            "area_id",
+            "question",
+            name="uq_future_story_draft_answers_key",
+        ),
+    )
+
+    # Перенос ответов из JSONB-списка с сохранением порядка. При дублях
+    # (area_id, question) остаётся первый элемент — именно его обновлял
+    # старый upsert.
+    op.execute(
+        """
+        INSERT INTO future_story_draft_answers
+            (id, draft_id, area_id, question, answer, created_at, updated_at)
+        SELECT gen_random_uuid(), s.draft_id, s.area_id, s.question, s.answer,
+               s.updated_at, s.updated_at
+        FROM (
+            SELECT DISTINCT ON (d.id, item.value->>'area_id', item.value->>'question')
+                d.id AS draft_id,
+                item.value->>'area_id' AS area_id,
+                item.value->>'question' AS question,
+                item.value->>'answer' AS answer,
+                item.n,
+                d.updated_at
+            FROM future_story_drafts d
+            CROSS JOIN LATERAL jsonb_array_elements(d.answers)
+                WITH ORDINALITY AS item(value, n)
+            WHERE coalesce(item.value->>'area_id', '') <> ''
+              AND coalesce(item.value->>'question', '') <> ''
+              AND coalesce(item.value->>'answer', '') <> ''
+            ORDER BY d.id, item.value->>'area_id', item.value->>'question', item.n
+        ) s
+        ORDER BY s.draft_id, s.n
+        """
+    )
+    op.drop_column("future_story_drafts", "answers")
+
+
+def downgrade() -> None:
+    op.add_column(
+        "future_story_drafts",
+        sa.Column(
+            "answers",
+            postgresql.JSONB(astext_type=sa.Text()),
+            nullable=False,
+            server_default=sa.text("'[]'::jsonb"),
+        ),
+    )
+    op.execute(
+        """
+        UPDATE future_story_drafts d
+        SET answers = s.answers
+        FROM (
+            SELECT draft_id,
+                   jsonb_agg(
+                       jsonb_build_object(
+                           'area_id', area_id,
+                           'question', question,
+                           'answer', answer
+                       )
+                       ORDER BY seq
+                   ) AS answers
+            FROM future_story_draft_answers
+            GROUP BY draft_id
+        ) s
+        WHERE d.id = s.draft_id
+        """
+    )
+    op.alter_column("future_story_drafts", "answers", server_default=None)
+    op.drop_table("future_story_draft_answers")
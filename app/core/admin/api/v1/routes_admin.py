@@ -18,12 +18,21 @@ from app.core.promocodes.schemas import (
     PromoCodeUpdate,
 )
 from app.core.promocodes.services import create_promo_code, update_promo_code
-from app.response import Pagination, StandardResponse, make_success_response
+from app.response import StandardResponse, make_success_response
 from app.response.response import APIError
+from app.utils.pagination import (
+    cached_count,
+    estimated_table_count,
+    invalidate_count,
+    keyset_page,
+    make_pagination,
+)
 
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
+PROMOCODES_COUNT_KEY = "admin:promocodes"
+
 
 @router.get(
     "/stats",
@@ -79,22 +88,33 @@ def get_admin_stats(
 def list_users(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    with_total: bool = Query(True),
     db: Session = Depends(get_db),
     _: User = Depends(get_current_admin),
 ) -> StandardResponse:
-    total = db.query(func.count(User.id)).scalar() or 0
-    total_pages = (total + page_size - 1) // page_size if page_size > 0 else 1
-
-    users = (
-        db.query(User)
-        .order_by(User.created_at.desc())
-        .offset((page - 1) * page_size)
-        .limit(page_size)
-        .all()
+    total = None
+    if with_total:
+        total = cached_count(
+            "admin:users",
+            lambda: estimated_table_count(
+                db,
+                User.__tablename__,
+                lambda: db.query(func.count(User.id)).scalar() or 0,
+            ),
+        )
+
+    result = keyset_page(
+        db.query(User),
+        User.created_at,
+        User.id,
+        limit=page_size,
+        cursor=cursor,
+        offset=(page - 1) * page_size,
     )
 
     items = []
-    for user in users:
+    for user in result.items:
         items.append(
             {
                 "id": str(user.id),
@@ -109,13 +129,12 @@ def list_users(
             }
         )
 
-    pagination = Pagination(
+    pagination = make_pagination(
         page=page,
         page_size=page_size,
         total=total,
-        total_pages=total_pages,
-        has_next=page < total_pages,
-        has_prev=page > 1,
+        next_cursor=result.next_cursor,
+        cursor=cursor,
     )
     return make_success_response(
         result={"items": items},
@@ -130,11 +149,17 @@ def list_users(
 def list_promocodes(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    with_total: bool = Query(True),
     db: Session = Depends(get_db),
     _: User = Depends(get_current_admin),
 ) -> StandardResponse:
-    total = db.query(func.count(PromoCode.id)).scalar() or 0
-    total_pages = (total + page_size - 1) // page_size if page_size > 0 else 1
+    total = None
+    if with_total:
+        total = cached_count(
+            PROMOCODES_COUNT_KEY,
+            lambda: db.query(func.count(PromoCode.id)).scalar() or 0,
+        )
 
     redemptions_subq = (
         db.query(
@@ -145,31 +170,32 @@ def list_promocodes(
         .subquery()
     )
 
-    rows = (
+    result = keyset_page(
         db.query(PromoCode, func.coalesce(redemptions_subq.c.redemptions_count, 0))
         .outerjoin(
             redemptions_subq,
             PromoCode.id == redemptions_subq.c.promo_code_id,
-        )
-        .order_by(PromoCode.created_at.desc())
-        .offset((page - 1) * page_size)
-        .limit(page_size)
-        .all()
+        ),
+        PromoCode.created_at,
+        PromoCode.id,
+        limit=page_size,
+        cursor=cursor,
+        offset=(page - 1) * page_size,
+        key=lambda row: row[0],
     )
 
     items = []
-    for promo, count in rows:
+    for promo, count in result.items:
         promo_out = PromoCodePublic.from_orm(promo)
         promo_out.redemptions_count = int(count or 0)
         items.append(promo_out)
 
-    pagination = Pagination(
+    pagination = make_pagination(
         page=page,
         page_size=page_size,
         total=total,
-        total_pages=total_pages,
-        has_next=page < total_pages,
-        has_prev=page > 1,
+        next_cursor=result.next_cursor,
+        cursor=cursor,
     )
     return make_success_response(
         result={"items": items},
@@ -195,6 +221,7 @@ def create_promocode(
     )
     db.commit()
     db.refresh(promo)
+    invalidate_count(PROMOCODES_COUNT_KEY)
     promo_out = PromoCodePublic.from_orm(promo)
     promo_out.redemptions_count = 0
     return make_success_response(result=promo_out)
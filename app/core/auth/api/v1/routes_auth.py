@@ -7,6 +7,12 @@ from fastapi import APIRouter, Depends, Header
 from sqlalchemy.orm import Session
 
 from app.core.auth.models import EmailVerificationToken, User, UserSession
+from app.core.auth.rate_limits import (
+    EMAIL_VERIFICATION_POLICY,
+    LOGIN_POLICY,
+    PASSWORD_RESET_POLICY,
+    SIGNUP_POLICY,
+)
 from app.core.auth.schemas import (
     CheckEmailVerificationCodeRequest,
     LoginRequest,
@@ -37,6 +43,7 @@ from app.core.auth.services import (
 )
 from app.core.dependencies import get_current_user, get_db
 from app.core.config import settings
+from app.core.rate_limit import rate_limit
 from app.core.security import decode_token
 from app.response import StandardResponse, make_success_response
 from app.response.response import APIError
@@ -48,6 +55,7 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 @router.post(
     "/signup",
     response_model=StandardResponse,
+    dependencies=[Depends(rate_limit(SIGNUP_POLICY))],
     summary="Регистрация нового пользователя",
     description=(
         "Создает пользователя с неактивным email, формирует токен и код "
@@ -85,6 +93,7 @@ def register(
 @router.post(
     "/signin",
     response_model=StandardResponse,
+    dependencies=[Depends(rate_limit(LOGIN_POLICY))],
     summary="Вход по email и паролю",
     description=(
         "Аутентифицирует пользователя по email и паролю, создает новую сессию "
@@ -230,6 +239,7 @@ def logout_all(
 @router.post(
     "/request-password-reset",
     response_model=StandardResponse,
+    dependencies=[Depends(rate_limit(PASSWORD_RESET_POLICY))],
 )
 def request_password_reset_endpoint(
     payload: RequestPasswordReset,
@@ -243,6 +253,7 @@ def request_password_reset_endpoint(
 @router.post(
     "/reset-password",
     response_model=StandardResponse,
+    dependencies=[Depends(rate_limit(PASSWORD_RESET_POLICY))],
 )
 def reset_password_endpoint(
     payload: ResetPasswordConfirm,
@@ -256,6 +267,7 @@ def reset_password_endpoint(
 @router.post(
     "/send-email-verification",
     response_model=StandardResponse,
+    dependencies=[Depends(rate_limit(EMAIL_VERIFICATION_POLICY))],
     summary="Отправить код подтверждения email",
     description=(
         "Инициирует отправку кода подтверждения на указанный email для "
@@ -274,6 +286,7 @@ def send_email_verification_endpoint(
 @router.post(
     "/check-email-verification-code",
     response_model=StandardResponse,
+    dependencies=[Depends(rate_limit(EMAIL_VERIFICATION_POLICY))],
     summary="Подтвердить email по коду",
     description=(
         "Принимает verification_token и код, сверяет их с записью в "
@@ -10,6 +10,7 @@ from redis import Redis
 from sqlalchemy.orm import Session
 
 from app.core.auth.models import User
+from app.core.auth.principal_cache import invalidate_user_on_commit
 from app.core.auth.schemas import ChangePasswordRequest, UserPublic, UserUpdate
 from app.core.auth.services import logout_all_sessions, validate_password_strength
 from app.core.dependencies import get_current_user, get_db
@@ -28,6 +29,23 @@ router = APIRouter(
 )
 
 
+def _build_me_payload(db: Session, user: User) -> Dict[str, Any]:
+    """
+    Данные /me. Только чтение: использование лимитов берётся из счётчиков
+    без записи в БД (см. `get_usage_snapshot`).
+    """
+    usage = get_usage_snapshot(db, user)
+    return {
+        "user": UserPublic.from_orm(user).model_dump(),
+        "subscription_expires_at": user.subscription_expires_at,
+        "plan": usage.plan,
+        "usage": {
+            "text": {"used": usage.text_used, "limit": usage.text_limit},
+            "image": {"used": usage.image_used, "limit": usage.image_limit},
+        },
+    }
+
+
 @router.get(
     "",
     response_model=StandardResponse,
@@ -39,7 +57,7 @@ def get_me(
 ) -> StandardResponse:
     """
     Возвращает информацию о текущем пользователе.
-    Результат кешируется в Redis на 60 секунд.
+    Результат кешируется в Redis на 60 секунд; запрос ничего не пишет в БД.
     """
     cache_key = f"me:user:{user.id}"
 
@@ -56,16 +74,7 @@ def get_me(
         logger.warning("me cache error: %r", exc)
         redis = None
 
-    usage = get_usage_snapshot(db, user)
-    result_data: Dict[str, Any] = {
-        "user": UserPublic.from_orm(user).model_dump(),
-        "subscription_expires_at": user.subscription_expires_at,
-        "plan": usage.plan,
-        "usage": {
-            "text": {"used": usage.text_used, "limit": usage.text_limit},
-            "image": {"used": usage.image_used, "limit": usage.image_limit},
-        },
-    }
+    result_data = _build_me_payload(db, user)
 
     if redis is not None:
         try:
@@ -97,19 +106,11 @@ def update_me(
         setattr(user, field, value)
 
     db.add(user)
+    invalidate_user_on_commit(db, user.id)
     db.commit()
     db.refresh(user)
 
-    usage = get_usage_snapshot(db, user)
-    result_data: Dict[str, Any] = {
-        "user": UserPublic.from_orm(user).model_dump(),
-        "subscription_expires_at": user.subscription_expires_at,
-        "plan": usage.plan,
-        "usage": {
-            "text": {"used": usage.text_used, "limit": usage.text_limit},
-            "image": {"used": usage.image_used, "limit": usage.image_limit},
-        },
-    }
+    result_data = _build_me_payload(db, user)
 
     cache_key = f"me:user:{user.id}"
     try:
@@ -149,6 +150,7 @@ def change_password(
 
     user.password_hash = hash_password(payload.new_password)
     db.add(user)
+    invalidate_user_on_commit(db, user.id)
 
     logout_all_sessions(db, user_id=user.id)
     db.commit()
@@ -2,9 +2,17 @@ from __future__ import annotations
 
 from typing import Dict, Any
 
-from fastapi import APIRouter, Depends, Header, Request
+from fastapi import APIRouter, Depends, Header, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
+from app.core.auth.qr_status import (
+    QR_STATUS_MAX_WAIT_SECONDS,
+    publish_qr_status,
+    store_qr_status,
+    wait_qr_status,
+)
+from app.core.auth.rate_limits import QR_INIT_POLICY
 from app.core.auth.schemas import (
     TelegramQRInitResponse,
     TelegramQRStatusResponse,
@@ -21,6 +29,8 @@ from app.core.auth.services import (
 )
 from app.core.config import settings
 from app.core.dependencies import get_db
+from app.core.rate_limit import rate_limit
+from app.database.session import SessionLocal
 from app.response import StandardResponse, make_success_response
 from app.response.response import APIError
 
@@ -31,6 +41,7 @@ router = APIRouter(prefix="/auth/telegram/qr", tags=["auth"])
 @router.post(
     "/init",
     response_model=StandardResponse,
+    dependencies=[Depends(rate_limit(QR_INIT_POLICY))],
     summary="Инициализация QR-логина через Telegram",
     description=(
         "Создает новую попытку входа через QR-код. Возвращает токен, "
@@ -50,6 +61,7 @@ def init_qr_login(
         user_agent=user_agent,
     )
     db.commit()
+    store_qr_status(login_token, expires_in)
     
     result = TelegramQRInitResponse(
         login_token=login_token,
@@ -61,20 +73,42 @@ def init_qr_login(
     return make_success_response(result=result)
 
 
+def _read_status_from_db(login_token: str) -> tuple[str, str | None]:
+    db = SessionLocal()
+    try:
+        return get_qr_login_status(db, login_token)
+    finally:
+        db.close()
+
+
 @router.get(
     "/status",
     response_model=StandardResponse,
     summary="Проверка статуса QR-логина",
     description=(
-        "Polling эндпоинт. Возвращает текущий статус попытки входа. "
-        "При статусе 'confirmed' возвращает one_time_secret для обмена на токены."
+        "Возвращает текущий статус попытки входа. "
+        "При статусе 'confirmed' возвращает one_time_secret для обмена на токены.\n\n"
+        "Long-poll: параметр `wait` (секунды, до 30) держит запрос открытым, "
+        "пока бот не подтвердит вход или не истечёт токен. Статус читается "
+        "из Redis, соединение с БД на время ожидания не удерживается."
     ),
 )
-def check_qr_login_status(
+async def check_qr_login_status(
     login_token: str,
-    db: Session = Depends(get_db),
+    wait: int = Query(
+        0,
+        ge=0,
+        le=QR_STATUS_MAX_WAIT_SECONDS,
+        description="Long-poll: сколько секунд ждать подтверждения (0 — сразу).",
+    ),
 ) -> StandardResponse:
-    status, one_time_secret = get_qr_login_status(db, login_token)
+    pushed = await wait_qr_status(login_token, wait)
+    if pushed is None:
+        status, one_time_secret = await run_in_threadpool(
+            _read_status_from_db, login_token
+        )
+    else:
+        status, one_time_secret = pushed
     
     result = TelegramQRStatusResponse(
         status=status,
@@ -105,7 +139,7 @@ def confirm_qr_login_endpoint(
             message="Access denied for non-bot request",
         )
     
-    confirm_qr_login(
+    one_time_secret = confirm_qr_login(
         db,
         login_token=payload.login_token,
         telegram_id=payload.telegram_id,
@@ -115,6 +149,7 @@ def confirm_qr_login_endpoint(
         photo_url=payload.photo_url,
     )
     db.commit()
+    publish_qr_status(payload.login_token, "confirmed", one_time_secret)
     
     return make_success_response(result={"success": True})
 
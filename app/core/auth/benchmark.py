@@ -0,0 +1,75 @@
+"""
+Подбор числа раундов pbkdf2_sha256 под железо.
+
+Для каждого значения раундов меряет задержку одного хеша и пропускную
+способность пула из `--workers` процессов.
+
+Запуск: python -m app.core.auth.benchmark [--rounds 29000 100000 200000] [--workers 4]
+"""
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+from passlib.hash import pbkdf2_sha256
+
+
+SAMPLE_PASSWORD = "Benchmark-Passw0rd!"
+
+
+def _hash_once(rounds: int) -> float:
+    started = time.perf_counter()
+    pbkdf2_sha256.using(rounds=rounds).hash(SAMPLE_PASSWORD)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        nargs="+",
+        default=[29000, 100000, 200000, 400000],
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--samples", type=int, default=10)
+    parser.add_argument(
+        "--target-ms",
+        type=float,
+        default=250.0,
+        help="Желаемая задержка одного хеша.",
+    )
+    args = parser.parse_args()
+
+    print(f"cpu_count={os.cpu_count()} workers={args.workers}")
+    print(f"{'rounds':>8} {'p50 ms':>8} {'p95 ms':>8} {'pool hashes/s':>14}")
+    best = None
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=context) as pool:
+        for rounds in args.rounds:
+            latencies: List[float] = sorted(_hash_once(rounds) for _ in range(args.samples))
+            p50 = statistics.median(latencies) * 1000
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+
+            jobs = args.workers * args.samples
+            started = time.perf_counter()
+            list(pool.map(_hash_once, [rounds] * jobs))
+            throughput = jobs / (time.perf_counter() - started)
+
+            print(f"{rounds:>8} {p50:>8.1f} {p95:>8.1f} {throughput:>14.1f}")
+            if p50 <= args.target_ms:
+                best = rounds
+
+    if best is not None:
+        print(f"PASSWORD_HASH_ROUNDS={best} (max rounds with p50 <= {args.target_ms:.0f} ms)")
+    else:
+        print(f"No tested value fits {args.target_ms:.0f} ms; try fewer rounds.")
+
+
+if __name__ == "__main__":
+    main()
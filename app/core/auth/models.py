@@ -9,6 +9,7 @@ from sqlalchemy import (
     Date,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     BigInteger,
     String,
@@ -82,6 +83,9 @@ class User(Base):
     )
 
 
+Index("ix_users_created_at_id", User.created_at.desc(), User.id.desc())
+
+
 class UserSession(Base):
     __tablename__ = "user_sessions"
 
@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from loguru import logger
+from sqlalchemy import Date, DateTime, event
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+
+from app.core.auth.models import User, UserSession
+from app.core.config import settings
+from app.utils.redis_client import get_redis
+
+
+PRINCIPAL_KEY_PREFIX = "principal:session:"
+PRINCIPAL_USER_KEY_PREFIX = "principal:user:"
+PRINCIPAL_CHANNEL = "principal:invalidate"
+
+# Хеш пароля в кеш не попадает: при обращении он догружается из БД.
+_EXCLUDED_COLUMNS = {"password_hash"}
+
+_PENDING_USERS = "principal_cache_users"
+_PENDING_SESSIONS = "principal_cache_sessions"
+
+
+@dataclass
+class Principal:
+    session_id: uuid.UUID
+    user_id: uuid.UUID
+    session_expires_at: datetime
+    session_revoked: bool
+    user_fields: Dict[str, Any]
+
+
+def _user_columns() -> Iterable[Any]:
+    return (c for c in User.__table__.columns if c.key not in _EXCLUDED_COLUMNS)
+
+
+def _dump_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def _load_value(column: Any, value: Any) -> Any:
+    if value is None:
+        return None
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, Date):
+        return date.fromisoformat(value)
+    if isinstance(column.type, PG_UUID):
+        return uuid.UUID(value)
+    return value
+
+
+def _serialize(principal: Principal) -> str:
+    return json.dumps(
+        {
+            "session_id": str(principal.session_id),
+            "user_id": str(principal.user_id),
+            "session_expires_at": principal.session_expires_at.isoformat(),
+            "session_revoked": principal.session_revoked,
+            "user": {k: _dump_value(v) for k, v in principal.user_fields.items()},
+        }
+    )
+
+
+def _deserialize(raw: str) -> Principal:
+    data = json.loads(raw)
+    columns = {c.key: c for c in _user_columns()}
+    return Principal(
+        session_id=uuid.UUID(data["session_id"]),
+        user_id=uuid.UUID(data["user_id"]),
+        session_expires_at=datetime.fromisoformat(data["session_expires_at"]),
+        session_revoked=bool(data["session_revoked"]),
+        user_fields={
+            key: _load_value(columns[key], value)
+            for key, value in data["user"].items()
+            if key in columns
+        },
+    )
+
+
+class _LocalCache:
+    """
+    TTL LRU на процесс. Используется, только пока жив подписчик
+    на канал инвалидации — иначе отзыв сессии мог бы не дойти до процесса.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[uuid.UUID, Tuple[float, Principal]]" = OrderedDict()
+
+    def get(self, session_id: uuid.UUID) -> Optional[Principal]:
+        with self._lock:
+            item = self._items.get(session_id)
+            if item is None:
+                return None
+            expires, principal = item
+            if expires <= time.monotonic():
+                del self._items[session_id]
+                return None
+            self._items.move_to_end(session_id)
+            return principal
+
+    def put(self, principal: Principal) -> None:
+        expires = time.monotonic() + settings.principal_cache_local_ttl_seconds
+        with self._lock:
+            self._items[principal.session_id] = (expires, principal)
+            self._items.move_to_end(principal.session_id)
+            while len(self._items) > settings.principal_cache_local_max_entries:
+                self._items.popitem(last=False)
+
+    def drop_session(self, session_id: uuid.UUID) -> None:
+        with self._lock:
+            self._items.pop(session_id, None)
+
+    def drop_user(self, user_id: uuid.UUID) -> None:
+        with self._lock:
+            stale = [sid for sid, (_, p) in self._items.items() if p.user_id == user_id]
+            for sid in stale:
+                del self._items[sid]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+_local = _LocalCache()
+_listener_lock = threading.Lock()
+_listener_thread: Any = None
+_listener_pid: Optional[int] = None
+
+
+def _on_message(message: Dict[str, Any]) -> None:
+    data = message.get("data")
+    if not isinstance(data, str):
+        return
+    kind, _, value = data.partition(":")
+    try:
+        target = uuid.UUID(value)
+    except ValueError:
+        return
+    if kind == "user":
+        _local.drop_user(target)
+    elif kind == "session":
+        _local.drop_session(target)
+
+
+def _listener_alive() -> bool:
+    """
+    Запускает (лениво, после fork — заново) поток-подписчик на канал инвалидации.
+    """
+    global _listener_thread, _listener_pid
+    pid = os.getpid()
+    thread = _listener_thread
+    if thread is not None and _listener_pid == pid and thread.is_alive():
+        return True
+    with _listener_lock:
+        if _listener_thread is not None and _listener_pid == pid and _listener_thread.is_alive():
+            return True
+        # Всё, что лежало в локальном кеше до (пере)подписки, могло пропустить
+        # сообщения об отзыве.
+        _local.clear()
+        try:
+            pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{PRINCIPAL_CHANNEL: _on_message})
+            _listener_thread = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+            _listener_pid = pid
+        except Exception as exc:
+            logger.warning("Principal cache listener unavailable", error=str(exc))
+            _listener_thread = None
+            return False
+    return True
+
+
+def get_principal(session_id: uuid.UUID) -> Optional[Principal]:
+    if not settings.principal_cache_enabled:
+        return None
+    use_local = _listener_alive()
+    if use_local:
+        principal = _local.get(session_id)
+        if principal is not None:
+            return principal
+    try:
+        raw = get_redis().get(f"{PRINCIPAL_KEY_PREFIX}{session_id}")
+    except Exception:
+        return None
+    if not raw:
+        return None
+    try:
+        principal = _deserialize(raw)
+    except (KeyError, TypeError, ValueError):
+        return None
+    if use_local:
+        _local.put(principal)
+    return principal
+
+
+def put_principal(user: User, session_obj: UserSession) -> None:
+    if not settings.principal_cache_enabled:
+        return
+    principal = Principal(
+        session_id=session_obj.id,
+        user_id=user.id,
+        session_expires_at=session_obj.expires_at,
+        session_revoked=session_obj.revoked_at is not None,
+        user_fields={c.key: getattr(user, c.key) for c in _user_columns()},
+    )
+    ttl = settings.principal_cache_ttl_seconds
+    try:
+        redis = get_redis()
+        pipe = redis.pipeline()
+        pipe.setex(f"{PRINCIPAL_KEY_PREFIX}{principal.session_id}", ttl, _serialize(principal))
+        pipe.sadd(f"{PRINCIPAL_USER_KEY_PREFIX}{principal.user_id}", str(principal.session_id))
+        pipe.expire(f"{PRINCIPAL_USER_KEY_PREFIX}{principal.user_id}", ttl)
+        pipe.execute()
+    except Exception:
+        return
+    if _listener_alive():
+        _local.put(principal)
+
+
+def attach_user(db: Session, principal: Principal) -> User:
+    """
+    Восстанавливает `User` из снимка и привязывает его к сессии БД без запроса.
+
+    Объект ведёт себя как загруженный: изменения полей сохраняются обычным
+    `db.commit()`, а не попавшие в снимок поля догружаются при обращении.
+    """
+    user = User(**principal.user_fields)
+    make_transient_to_detached(user)
+    db.add(user)
+    return user
+
+
+def invalidate_users(user_ids: Iterable[uuid.UUID]) -> None:
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    for user_id in user_ids:
+        _local.drop_user(user_id)
+    try:
+        redis = get_redis()
+        for user_id in user_ids:
+            user_key = f"{PRINCIPAL_USER_KEY_PREFIX}{user_id}"
+            session_ids = redis.smembers(user_key)
+            keys = [f"{PRINCIPAL_KEY_PREFIX}{sid}" for sid in session_ids]
+            redis.delete(user_key, *keys)
+            redis.publish(PRINCIPAL_CHANNEL, f"user:{user_id}")
+    except Exception as exc:
+        logger.warning("Principal cache invalidation failed", error=str(exc))
+
+
+def invalidate_sessions(session_ids: Iterable[uuid.UUID]) -> None:
+    session_ids = set(session_ids)
+    if not session_ids:
+        return
+    for session_id in session_ids:
+        _local.drop_session(session_id)
+    try:
+        redis = get_redis()
+        redis.delete(*[f"{PRINCIPAL_KEY_PREFIX}{sid}" for sid in session_ids])
+        for session_id in session_ids:
+            redis.publish(PRINCIPAL_CHANNEL, f"session:{session_id}")
+    except Exception as exc:
+        logger.warning("Principal cache invalidation failed", error=str(exc))
+
+
+def invalidate_user_on_commit(db: Session, user_id: uuid.UUID) -> None:
+    """
+    Инвалидация после `db.commit()`: раньше нельзя — параллельный запрос
+    успел бы положить в кеш ещё не изменённые данные.
+    """
+    db.info.setdefault(_PENDING_USERS, set()).add(user_id)
+
+
+def invalidate_session_on_commit(db: Session, session_id: uuid.UUID) -> None:
+    db.info.setdefault(_PENDING_SESSIONS, set()).add(session_id)
+
+
+@event.listens_for(User, "after_update")
+def _user_updated(mapper: Any, connection: Any, target: User) -> None:
+    db = object_session(target)
+    if db is not None:
+        invalidate_user_on_commit(db, target.id)
+
+
+@event.listens_for(UserSession, "after_update")
+def _session_updated(mapper: Any, connection: Any, target: UserSession) -> None:
+    db = object_session(target)
+    if db is not None:
+        invalidate_session_on_commit(db, target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_on_commit(db: Session) -> None:
+    users: Set[uuid.UUID] = db.info.pop(_PENDING_USERS, set())
+    sessions: Set[uuid.UUID] = db.info.pop(_PENDING_SESSIONS, set())
+    invalidate_users(users)
+    invalidate_sessions(sessions)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(db: Session) -> None:
+    db.info.pop(_PENDING_USERS, None)
+    db.info.pop(_PENDING_SESSIONS, None)
+
+
+__all__ = [
+    "Principal",
+    "attach_user",
+    "get_principal",
+    "invalidate_session_on_commit",
+    "invalidate_sessions",
+    "invalidate_user_on_commit",
+    "invalidate_users",
+    "put_principal",
+]
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import json
+import time
+from typing import Optional, Tuple
+
+from loguru import logger
+
+from app.utils.redis_client import get_async_redis, get_redis
+
+
+QR_STATUS_KEY_PREFIX = "auth:qr:status:"
+QR_STATUS_CHANNEL_PREFIX = "auth:qr:channel:"
+QR_STATUS_MAX_WAIT_SECONDS = 30
+QR_LOGIN_TOKEN_TTL_SECONDS = 180
+
+QRStatus = Tuple[str, Optional[str]]
+
+
+def _key(login_token: str) -> str:
+    return f"{QR_STATUS_KEY_PREFIX}{login_token}"
+
+
+def _channel(login_token: str) -> str:
+    return f"{QR_STATUS_CHANNEL_PREFIX}{login_token}"
+
+
+def _dump(status: str, one_time_secret: Optional[str]) -> str:
+    return json.dumps({"status": status, "one_time_secret": one_time_secret})
+
+
+def _load(raw: str) -> Optional[QRStatus]:
+    try:
+        data = json.loads(raw)
+        return data["status"], data.get("one_time_secret")
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def store_qr_status(login_token: str, ttl_seconds: int) -> None:
+    """
+    Кладёт в Redis статус `pending` новой попытки; ключ живёт столько же,
+    сколько токен, поэтому его исчезновение означает истечение попытки.
+    Вызывается после коммита.
+    """
+    try:
+        get_redis().setex(_key(login_token), ttl_seconds, _dump("pending", None))
+    except Exception as exc:
+        logger.warning("QR status store failed", error=str(exc))
+
+
+def publish_qr_status(
+    login_token: str,
+    status: str,
+    one_time_secret: Optional[str] = None,
+) -> None:
+    """
+    Обновляет статус (с сохранением TTL) и будит ожидающих на канале токена.
+    Вызывается после коммита, иначе клиент мог бы получить секрет,
+    которого ещё нет в БД.
+    """
+    payload = _dump(status, one_time_secret)
+    try:
+        redis = get_redis()
+        pipe = redis.pipeline()
+        pipe.set(_key(login_token), payload, xx=True, keepttl=True)
+        pipe.publish(_channel(login_token), payload)
+        pipe.execute()
+    except Exception as exc:
+        logger.warning("QR status publish failed", error=str(exc))
+
+
+async def wait_qr_status(login_token: str, wait_seconds: int) -> Optional[QRStatus]:
+    """
+    Возвращает статус попытки из Redis, при `pending` ждёт публикации
+    до `wait_seconds` секунд, но не дольше срока жизни токена.
+
+    `None` означает, что Redis ничего не знает о токене (истёк, не найден,
+    Redis недоступен) — тогда вызывающий код читает статус из БД.
+    """
+    try:
+        redis = get_async_redis()
+        pubsub = redis.pubsub(ignore_subscribe_messages=True)
+    except Exception as exc:
+        logger.warning("QR status wait unavailable", error=str(exc))
+        return None
+
+    try:
+        # Подписка до чтения ключа: подтверждение между GET и SUBSCRIBE
+        # иначе было бы потеряно.
+        await pubsub.subscribe(_channel(login_token))
+        pipe = redis.pipeline()
+        pipe.get(_key(login_token))
+        pipe.pttl(_key(login_token))
+        raw, ttl_ms = await pipe.execute()
+        if raw is None:
+            return None
+        current = _load(raw)
+        if current is None or current[0] != "pending" or wait_seconds <= 0:
+            return current
+
+        wait = min(wait_seconds, QR_STATUS_MAX_WAIT_SECONDS)
+        if ttl_ms and ttl_ms > 0:
+            wait = min(wait, ttl_ms / 1000)
+        deadline = time.monotonic() + wait
+        while (remaining := deadline - time.monotonic()) > 0:
+            message = await pubsub.get_message(timeout=remaining)
+            if message is None:
+                continue
+            pushed = _load(message.get("data"))
+            if pushed is not None:
+                return pushed
+
+        raw = await redis.get(_key(login_token))
+        return _load(raw) if raw is not None else None
+    except Exception as exc:
+        logger.warning("QR status wait failed", error=str(exc))
+        return None
+    finally:
+        try:
+            await pubsub.aclose()
+        except Exception:
+            pass
+
+
+__all__ = [
+    "QR_LOGIN_TOKEN_TTL_SECONDS",
+    "QR_STATUS_MAX_WAIT_SECONDS",
+    "publish_qr_status",
+    "store_qr_status",
+    "wait_qr_status",
+]
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from app.core.rate_limit import RateLimitPolicy
+
+
+QR_INIT_POLICY = RateLimitPolicy(
+    name="auth_qr_init",
+    limit=20,
+    window_seconds=5 * 60,
+    error_code="AUTH_QR_RATE_LIMIT",
+    message="Слишком много попыток входа. Попробуйте позже.",
+)
+
+LOGIN_POLICY = RateLimitPolicy(
+    name="auth_login",
+    limit=10,
+    window_seconds=60,
+    error_code="AUTH_LOGIN_RATE_LIMIT",
+    message="Слишком много попыток входа. Попробуйте позже.",
+)
+
+SIGNUP_POLICY = RateLimitPolicy(
+    name="auth_signup",
+    limit=10,
+    window_seconds=60 * 60,
+    error_code="AUTH_SIGNUP_RATE_LIMIT",
+    message="Слишком много регистраций. Попробуйте позже.",
+)
+
+PASSWORD_RESET_POLICY = RateLimitPolicy(
+    name="auth_password_reset",
+    limit=5,
+    window_seconds=15 * 60,
+    error_code="AUTH_PASSWORD_RESET_RATE_LIMIT",
+    message="Слишком много запросов на сброс пароля. Попробуйте позже.",
+)
+
+EMAIL_VERIFICATION_POLICY = RateLimitPolicy(
+    name="auth_email_verification",
+    limit=10,
+    window_seconds=15 * 60,
+    error_code="AUTH_EMAIL_VERIFICATION_RATE_LIMIT",
+    message="Слишком много попыток подтверждения email. Попробуйте позже.",
+)
+
+
+__all__ = [
+    "QR_INIT_POLICY",
+    "LOGIN_POLICY",
+    "SIGNUP_POLICY",
+    "PASSWORD_RESET_POLICY",
+    "EMAIL_VERIFICATION_POLICY",
+]
@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import random
 import secrets
-import string
 import uuid
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Tuple
@@ -16,6 +15,15 @@ from app.core.auth.models import (
     User,
     UserSession,
 )
+from app.core.auth import session_store
+from app.core.auth.principal_cache import (
+    get_principal,
+    invalidate_session_on_commit,
+    invalidate_sessions,
+    invalidate_user_on_commit,
+    invalidate_users,
+)
+from app.core.auth.qr_status import QR_LOGIN_TOKEN_TTL_SECONDS
 from app.core.auth.schemas import (
     ChangePasswordRequest,
     LoginRequest,
@@ -32,6 +40,7 @@ from app.core.security import (
     create_refresh_token,
     generate_random_token,
     hash_password,
+    make_unusable_password,
     verify_password,
 )
 from app.response.response import APIError
@@ -69,32 +78,16 @@ def validate_password_strength(password: str) -> None:
         )
 
 
-def _generate_strong_password(length: int = 20) -> str:
-    if length < 12:
-        length = 12
-    lower = string.ascii_lowercase
-    upper = string.ascii_uppercase
-    digits = string.digits
-    special = "!@#$%^&*()-_=+"
-    all_chars = lower + upper + digits + special
-
-    password_chars = [
-        secrets.choice(lower),
-        secrets.choice(upper),
-        secrets.choice(digits),
-        secrets.choice(special),
-    ]
-    password_chars.extend(
-        secrets.choice(all_chars) for _ in range(length - len(password_chars))
-    )
-    secrets.SystemRandom().shuffle(password_chars)
-    return "".join(password_chars)
-
-
 def create_user(
     db: Session,
     data: UserCreate,
+    *,
+    password_hash: Optional[str] = None,
 ) -> User:
+    """
+    Создаёт пользователя. Готовый `password_hash` (например, заглушка
+    для аккаунтов бота) передаётся без проверки сложности и хеширования.
+    """
     existing = db.query(User).filter(User.email == data.email).first()
     if existing:
         raise APIError(
@@ -103,11 +96,13 @@ def create_user(
             message="Пользователь с таким email уже существует",
         )
 
-    validate_password_strength(data.password)
+    if password_hash is None:
+        validate_password_strength(data.password)
+        password_hash = hash_password(data.password)
 
     user = User(
         email=data.email,
-        password_hash=hash_password(data.password),
+        password_hash=password_hash,
         first_name=data.first_name,
         last_name=data.last_name,
         time_zone=data.time_zone or "Europe/Moscow",
@@ -198,17 +193,35 @@ def authenticate_telegram_user(
             message="User not found. Registration required.",
         )
 
-    email = f"{data.telegram_id}@bot.mechta.ai"
-    password = _generate_strong_password()
-    payload = UserCreate(
-        email=email,
-        password=password,
+    return _create_telegram_user(
+        db,
+        telegram_id=data.telegram_id,
         first_name=data.first_name,
         last_name=data.last_name,
     )
-    user = create_user(db, payload)
+
+
+def _create_telegram_user(
+    db: Session,
+    *,
+    telegram_id: int,
+    first_name: str | None,
+    last_name: str | None,
+) -> User:
+    """
+    Аккаунт, созданный ботом: вместо хеша случайного пароля — заглушка,
+    поэтому регистрация через Telegram не тратит время на pbkdf2.
+    Войти по паролю можно после сброса пароля.
+    """
+    payload = UserCreate(
+        email=f"{telegram_id}@bot.mechta.ai",
+        password="",
+        first_name=first_name,
+        last_name=last_name,
+    )
+    user = create_user(db, payload, password_hash=make_unusable_password())
     user.is_active = True
-    user.telegram_id = data.telegram_id
+    user.telegram_id = telegram_id
     db.add(user)
     return user
 
@@ -224,6 +237,18 @@ def _create_session(
     now = _utc_now()
     expires_at = now + timedelta(days=settings.refresh_token_expire_days)
     refresh_id = uuid.uuid4()
+    if session_store.enabled():
+        record = session_store.create_session(
+            user_id=user.id,
+            refresh_token_id=str(refresh_id),
+            expires_at=expires_at,
+            user_agent=user_agent,
+            ip_address=ip_address,
+            device_name=device_name,
+        )
+        if record is not None:
+            return record.to_model(), refresh_id
+
     session = UserSession(
         user_id=user.id,
         refresh_token_id=str(refresh_id),
@@ -269,6 +294,22 @@ def create_session_and_tokens(
     )
 
 
+def _user_is_active(
+    db: Session,
+    user_id: uuid.UUID,
+    session_id: uuid.UUID,
+) -> Optional[bool]:
+    """
+    Флаг активности из кеша principal, без него — из БД.
+    `None` — пользователь не найден.
+    """
+    principal = get_principal(session_id)
+    if principal is not None and principal.user_id == user_id:
+        return bool(principal.user_fields.get("is_active"))
+    user = db.query(User).filter(User.id == user_id).first()
+    return user.is_active if user is not None else None
+
+
 def refresh_tokens(
     db: Session,
     refresh_token: str,
@@ -305,11 +346,7 @@ def refresh_tokens(
             message="Некорректный payload токена",
         )
 
-    session = (
-        db.query(UserSession)
-        .filter(UserSession.id == session_id)
-        .first()
-    )
+    session = session_store.load_session(db, session_id)
     if session is None:
         raise APIError(
             code="AUTH_SESSION_NOT_FOUND",
@@ -332,15 +369,15 @@ def refresh_tokens(
             message="Refresh-токен не соответствует сессии",
         )
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
+    is_active = _user_is_active(db, user_id, session_id)
+    if is_active is None:
         raise APIError(
             code="AUTH_USER_NOT_FOUND",
             http_code=401,
             message="Пользователь не найден",
         )
 
-    if not user.is_active:
+    if not is_active:
         raise APIError(
             code="AUTH_USER_INACTIVE",
             http_code=403,
@@ -348,11 +385,11 @@ def refresh_tokens(
         )
 
     access_token = create_access_token(
-        user_id=user.id,
+        user_id=user_id,
         session_id=session.id,
     )
     new_refresh_token = create_refresh_token(
-        user_id=user.id,
+        user_id=user_id,
         session_id=session.id,
         jti=uuid.UUID(jti_str),
     )
@@ -436,6 +473,19 @@ def logout_session(
     session_id: uuid.UUID,
     user_id: uuid.UUID,
 ) -> None:
+    if session_store.enabled():
+        record = session_store.get_session(session_id)
+        if record is not None:
+            if record.user_id != user_id:
+                raise APIError(
+                    code="AUTH_SESSION_NOT_FOUND",
+                    http_code=404,
+                    message="Сессия не найдена",
+                )
+            if session_store.revoke_session(session_id):
+                invalidate_sessions([session_id])
+                return
+
     session = (
         db.query(UserSession)
         .filter(UserSession.id == session_id, UserSession.user_id == user_id)
@@ -451,6 +501,7 @@ def logout_session(
     now = _utc_now()
     session.revoked_at = now
     db.add(session)
+    invalidate_session_on_commit(db, session.id)
 
 
 def logout_all_sessions(
@@ -458,12 +509,17 @@ def logout_all_sessions(
     *,
     user_id: uuid.UUID,
 ) -> None:
+    if session_store.enabled() and session_store.revoke_all_sessions(user_id):
+        invalidate_users([user_id])
+        return
+
     now = _utc_now()
     (
         db.query(UserSession)
         .filter(UserSession.user_id == user_id, UserSession.revoked_at.is_(None))
         .update({"revoked_at": now})
     )
+    invalidate_user_on_commit(db, user_id)
 
 
 def request_password_reset(
@@ -525,15 +581,11 @@ def reset_password(
 
     db.add(user)
     db.add(reset)
+    invalidate_user_on_commit(db, user.id)
 
     logout_all_sessions(db, user_id=user.id)
 
 
-QR_LOGIN_TOKEN_TTL_SECONDS = 180
-QR_LOGIN_MAX_ATTEMPTS_PER_IP = 20
-QR_LOGIN_RATE_LIMIT_WINDOW_MINUTES = 5
-
-
 def _generate_login_token() -> str:
     return f"login_{secrets.token_urlsafe(32)}"
 
@@ -549,26 +601,10 @@ def create_qr_login_attempt(
     user_agent: str | None,
 ) -> tuple[str, str, str, int]:
     from app.core.auth.models import LoginAttempt
-    
-    if ip_address:
-        now = _utc_now()
-        recent_window = now - timedelta(minutes=QR_LOGIN_RATE_LIMIT_WINDOW_MINUTES)
-        recent_attempts_count = (
-            db.query(LoginAttempt)
-            .filter(
-                LoginAttempt.ip_address == ip_address,
-                LoginAttempt.created_at >= recent_window,
-            )
-            .count()
-        )
-        
-        if recent_attempts_count >= QR_LOGIN_MAX_ATTEMPTS_PER_IP:
-            raise APIError(
-                code="AUTH_QR_RATE_LIMIT",
-                http_code=429,
-                message="Слишком много попыток входа. Попробуйте позже.",
-            )
-    
+
+    # Лимит попыток с одного IP проверяется до вызова — зависимостью
+    # rate_limit(QR_INIT_POLICY) в routes_telegram_qr.
+
     login_token = _generate_login_token()
     now = _utc_now()
     expires_at = now + timedelta(seconds=QR_LOGIN_TOKEN_TTL_SECONDS)
@@ -640,7 +676,7 @@ def confirm_qr_login(
     first_name: str | None,
     last_name: str | None,
     photo_url: str | None,
-) -> None:
+) -> str:
     from app.core.auth.models import LoginAttempt
     
     attempt = (
@@ -684,18 +720,12 @@ def confirm_qr_login(
                 message="Имя пользователя обязательно для регистрации",
             )
         
-        email = f"{telegram_id}@bot.mechta.ai"
-        password = _generate_strong_password()
-        payload = UserCreate(
-            email=email,
-            password=password,
+        user = _create_telegram_user(
+            db,
+            telegram_id=telegram_id,
             first_name=first_name,
             last_name=last_name,
         )
-        user = create_user(db, payload)
-        user.is_active = True
-        user.telegram_id = telegram_id
-        db.add(user)
         db.flush()
     else:
         updated = False
@@ -721,6 +751,7 @@ def confirm_qr_login(
     attempt.confirmed_at = now
     
     db.add(attempt)
+    return one_time_secret
 
 
 def exchange_qr_secret_for_tokens(
@@ -803,18 +834,9 @@ def exchange_qr_secret_for_tokens(
 
 
 def cleanup_expired_qr_login_attempts(db: Session) -> int:
-    from app.core.auth.models import LoginAttempt
-    
-    cutoff_time = _utc_now() - timedelta(seconds=QR_LOGIN_TOKEN_TTL_SECONDS * 2)
-    
-    count = (
-        db.query(LoginAttempt)
-        .filter(LoginAttempt.created_at < cutoff_time)
-        .delete(synchronize_session=False)
-    )
-    
-    db.commit()
-    return count
+    from app.core.retention.services import purge_table
+
+    return purge_table(db, "login_attempts").rows_removed
 
 
 __all__ = [
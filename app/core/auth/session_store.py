@@ -0,0 +1,386 @@
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set
+
+from loguru import logger
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.auth.models import User, UserSession
+from app.core.config import settings
+from app.utils.redis_client import get_redis
+
+
+SESSION_KEY_PREFIX = "session:"
+USER_SESSIONS_KEY_PREFIX = "session:user:"
+REVOKED_BEFORE_KEY_PREFIX = "session:revoked_before:"
+SESSION_DIRTY_KEY = "session:dirty"
+
+# Члены dirty-множества: "s:{session_id}" — записать сессию в user_sessions,
+# "u:{user_id}" — отозвать в user_sessions все сессии пользователя,
+# созданные до отметки `session:revoked_before:{user_id}`.
+_DIRTY_SESSION = "s:"
+_DIRTY_USER = "u:"
+
+_FIELDS = (
+    "user_id",
+    "refresh_token_id",
+    "user_agent",
+    "ip_address",
+    "device_name",
+    "created_at",
+    "expires_at",
+    "revoked_at",
+)
+
+# KEYS[1] — hash сессии, KEYS[2] — dirty-множество; ARGV: revoked_at, член dirty.
+# Возвращает 0, если сессии в Redis нет.
+_REVOKE_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+  return 0
+end
+if redis.call('HGET', KEYS[1], 'revoked_at') == '' then
+  redis.call('HSET', KEYS[1], 'revoked_at', ARGV[1])
+  redis.call('SADD', KEYS[2], ARGV[2])
+end
+return 1
+"""
+
+# KEYS[1] — множество сессий пользователя, KEYS[2] — dirty-множество,
+# KEYS[3] — отметка revoked_before; ARGV: revoked_at, префикс ключа сессии,
+# член dirty для пользователя, ttl отметки.
+_REVOKE_ALL_LUA = """
+local ids = redis.call('SMEMBERS', KEYS[1])
+for _, sid in ipairs(ids) do
+  local key = ARGV[2] .. sid
+  if redis.call('EXISTS', key) == 1 then
+    if redis.call('HGET', key, 'revoked_at') == '' then
+      redis.call('HSET', key, 'revoked_at', ARGV[1])
+      redis.call('SADD', KEYS[2], 's:' .. sid)
+    end
+  else
+    redis.call('SREM', KEYS[1], sid)
+  end
+end
+redis.call('SET', KEYS[3], ARGV[1], 'EX', ARGV[4])
+redis.call('SADD', KEYS[2], ARGV[3])
+return #ids
+"""
+
+
+@dataclass
+class SessionRecord:
+    id: uuid.UUID
+    user_id: uuid.UUID
+    refresh_token_id: str
+    created_at: datetime
+    expires_at: datetime
+    revoked_at: Optional[datetime] = None
+    user_agent: Optional[str] = None
+    ip_address: Optional[str] = None
+    device_name: Optional[str] = None
+
+    def to_model(self) -> UserSession:
+        """
+        Несвязанный с БД `UserSession` с теми же полями — для кода,
+        который работает с моделью (выдача токенов, кеш principal).
+        """
+        return UserSession(
+            id=self.id,
+            user_id=self.user_id,
+            refresh_token_id=self.refresh_token_id,
+            user_agent=self.user_agent,
+            ip_address=self.ip_address,
+            device_name=self.device_name,
+            created_at=self.created_at,
+            expires_at=self.expires_at,
+            revoked_at=self.revoked_at,
+        )
+
+
+def enabled() -> bool:
+    return settings.session_store_backend == "redis"
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _session_key(session_id: uuid.UUID | str) -> str:
+    return f"{SESSION_KEY_PREFIX}{session_id}"
+
+
+def _dump(record: SessionRecord) -> Dict[str, str]:
+    def _dt(value: Optional[datetime]) -> str:
+        return value.isoformat() if value is not None else ""
+
+    return {
+        "user_id": str(record.user_id),
+        "refresh_token_id": record.refresh_token_id,
+        "user_agent": record.user_agent or "",
+        "ip_address": record.ip_address or "",
+        "device_name": record.device_name or "",
+        "created_at": _dt(record.created_at),
+        "expires_at": _dt(record.expires_at),
+        "revoked_at": _dt(record.revoked_at),
+    }
+
+
+def _load(session_id: uuid.UUID, data: Dict[str, str]) -> Optional[SessionRecord]:
+    if not data or any(field not in data for field in _FIELDS):
+        return None
+    try:
+        return SessionRecord(
+            id=session_id,
+            user_id=uuid.UUID(data["user_id"]),
+            refresh_token_id=data["refresh_token_id"],
+            created_at=datetime.fromisoformat(data["created_at"]),
+            expires_at=datetime.fromisoformat(data["expires_at"]),
+            revoked_at=(
+                datetime.fromisoformat(data["revoked_at"])
+                if data["revoked_at"]
+                else None
+            ),
+            user_agent=data["user_agent"] or None,
+            ip_address=data["ip_address"] or None,
+            device_name=data["device_name"] or None,
+        )
+    except ValueError:
+        return None
+
+
+def create_session(
+    *,
+    user_id: uuid.UUID,
+    refresh_token_id: str,
+    expires_at: datetime,
+    user_agent: Optional[str] = None,
+    ip_address: Optional[str] = None,
+    device_name: Optional[str] = None,
+) -> Optional[SessionRecord]:
+    """
+    Создаёт сессию в Redis и ставит её в очередь на запись в `user_sessions`.
+    `None` — Redis недоступен, сессию нужно создать в БД.
+    """
+    now = _utc_now()
+    record = SessionRecord(
+        id=uuid.uuid4(),
+        user_id=user_id,
+        refresh_token_id=refresh_token_id,
+        created_at=now,
+        expires_at=expires_at,
+        user_agent=user_agent,
+        ip_address=ip_address,
+        device_name=device_name,
+    )
+    ttl = max(int((expires_at - now).total_seconds()), 1)
+    user_key = f"{USER_SESSIONS_KEY_PREFIX}{user_id}"
+    try:
+        pipe = get_redis().pipeline()
+        pipe.hset(_session_key(record.id), mapping=_dump(record))
+        pipe.expire(_session_key(record.id), ttl)
+        pipe.sadd(user_key, str(record.id))
+        pipe.expire(user_key, ttl)
+        pipe.sadd(SESSION_DIRTY_KEY, f"{_DIRTY_SESSION}{record.id}")
+        pipe.execute()
+    except Exception as exc:
+        logger.warning("Session store unavailable", error=str(exc))
+        return None
+    return record
+
+
+def get_session(session_id: uuid.UUID) -> Optional[SessionRecord]:
+    try:
+        data = get_redis().hgetall(_session_key(session_id))
+    except Exception:
+        return None
+    return _load(session_id, data)
+
+
+def revoked_before(user_id: uuid.UUID) -> Optional[datetime]:
+    try:
+        raw = get_redis().get(f"{REVOKED_BEFORE_KEY_PREFIX}{user_id}")
+    except Exception:
+        return None
+    try:
+        return datetime.fromisoformat(raw) if raw else None
+    except ValueError:
+        return None
+
+
+def load_session(db: Session, session_id: uuid.UUID) -> Optional[UserSession]:
+    """
+    Сессия по id: из Redis, если включено хранилище и сессия там есть,
+    иначе из `user_sessions`.
+
+    Для строк из БД учитывается отметка «выйти везде»: в таблицу она
+    попадает с задержкой записи, а отказать нужно сразу.
+    """
+    if not enabled():
+        return db.query(UserSession).filter(UserSession.id == session_id).first()
+
+    record = get_session(session_id)
+    if record is not None:
+        return record.to_model()
+
+    session_obj = db.query(UserSession).filter(UserSession.id == session_id).first()
+    if session_obj is not None and session_obj.revoked_at is None:
+        cutoff = revoked_before(session_obj.user_id)
+        if cutoff is not None and session_obj.created_at <= cutoff:
+            session_obj.revoked_at = cutoff
+    return session_obj
+
+
+def revoke_session(session_id: uuid.UUID) -> bool:
+    """
+    Отзывает сессию в Redis. `False` — сессии там нет (или Redis недоступен),
+    отзывать нужно в БД.
+    """
+    try:
+        found = get_redis().eval(
+            _REVOKE_LUA,
+            2,
+            _session_key(session_id),
+            SESSION_DIRTY_KEY,
+            _utc_now().isoformat(),
+            f"{_DIRTY_SESSION}{session_id}",
+        )
+    except Exception as exc:
+        logger.warning("Session store unavailable", error=str(exc))
+        return False
+    return bool(found)
+
+
+def revoke_all_sessions(user_id: uuid.UUID) -> bool:
+    """
+    «Выйти везде» одним вызовом Redis: отзывает сессии пользователя в Redis
+    и ставит отметку, по которой отказываются и сессии, известные только БД.
+    """
+    try:
+        get_redis().eval(
+            _REVOKE_ALL_LUA,
+            3,
+            f"{USER_SESSIONS_KEY_PREFIX}{user_id}",
+            SESSION_DIRTY_KEY,
+            f"{REVOKED_BEFORE_KEY_PREFIX}{user_id}",
+            _utc_now().isoformat(),
+            SESSION_KEY_PREFIX,
+            f"{_DIRTY_USER}{user_id}",
+            settings.refresh_token_expire_days * 24 * 60 * 60,
+        )
+    except Exception as exc:
+        logger.warning("Session store unavailable", error=str(exc))
+        return False
+    return True
+
+
+def flush_dirty_sessions(db: Session, batch_size: Optional[int] = None) -> int:
+    """
+    Переносит изменённые сессии из Redis в `user_sessions` (upsert пачкой)
+    и применяет отметки «выйти везде». При ошибке пачка возвращается в очередь.
+    Возвращает число обработанных элементов очереди.
+    """
+    batch_size = batch_size or settings.session_store_flush_batch_size
+    redis = get_redis()
+    members: List[str] = redis.spop(SESSION_DIRTY_KEY, batch_size) or []
+    if not members:
+        return 0
+
+    session_ids = [
+        uuid.UUID(m[len(_DIRTY_SESSION):])
+        for m in members
+        if m.startswith(_DIRTY_SESSION)
+    ]
+    user_ids = [
+        uuid.UUID(m[len(_DIRTY_USER):])
+        for m in members
+        if m.startswith(_DIRTY_USER)
+    ]
+
+    try:
+        pipe = redis.pipeline()
+        for session_id in session_ids:
+            pipe.hgetall(_session_key(session_id))
+        records = [
+            record
+            for record in (
+                _load(session_id, data)
+                for session_id, data in zip(session_ids, pipe.execute())
+            )
+            if record is not None
+        ]
+
+        # Сессии удалённых пользователей пропускаем, иначе FK уронит всю пачку.
+        existing: Set[uuid.UUID] = set()
+        if records:
+            user_filter = User.id.in_({record.user_id for record in records})
+            existing = {row[0] for row in db.query(User.id).filter(user_filter)}
+        rows = [
+            {
+                "id": record.id,
+                "user_id": record.user_id,
+                "refresh_token_id": record.refresh_token_id,
+                "user_agent": record.user_agent,
+                "ip_address": record.ip_address,
+                "device_name": record.device_name,
+                "created_at": record.created_at,
+                "expires_at": record.expires_at,
+                "revoked_at": record.revoked_at,
+            }
+            for record in records
+            if record.user_id in existing
+        ]
+        if rows:
+            stmt = insert(UserSession).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[UserSession.id],
+                set_={
+                    "refresh_token_id": stmt.excluded.refresh_token_id,
+                    "expires_at": stmt.excluded.expires_at,
+                    "revoked_at": func.coalesce(
+                        UserSession.revoked_at,
+                        stmt.excluded.revoked_at,
+                    ),
+                },
+            )
+            db.execute(stmt)
+
+        for user_id in user_ids:
+            cutoff = revoked_before(user_id)
+            if cutoff is None:
+                continue
+            (
+                db.query(UserSession)
+                .filter(
+                    UserSession.user_id == user_id,
+                    UserSession.revoked_at.is_(None),
+                    UserSession.created_at <= cutoff,
+                )
+                .update({"revoked_at": cutoff}, synchronize_session=False)
+            )
+        db.commit()
+    except Exception:
+        db.rollback()
+        try:
+            redis.sadd(SESSION_DIRTY_KEY, *members)
+        except Exception:
+            pass
+        raise
+    return len(members)
+
+
+__all__ = [
+    "SessionRecord",
+    "create_session",
+    "enabled",
+    "flush_dirty_sessions",
+    "get_session",
+    "load_session",
+    "revoke_all_sessions",
+    "revoke_session",
+    "revoked_before",
+]
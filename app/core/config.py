@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from typing import Dict, Optional
+
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -22,6 +24,17 @@ class Settings(BaseSettings):
         "redis://localhost:6379/0",
         env="CELERY_BROKER_URL",
     )
+    celery_pool: str = Field("auto", env="CELERY_POOL")
+    celery_queues: str = Field("", env="CELERY_QUEUES")
+    celery_concurrency: Optional[int] = Field(None, env="CELERY_CONCURRENCY")
+    celery_autoscale_min: int = Field(1, env="CELERY_AUTOSCALE_MIN")
+    celery_autoscale_max: Optional[int] = Field(None, env="CELERY_AUTOSCALE_MAX")
+    celery_max_tasks_per_child: Optional[int] = Field(
+        None,
+        env="CELERY_MAX_TASKS_PER_CHILD",
+    )
+    single_flight_ttl_seconds: int = Field(180, env="SINGLE_FLIGHT_TTL_SECONDS")
+    celery_prefetch_multiplier: int = Field(1, env="CELERY_PREFETCH_MULTIPLIER")
     ai_proxy_url: str = Field(
         "http://localhost:8787/v1/chat",
         env="AI_PROXY_URL",
@@ -34,6 +47,65 @@ class Settings(BaseSettings):
         "gpt-4o-mini",
         env="AI_PROXY_MODEL",
     )
+    ai_proxy_connect_timeout_seconds: float = Field(
+        5.0,
+        env="AI_PROXY_CONNECT_TIMEOUT_SECONDS",
+    )
+    ai_proxy_mode_timeouts: Dict[str, float] = Field(
+        default_factory=dict,
+        env="AI_PROXY_MODE_TIMEOUTS",
+    )
+    ai_proxy_max_connections: int = Field(
+        20,
+        env="AI_PROXY_MAX_CONNECTIONS",
+    )
+    ai_proxy_max_keepalive_connections: int = Field(
+        10,
+        env="AI_PROXY_MAX_KEEPALIVE_CONNECTIONS",
+    )
+    ai_proxy_keepalive_expiry_seconds: float = Field(
+        60.0,
+        env="AI_PROXY_KEEPALIVE_EXPIRY_SECONDS",
+    )
+    ai_proxy_http2: bool = Field(
+        False,
+        env="AI_PROXY_HTTP2",
+    )
+    ai_guard_enabled: bool = Field(True, env="AI_GUARD_ENABLED")
+    ai_guard_min_concurrency: int = Field(2, env="AI_GUARD_MIN_CONCURRENCY")
+    ai_guard_max_concurrency: int = Field(64, env="AI_GUARD_MAX_CONCURRENCY")
+    ai_guard_initial_concurrency: int = Field(
+        16,
+        env="AI_GUARD_INITIAL_CONCURRENCY",
+    )
+    ai_guard_latency_target_ms: float = Field(
+        30_000,
+        env="AI_GUARD_LATENCY_TARGET_MS",
+    )
+    ai_guard_decrease_factor: float = Field(0.7, env="AI_GUARD_DECREASE_FACTOR")
+    ai_guard_acquire_timeout_seconds: float = Field(
+        5.0,
+        env="AI_GUARD_ACQUIRE_TIMEOUT_SECONDS",
+    )
+    ai_guard_window_seconds: int = Field(30, env="AI_GUARD_WINDOW_SECONDS")
+    ai_guard_min_calls: int = Field(10, env="AI_GUARD_MIN_CALLS")
+    ai_guard_failure_threshold: float = Field(
+        0.5,
+        env="AI_GUARD_FAILURE_THRESHOLD",
+    )
+    ai_guard_open_seconds: int = Field(30, env="AI_GUARD_OPEN_SECONDS")
+    ai_prompt_budgets: Dict[str, int] = Field(
+        default_factory=dict,
+        env="AI_PROMPT_BUDGETS",
+    )
+    ai_hedge_modes: str = Field("", env="AI_HEDGE_MODES")
+    ai_hedge_percentile: float = Field(0.95, env="AI_HEDGE_PERCENTILE")
+    ai_hedge_min_samples: int = Field(50, env="AI_HEDGE_MIN_SAMPLES")
+    ai_hedge_budget_ratio: float = Field(0.05, env="AI_HEDGE_BUDGET_RATIO")
+    ai_cache_enabled: bool = Field(True, env="AI_CACHE_ENABLED")
+    ai_cache_ttl_seconds: int = Field(7 * 24 * 60 * 60, env="AI_CACHE_TTL_SECONDS")
+    ai_cache_max_entries: int = Field(10_000, env="AI_CACHE_MAX_ENTRIES")
+    ai_cache_max_value_bytes: int = Field(256 * 1024, env="AI_CACHE_MAX_VALUE_BYTES")
     wants_ai_system_prompt_path: str = Field(
         "app/core/wants/prompts/diagnose_wants_system.txt",
         env="WANTS_AI_SYSTEM_PROMPT_PATH",
@@ -54,6 +126,95 @@ class Settings(BaseSettings):
         "app/core/rituals/prompts/weekly_review_system.txt",
         env="WEEKLY_REVIEW_SYSTEM_PROMPT_PATH",
     )
+    wants_ws_flush_interval_seconds: float = Field(
+        1.0,
+        env="WANTS_WS_FLUSH_INTERVAL_SECONDS",
+    )
+    wants_ws_flush_max_ops: int = Field(20, env="WANTS_WS_FLUSH_MAX_OPS")
+    prompt_reload_check_seconds: float = Field(
+        5.0,
+        env="PROMPT_RELOAD_CHECK_SECONDS",
+    )
+    password_hash_rounds: Optional[int] = Field(None, env="PASSWORD_HASH_ROUNDS")
+    password_hash_workers: Optional[int] = Field(None, env="PASSWORD_HASH_WORKERS")
+    password_hash_queue_size: int = Field(32, env="PASSWORD_HASH_QUEUE_SIZE")
+    password_hash_timeout_seconds: float = Field(
+        10.0,
+        env="PASSWORD_HASH_TIMEOUT_SECONDS",
+    )
+    principal_cache_enabled: bool = Field(True, env="PRINCIPAL_CACHE_ENABLED")
+    principal_cache_ttl_seconds: int = Field(300, env="PRINCIPAL_CACHE_TTL_SECONDS")
+    principal_cache_local_ttl_seconds: int = Field(
+        30,
+        env="PRINCIPAL_CACHE_LOCAL_TTL_SECONDS",
+    )
+    principal_cache_local_max_entries: int = Field(
+        10_000,
+        env="PRINCIPAL_CACHE_LOCAL_MAX_ENTRIES",
+    )
+    session_store_backend: str = Field("db", env="SESSION_STORE_BACKEND")
+    session_store_flush_interval_seconds: int = Field(
+        10,
+        env="SESSION_STORE_FLUSH_INTERVAL_SECONDS",
+    )
+    session_store_flush_batch_size: int = Field(
+        500,
+        env="SESSION_STORE_FLUSH_BATCH_SIZE",
+    )
+    pagination_count_cache_ttl_seconds: int = Field(
+        60,
+        env="PAGINATION_COUNT_CACHE_TTL_SECONDS",
+    )
+    pagination_exact_count_limit: int = Field(
+        100_000,
+        env="PAGINATION_EXACT_COUNT_LIMIT",
+    )
+    quota_flush_interval_seconds: int = Field(30, env="QUOTA_FLUSH_INTERVAL_SECONDS")
+    quota_flush_batch_size: int = Field(500, env="QUOTA_FLUSH_BATCH_SIZE")
+    retention_interval_seconds: int = Field(3600, env="RETENTION_INTERVAL_SECONDS")
+    retention_batch_size: int = Field(1000, env="RETENTION_BATCH_SIZE")
+    retention_batch_pause_seconds: float = Field(
+        0.2,
+        env="RETENTION_BATCH_PAUSE_SECONDS",
+    )
+    retention_max_batches: int = Field(500, env="RETENTION_MAX_BATCHES")
+    retention_session_grace_days: int = Field(
+        30,
+        env="RETENTION_SESSION_GRACE_DAYS",
+    )
+    esoterics_tip_pool_variants: int = Field(3, env="ESOTERICS_TIP_POOL_VARIANTS")
+    esoterics_tip_pool_ttl_seconds: int = Field(
+        14 * 24 * 60 * 60,
+        env="ESOTERICS_TIP_POOL_TTL_SECONDS",
+    )
+    esoterics_tip_pool_temperature: float = Field(
+        0.8,
+        env="ESOTERICS_TIP_POOL_TEMPERATURE",
+    )
+    esoterics_tip_pool_hour_utc: int = Field(
+        2,
+        env="ESOTERICS_TIP_POOL_HOUR_UTC",
+    )
+    esoterics_tip_pool_max_retries: int = Field(
+        3,
+        env="ESOTERICS_TIP_POOL_MAX_RETRIES",
+    )
+    esoterics_tip_pool_task_time_limit_seconds: int = Field(
+        180,
+        env="ESOTERICS_TIP_POOL_TASK_TIME_LIMIT_SECONDS",
+    )
+    esoterics_ephemeris_path: str = Field(
+        "",
+        env="ESOTERICS_EPHEMERIS_PATH",
+    )
+    esoterics_ephemeris_start_year: int = Field(
+        2020,
+        env="ESOTERICS_EPHEMERIS_START_YEAR",
+    )
+    esoterics_ephemeris_end_year: int = Field(
+        2040,
+        env="ESOTERICS_EPHEMERIS_END_YEAR",
+    )
     ai_proxy_image_url: str = Field(
         "http://localhost:8787/v1/images",
         env="AI_PROXY_IMAGE_URL",
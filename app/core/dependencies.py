@@ -1,12 +1,15 @@
 from __future__ import annotations
 
 import uuid
+from datetime import datetime, timezone
 from typing import Generator
 
 from fastapi import Depends, Header
 from sqlalchemy.orm import Session
 
-from app.core.auth.models import User, UserSession
+from app.core.auth.models import User
+from app.core.auth.principal_cache import attach_user, get_principal, put_principal
+from app.core.auth.session_store import load_session
 from app.core.security import decode_token
 from app.database.session import SessionLocal
 from app.response.response import APIError
@@ -20,6 +23,28 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+def _check_principal(
+    *,
+    is_active: bool,
+    revoked: bool,
+    expires_at: datetime,
+) -> None:
+    if not is_active:
+        raise APIError(
+            code="AUTH_USER_INACTIVE",
+            http_code=403,
+            message="Пользователь деактивирован",
+        )
+
+    now = datetime.now(timezone.utc)
+    if revoked or expires_at <= now:
+        raise APIError(
+            code="AUTH_SESSION_REVOKED",
+            http_code=401,
+            message="Сессия завершена",
+        )
+
+
 def get_current_user(
     authorization: str | None = Header(default=None, alias="Authorization"),
     db: Session = Depends(get_db),
@@ -47,6 +72,14 @@ def get_current_user(
             message="Ожидается схема авторизации Bearer",
         )
 
+    return authenticate_access_token(db, token)
+
+
+def authenticate_access_token(db: Session, token: str) -> User:
+    """
+    Пользователь по access-токену (без заголовка): общая часть
+    `get_current_user` и WebSocket-эндпоинтов, где токен приходит сообщением.
+    """
     try:
         payload = decode_token(token)
     except Exception:
@@ -76,6 +109,15 @@ def get_current_user(
             message="Некорректный payload токена",
         )
 
+    principal = get_principal(session_id)
+    if principal is not None and principal.user_id == user_id:
+        _check_principal(
+            is_active=bool(principal.user_fields.get("is_active")),
+            revoked=principal.session_revoked,
+            expires_at=principal.session_expires_at,
+        )
+        return attach_user(db, principal)
+
     user = db.query(User).filter(User.id == user_id).first()
     if user is None:
         raise APIError(
@@ -84,18 +126,7 @@ def get_current_user(
             message="Пользователь не найден",
         )
 
-    if not user.is_active:
-        raise APIError(
-            code="AUTH_USER_INACTIVE",
-            http_code=403,
-            message="Пользователь деактивирован",
-        )
-
-    session_obj = (
-        db.query(UserSession)
-        .filter(UserSession.id == session_id)
-        .first()
-    )
+    session_obj = load_session(db, session_id)
     if session_obj is None:
         raise APIError(
             code="AUTH_SESSION_NOT_FOUND",
@@ -103,16 +134,12 @@ def get_current_user(
             message="Сессия не найдена",
         )
 
-    from datetime import datetime, timezone
-
-    now = datetime.now(timezone.utc)
-    if session_obj.revoked_at is not None or session_obj.expires_at <= now:
-        raise APIError(
-            code="AUTH_SESSION_REVOKED",
-            http_code=401,
-            message="Сессия завершена",
-        )
-
+    put_principal(user, session_obj)
+    _check_principal(
+        is_active=user.is_active,
+        revoked=session_obj.revoked_at is not None,
+        expires_at=session_obj.expires_at,
+    )
     return user
 
 
@@ -128,4 +155,9 @@ def get_current_admin(
     return user
 
 
-__all__ = ["get_db", "get_current_user", "get_current_admin"]
+__all__ = [
+    "authenticate_access_token",
+    "get_db",
+    "get_current_user",
+    "get_current_admin",
+]
@@ -7,9 +7,15 @@ from sqlalchemy.orm import Session
 
 from app.core.auth.models import User
 from app.core.dependencies import get_current_user, get_db
-from app.core.esoterics.schemas import DailyEnergyResponse
+from app.core.esoterics.schemas import (
+    DailyEnergyResponse,
+    MoonCalendarResponse,
+    MoonDay,
+)
 from app.core.esoterics.services import (
     calculate_moon,
+    calculate_moon_month,
+    calculate_moon_year,
     calculate_numerology,
     get_daily_tip,
 )
@@ -52,4 +58,26 @@ def get_daily_energy_view(
     return make_success_response(result=response.model_dump(mode="json"))
 
 
+@router.get(
+    "/moon",
+    response_model=StandardResponse,
+    summary="Лунный календарь на месяц или год",
+)
+def get_moon_calendar_view(
+    year: int = Query(..., ge=1900, le=2100),
+    month: int | None = Query(default=None, ge=1, le=12),
+    user: User = Depends(get_current_user),
+) -> StandardResponse:
+    if month is None:
+        days = calculate_moon_year(year)
+    else:
+        days = calculate_moon_month(year, month)
+    response = MoonCalendarResponse(
+        year=year,
+        month=month,
+        days=[MoonDay(date=day, moon=moon) for day, moon in days],
+    )
+    return make_success_response(result=response.model_dump(mode="json"))
+
+
 __all__ = ["router"]
@@ -0,0 +1,55 @@
+"""
+Сравнение расчёта фазы Луны: astral на каждый вызов vs предрасчитанная таблица.
+
+Запуск: python -m app.core.esoterics.benchmark [--days 3650] [--repeat 5]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import date, timedelta
+from typing import Callable, List
+
+from app.core.esoterics.ephemeris import MoonEphemeris, compute_moon
+
+
+def _best_of(repeat: int, func: Callable[[], None]) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--start", type=date.fromisoformat, default=date(2020, 1, 1))
+    parser.add_argument("--days", type=int, default=3650)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    dates: List[date] = [args.start + timedelta(days=i) for i in range(args.days)]
+    last = dates[-1]
+
+    started = time.perf_counter()
+    ephemeris = MoonEphemeris.build(args.start.year, last.year)
+    build_seconds = time.perf_counter() - started
+
+    mismatches = sum(1 for d in dates if ephemeris.lookup(d) != compute_moon(d))
+
+    astral_seconds = _best_of(args.repeat, lambda: [compute_moon(d) for d in dates])
+    table_seconds = _best_of(args.repeat, lambda: [ephemeris.lookup(d) for d in dates])
+
+    per_call_astral = astral_seconds / len(dates) * 1e6
+    per_call_table = table_seconds / len(dates) * 1e6
+    print(f"dates:          {len(dates)} ({args.start}..{last})")
+    print(f"table build:    {build_seconds * 1000:.1f} ms, {ephemeris.days * 3} bytes")
+    print(f"astral:         {per_call_astral:.2f} us/call")
+    print(f"ephemeris:      {per_call_table:.2f} us/call")
+    print(f"speedup:        {per_call_astral / max(per_call_table, 1e-9):.1f}x")
+    print(f"mismatches:     {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from datetime import date, timedelta
+from typing import Iterator, Optional, Tuple
+
+from astral import moon
+from loguru import logger
+
+from app.core.config import settings
+from app.core.esoterics.schemas import MoonPhaseEnum
+
+
+SYNODIC_MONTH = 29.530588853
+
+# Порядок фаз фиксирован: индекс фазы хранится в таблице одним байтом.
+PHASE_ORDER: Tuple[MoonPhaseEnum, ...] = (
+    MoonPhaseEnum.NEW_MOON,
+    MoonPhaseEnum.WAXING_CRESCENT,
+    MoonPhaseEnum.FIRST_QUARTER,
+    MoonPhaseEnum.WAXING_GIBBOUS,
+    MoonPhaseEnum.FULL_MOON,
+    MoonPhaseEnum.WANING_GIBBOUS,
+    MoonPhaseEnum.LAST_QUARTER,
+    MoonPhaseEnum.WANING_CRESCENT,
+)
+
+# Формат файла: magic, ordinal первого дня, число дней; затем `days` байт
+# индексов фаз и `days` значений освещённости (uint16, десятые доли процента).
+FILE_MAGIC = b"MEPH"
+FILE_HEADER = struct.Struct("<4sII")
+
+
+def moon_from_age(moon_age: float) -> Tuple[MoonPhaseEnum, float]:
+    """
+    Фаза и освещённость (в процентах) по возрасту Луны в днях.
+    """
+    if moon_age < 1.0 or moon_age > 28.5:
+        phase = MoonPhaseEnum.NEW_MOON
+    elif moon_age < 6.4:
+        phase = MoonPhaseEnum.WAXING_CRESCENT
+    elif moon_age < 8.4:
+        phase = MoonPhaseEnum.FIRST_QUARTER
+    elif moon_age < 13.8:
+        phase = MoonPhaseEnum.WAXING_GIBBOUS
+    elif moon_age < 15.8:
+        phase = MoonPhaseEnum.FULL_MOON
+    elif moon_age < 21.1:
+        phase = MoonPhaseEnum.WANING_GIBBOUS
+    elif moon_age < 23.1:
+        phase = MoonPhaseEnum.LAST_QUARTER
+    else:
+        phase = MoonPhaseEnum.WANING_CRESCENT
+
+    illumination = (
+        (1 - math.cos((moon_age * 2 * math.pi) / SYNODIC_MONTH)) / 2 * 100
+    )
+    return phase, round(illumination, 1)
+
+
+def compute_moon(target_date: date) -> Tuple[MoonPhaseEnum, float]:
+    return moon_from_age(moon.phase(target_date))
+
+
+class MoonEphemeris:
+    """
+    Таблица фаз Луны по дням: O(1) поиск по дате, 3 байта на день.
+
+    `phases` — индекс фазы в `PHASE_ORDER`, `illumination` — десятые доли
+    процента. Оба буфера могут быть как `array`, так и memoryview над
+    memory-mapped файлом.
+    """
+
+    def __init__(self, first_ordinal: int, phases, illumination) -> None:
+        self.first_ordinal = first_ordinal
+        self.phases = phases
+        self.illumination = illumination
+        self.days = len(phases)
+
+    @property
+    def first_date(self) -> date:
+        return date.fromordinal(self.first_ordinal)
+
+    @property
+    def last_date(self) -> date:
+        return date.fromordinal(self.first_ordinal + self.days - 1)
+
+    def covers(self, target_date: date) -> bool:
+        offset = target_date.toordinal() - self.first_ordinal
+        return 0 <= offset < self.days
+
+    def lookup(self, target_date: date) -> Optional[Tuple[MoonPhaseEnum, float]]:
+        offset = target_date.toordinal() - self.first_ordinal
+        if offset < 0 or offset >= self.days:
+            return None
+        return PHASE_ORDER[self.phases[offset]], self.illumination[offset] / 10
+
+    @classmethod
+    def build(cls, start_year: int, end_year: int) -> "MoonEphemeris":
+        first = date(start_year, 1, 1)
+        last = date(end_year, 12, 31)
+        days = last.toordinal() - first.toordinal() + 1
+        phase_index = {phase: idx for idx, phase in enumerate(PHASE_ORDER)}
+        phases = array("B", bytes(days))
+        illumination = array("H", bytes(2 * days))
+        for offset in range(days):
+            phase, illum = compute_moon(first + timedelta(days=offset))
+            phases[offset] = phase_index[phase]
+            illumination[offset] = int(round(illum * 10))
+        return cls(first.toordinal(), phases, illumination)
+
+    def write(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as handle:
+            handle.write(FILE_HEADER.pack(FILE_MAGIC, self.first_ordinal, self.days))
+            handle.write(bytes(self.phases))
+            illumination = array("H", self.illumination)
+            if sys.byteorder != "little":
+                illumination.byteswap()
+            handle.write(illumination.tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "MoonEphemeris":
+        with open(path, "rb") as handle:
+            buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(buffer)
+        magic, first_ordinal, days = FILE_HEADER.unpack_from(view, 0)
+        if magic != FILE_MAGIC:
+            raise ValueError(f"{path} is not a moon ephemeris file")
+        offset = FILE_HEADER.size
+        phases = view[offset:offset + days]
+        offset += days
+        raw_illumination = view[offset:offset + 2 * days]
+        if sys.byteorder == "little":
+            illumination = raw_illumination.cast("H")
+        else:
+            illumination = array("H", raw_illumination.tobytes())
+            illumination.byteswap()
+        if len(phases) != days or len(illumination) != days:
+            raise ValueError(f"{path} is truncated")
+        return cls(first_ordinal, phases, illumination)
+
+
+_ephemeris: Optional[MoonEphemeris] = None
+_ephemeris_failed = False
+_ephemeris_lock = threading.Lock()
+
+
+def _load_ephemeris() -> Optional[MoonEphemeris]:
+    path = settings.esoterics_ephemeris_path
+    if path and os.path.exists(path):
+        try:
+            return MoonEphemeris.load(path)
+        except (OSError, ValueError) as exc:
+            logger.warning("Failed to load moon ephemeris", path=path, error=str(exc))
+
+    start_year = settings.esoterics_ephemeris_start_year
+    end_year = settings.esoterics_ephemeris_end_year
+    if end_year < start_year:
+        return None
+    return MoonEphemeris.build(start_year, end_year)
+
+
+def get_ephemeris() -> Optional[MoonEphemeris]:
+    """
+    Таблица загружается один раз на процесс: из файла `ESOTERICS_EPHEMERIS_PATH`
+    (memory-mapped), иначе строится в памяти для настроенного диапазона лет.
+    """
+    global _ephemeris, _ephemeris_failed
+    if _ephemeris is not None or _ephemeris_failed:
+        return _ephemeris
+    with _ephemeris_lock:
+        if _ephemeris is None and not _ephemeris_failed:
+            try:
+                _ephemeris = _load_ephemeris()
+            except Exception as exc:
+                logger.warning("Failed to build moon ephemeris", error=str(exc))
+            _ephemeris_failed = _ephemeris is None
+    return _ephemeris
+
+
+def iter_dates(start: date, end: date) -> Iterator[date]:
+    for ordinal in range(start.toordinal(), end.toordinal() + 1):
+        yield date.fromordinal(ordinal)
+
+
+__all__ = [
+    "MoonEphemeris",
+    "compute_moon",
+    "get_ephemeris",
+    "iter_dates",
+    "moon_from_age",
+]
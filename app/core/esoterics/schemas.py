@@ -31,6 +31,17 @@ class NumerologyData(BaseModel):
     keywords: List[str]
 
 
+class MoonDay(BaseModel):
+    date: date
+    moon: MoonData
+
+
+class MoonCalendarResponse(BaseModel):
+    year: int
+    month: Optional[int] = None
+    days: List[MoonDay]
+
+
 class DailyEnergyResponse(BaseModel):
     date: date
     moon: MoonData
@@ -42,5 +53,7 @@ __all__ = [
     "MoonPhaseEnum",
     "MoonData",
     "NumerologyData",
+    "MoonDay",
+    "MoonCalendarResponse",
     "DailyEnergyResponse",
 ]
@@ -1,19 +1,23 @@
 from __future__ import annotations
 
-from datetime import date, datetime
-from typing import Dict, List, Optional
-from zoneinfo import ZoneInfo
+import calendar
+import hashlib
+import itertools
+from datetime import date
+from typing import Dict, Iterator, List, Optional, Tuple
 
-import math
 import httpx
-from astral import moon
 from redis import Redis
 from sqlalchemy.orm import Session
 
 from app.core.auth.models import User
 from app.core.config import settings
+from app.core.esoterics.ephemeris import compute_moon, get_ephemeris, iter_dates
 from app.core.esoterics.schemas import MoonData, MoonPhaseEnum, NumerologyData
 from app.response.response import APIError
+from app.utils.ai_client import get_ai_client
+from app.utils.ai_guard import AIUnavailableError
+from app.utils.prompts import prompt_registry
 from app.utils.redis_client import get_redis
 
 
@@ -64,45 +68,59 @@ NUMEROLOGY_MEANINGS: Dict[int, str] = {
 }
 
 
+TIP_POOL_KEY_PREFIX = "esoterics:tip_pool"
+# Пул обновляется заранее, пока до истечения TTL остаётся меньше этого запаса.
+TIP_POOL_REFRESH_MARGIN_SECONDS = 2 * 24 * 60 * 60
+
+
 def _reduce_to_digit(value: int) -> int:
     while value > 9:
         value = sum(int(d) for d in str(value))
     return value if value != 0 else 9
 
 
-def calculate_moon(target_date: date) -> MoonData:
-    moon_age = moon.phase(target_date)
-
-    if moon_age < 1.0 or moon_age > 28.5:
-        phase = MoonPhaseEnum.NEW_MOON
-    elif moon_age < 6.4:
-        phase = MoonPhaseEnum.WAXING_CRESCENT
-    elif moon_age < 8.4:
-        phase = MoonPhaseEnum.FIRST_QUARTER
-    elif moon_age < 13.8:
-        phase = MoonPhaseEnum.WAXING_GIBBOUS
-    elif moon_age < 15.8:
-        phase = MoonPhaseEnum.FULL_MOON
-    elif moon_age < 21.1:
-        phase = MoonPhaseEnum.WANING_GIBBOUS
-    elif moon_age < 23.1:
-        phase = MoonPhaseEnum.LAST_QUARTER
-    else:
-        phase = MoonPhaseEnum.WANING_CRESCENT
-
-    synodic_month = 29.530588853
-    illumination = (
-        (1 - math.cos((moon_age * 2 * math.pi) / synodic_month)) / 2 * 100
-    )
-
+def _make_moon_data(phase: MoonPhaseEnum, illumination: float) -> MoonData:
     return MoonData(
         phase=phase,
-        illumination=round(illumination, 1),
+        illumination=illumination,
         emoji=MOON_EMOJIS[phase],
         description=MOON_DESCRIPTIONS[phase],
     )
 
 
+def calculate_moon(target_date: date) -> MoonData:
+    """
+    Фаза Луны на дату: из предрасчитанной таблицы, вне её диапазона — через astral.
+    """
+    ephemeris = get_ephemeris()
+    entry = ephemeris.lookup(target_date) if ephemeris is not None else None
+    if entry is None:
+        entry = compute_moon(target_date)
+    return _make_moon_data(*entry)
+
+
+def calculate_moon_range(start: date, end: date) -> List[Tuple[date, MoonData]]:
+    if end < start:
+        return []
+    ephemeris = get_ephemeris()
+    result: List[Tuple[date, MoonData]] = []
+    for day in iter_dates(start, end):
+        entry = ephemeris.lookup(day) if ephemeris is not None else None
+        if entry is None:
+            entry = compute_moon(day)
+        result.append((day, _make_moon_data(*entry)))
+    return result
+
+
+def calculate_moon_month(year: int, month: int) -> List[Tuple[date, MoonData]]:
+    days_in_month = calendar.monthrange(year, month)[1]
+    return calculate_moon_range(date(year, month, 1), date(year, month, days_in_month))
+
+
+def calculate_moon_year(year: int) -> List[Tuple[date, MoonData]]:
+    return calculate_moon_range(date(year, 1, 1), date(year, 12, 31))
+
+
 def calculate_numerology(
     birth_date: date,
     target_date: date,
@@ -122,8 +140,9 @@ def calculate_numerology(
     )
 
 
-def _build_system_prompt() -> str:
-    return (
+_DAILY_TIP_PROMPT = prompt_registry.register_text(
+    "daily_tip",
+    (
         "Ты - эзотерический ментор. Твоя задача - дать короткий, емкий совет "
         "на день (максимум 2 предложения), основываясь на входных данных.\n\n"
         "Входные данные:\n"
@@ -133,15 +152,18 @@ def _build_system_prompt() -> str:
         "Тон: Вдохновляющий, но практичный. Без лишней мистики, ближе к психологии.\n"
         "Пример: \"Сегодня энергия убывающей луны совпадает с твоим днем анализа. "
         "Идеальное время, чтобы закрыть старые задачи и навести порядок на столе.\""
-    )
+    ),
+    template=True,
+)
 
 
 def _call_ai_tip(
     moon_phase_desc: str,
     personal_year: int,
     personal_day: int,
+    temperature: float = 0.4,
 ) -> str:
-    system_prompt = _build_system_prompt().format(
+    system_prompt = _DAILY_TIP_PROMPT.render(
         moon_phase_desc=moon_phase_desc,
         personal_year=personal_year,
         year_meaning=NUMEROLOGY_MEANINGS.get(personal_year, ""),
@@ -152,36 +174,10 @@ def _call_ai_tip(
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": "Сформируй совет."},
     ]
-    request_body = {
-        "model": settings.ai_proxy_model,
-        "messages": messages,
-        "temperature": 0.4,
-    }
-    with httpx.Client(timeout=settings.ai_proxy_timeout_seconds) as client:
-        response = client.post(settings.ai_proxy_url, json=request_body)
-    response.raise_for_status()
-    data = response.json()
-    content = data.get("content")
-    if not isinstance(content, str) or not content.strip():
-        raise ValueError("AI proxy returned empty content")
+    content = get_ai_client().chat(messages, mode="daily_tip", temperature=temperature)
     return content.strip()
 
 
-def _get_cache_ttl_seconds(
-    target_date: date,
-    user_tz: str,
-) -> int:
-    try:
-        tz = ZoneInfo(user_tz)
-    except Exception:
-        tz = ZoneInfo("UTC")
-    now = datetime.now(tz)
-    end_of_day = datetime.combine(target_date, datetime.max.time(), tzinfo=tz)
-    if end_of_day <= now:
-        return 60
-    return int((end_of_day - now).total_seconds())
-
-
 def _get_redis_client() -> Optional[Redis]:
     try:
         return get_redis()
@@ -217,6 +213,105 @@ def _save_tip_to_user_cache(
     db.refresh(user)
 
 
+def _tip_pool_key(
+    moon_phase: MoonPhaseEnum,
+    personal_year: int,
+    personal_day: int,
+) -> str:
+    return f"{TIP_POOL_KEY_PREFIX}:{moon_phase.value}:{personal_year}:{personal_day}"
+
+
+def iter_tip_pool_keys() -> Iterator[Tuple[MoonPhaseEnum, int, int]]:
+    """
+    Все комбинации (фаза Луны, личный год, личный день): 8 × 9 × 9 = 648.
+    """
+    return itertools.product(MoonPhaseEnum, range(1, 10), range(1, 10))
+
+
+def _load_tip_pool(
+    redis: Redis,
+    moon_phase: MoonPhaseEnum,
+    personal_year: int,
+    personal_day: int,
+) -> List[str]:
+    key = _tip_pool_key(moon_phase, personal_year, personal_day)
+    return [tip for tip in redis.lrange(key, 0, -1) if tip]
+
+
+def _pick_tip_variant(
+    variants: List[str],
+    user: User,
+    target_date: date,
+) -> str:
+    """
+    Детерминированный выбор варианта: один и тот же пользователь в один день
+    всегда видит один совет, разные пользователи — разные варианты.
+    """
+    seed = f"{user.id}:{target_date.isoformat()}".encode("utf-8")
+    index = int.from_bytes(hashlib.sha256(seed).digest()[:8], "big") % len(variants)
+    return variants[index]
+
+
+def _store_tip_pool(
+    redis: Redis,
+    moon_phase: MoonPhaseEnum,
+    personal_year: int,
+    personal_day: int,
+    variants: List[str],
+    *,
+    replace: bool,
+) -> None:
+    key = _tip_pool_key(moon_phase, personal_year, personal_day)
+    pipe = redis.pipeline()
+    if replace:
+        pipe.delete(key)
+    pipe.rpush(key, *variants)
+    pipe.expire(key, settings.esoterics_tip_pool_ttl_seconds)
+    pipe.execute()
+
+
+def fill_tip_pool(
+    moon_phase: MoonPhaseEnum,
+    personal_year: int,
+    personal_day: int,
+    *,
+    force: bool = False,
+) -> int:
+    """
+    Генерирует варианты совета для одной комбинации и кладёт их в общий пул.
+
+    Комбинация пропускается, если пул полон и до истечения TTL ещё далеко.
+    Возвращает количество сгенерированных вариантов.
+    """
+    redis = get_redis()
+    key = _tip_pool_key(moon_phase, personal_year, personal_day)
+    target_size = settings.esoterics_tip_pool_variants
+    if not force:
+        size = redis.llen(key)
+        ttl = redis.ttl(key)
+        if size >= target_size and ttl > TIP_POOL_REFRESH_MARGIN_SECONDS:
+            return 0
+
+    variants = [
+        _call_ai_tip(
+            moon_phase_desc=MOON_DESCRIPTIONS[moon_phase],
+            personal_year=personal_year,
+            personal_day=personal_day,
+            temperature=settings.esoterics_tip_pool_temperature,
+        )
+        for _ in range(target_size)
+    ]
+    _store_tip_pool(
+        redis,
+        moon_phase,
+        personal_year,
+        personal_day,
+        variants,
+        replace=True,
+    )
+    return len(variants)
+
+
 def get_daily_tip(
     db: Session,
     user: User,
@@ -224,13 +319,25 @@ def get_daily_tip(
     moon: MoonData,
     numerology: NumerologyData,
 ) -> str:
-    cache_key = f"tip_{user.id}_{target_date.isoformat()}"
+    """
+    Совет дня из общего пула (фаза Луны, личный год, личный день).
+
+    Пул заполняется ночной задачей `esoterics.fill_tip_pool`, поэтому на
+    горячем пути AI не вызывается. AI вызывается только если пул для
+    комбинации ещё пуст (холодный старт) — результат сразу кладётся в пул.
+    Без Redis используется прежний кеш в `users.daily_tip_cache`.
+    """
     redis = _get_redis_client()
     if redis is not None:
         try:
-            cached = redis.get(cache_key)
-            if cached:
-                return cached
+            variants = _load_tip_pool(
+                redis,
+                moon.phase,
+                numerology.personal_year,
+                numerology.personal_day,
+            )
+            if variants:
+                return _pick_tip_variant(variants, user, target_date)
         except Exception:
             redis = None
 
@@ -245,6 +352,8 @@ def get_daily_tip(
             personal_year=numerology.personal_year,
             personal_day=numerology.personal_day,
         )
+    except AIUnavailableError:
+        raise
     except httpx.HTTPError as exc:
         raise APIError(
             code="ESOTERICS_AI_PROXY_ERROR",
@@ -260,8 +369,14 @@ def get_daily_tip(
 
     if redis is not None:
         try:
-            ttl = _get_cache_ttl_seconds(target_date, user.time_zone)
-            redis.setex(cache_key, ttl, tip)
+            _store_tip_pool(
+                redis,
+                moon.phase,
+                numerology.personal_year,
+                numerology.personal_day,
+                [tip],
+                replace=False,
+            )
         except Exception:
             pass
     else:
@@ -272,6 +387,11 @@ def get_daily_tip(
 
 __all__ = [
     "calculate_moon",
+    "calculate_moon_range",
+    "calculate_moon_month",
+    "calculate_moon_year",
     "calculate_numerology",
     "get_daily_tip",
+    "fill_tip_pool",
+    "iter_tip_pool_keys",
 ]
@@ -1,17 +1,18 @@
 from __future__ import annotations
 
-from typing import Dict, List
+from typing import Dict, List, Optional
 
-from celery.exceptions import TimeoutError as CeleryTimeoutError
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy import asc
 from sqlalchemy.orm import Session
 
 from app.core.areas.models import Area
 from app.core.auth.models import User
-from app.core.config import settings
 from app.core.dependencies import get_current_user, get_db
+from app.core.jobs.services import enqueue_job, run_task, wait_for_task_result
 from app.core.limits.dependencies import check_text_quota
+from app.core.limits.services import QuotaSpend
 from app.core.future_story.schemas import (
     FutureStoryDraftIn,
     FutureStoryDraftPublic,
@@ -25,8 +26,7 @@ from app.core.future_story.services import (
     update_story_horizon,
 )
 from app.response import StandardResponse, make_success_response
-from app.response.response import APIError
-from mechtaai_bg_worker.celery_app import celery_app
+from app.utils.fieldsets import parse_fields, project
 
 
 router = APIRouter(prefix="/future-story", tags=["future-story"])
@@ -83,32 +83,42 @@ def future_story_draft_view(
 @router.post(
     "/generate",
     response_model=StandardResponse,
-    dependencies=[Depends(check_text_quota)],
     summary="Сгенерировать историю",
+    description=(
+        "С `?async=true` сразу возвращает 202 и `job_id`; "
+        "результат забирается через GET `/jobs/{job_id}`."
+    ),
 )
 def future_story_generate_view(
+    response: Response,
+    run_async: bool = Query(
+        False,
+        alias="async",
+        description="Вернуть 202 и job_id, не дожидаясь результата AI.",
+    ),
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
+    quota: QuotaSpend = Depends(check_text_quota),
 ) -> StandardResponse:
-    _ = db
-    task = celery_app.send_task("future_story.generate", args=[str(user.id)])
-    timeout_seconds = settings.ai_proxy_timeout_seconds + 30
-    try:
-        result = task.get(timeout=timeout_seconds)
-    except CeleryTimeoutError:
-        raise APIError(
-            code="FUTURE_STORY_AI_TIMEOUT",
-            http_code=504,
-            message="Future story generation timed out.",
+    if run_async:
+        job = enqueue_job(
+            user.id,
+            "future_story.generate",
+            args=[str(user.id)],
+            quota=quota,
         )
+        response.status_code = 202
+        return make_success_response(result=job)
 
-    if not result or not result.get("ok"):
-        error = (result or {}).get("error") or {}
-        raise APIError(
-            code=error.get("code", "FUTURE_STORY_AI_FAILED"),
-            http_code=error.get("http_code", 500),
-            message=error.get("message", "Future story generation failed."),
-        )
+    task = run_task(
+        user.id, "future_story.generate", [str(user.id)], quota=quota
+    )
+    result = wait_for_task_result(
+        task,
+        error_prefix="FUTURE_STORY",
+        label="Future story generation",
+        db=db,
+    )
 
     story = FutureStoryPublic.model_validate(result["story"]).model_dump(mode="json")
     return make_success_response(result=story)
@@ -120,12 +130,22 @@ def future_story_generate_view(
     summary="Получить текущую историю",
 )
 def future_story_get_view(
+    fields: Optional[str] = Query(
+        None,
+        description=(
+            "Поля FutureStoryPublic через запятую (например `id,created_at`); "
+            "`id` возвращается всегда. Без параметра — все поля."
+        ),
+    ),
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
 ) -> StandardResponse:
-    story = get_latest_story(db, user.id)
+    selected = parse_fields(fields, FutureStoryPublic)
+    story = get_latest_story(db, user.id, fields=selected)
     if story is None:
         return make_success_response(result=None)
+    if selected is not None:
+        return make_success_response(result=jsonable_encoder(project(story, selected)))
     payload = FutureStoryPublic.model_validate(story).model_dump(mode="json")
     return make_success_response(result=payload)
 
@@ -2,10 +2,22 @@ from __future__ import annotations
 
 import uuid
 
-from sqlalchemy import Column, DateTime, ForeignKey, Index, String, Text, func
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    ForeignKey,
+    Identity,
+    Index,
+    String,
+    Text,
+    UniqueConstraint,
+    func,
+)
 from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.orm import deferred, relationship
 
-from app.database.base import Base
+from app.database.base import HEAVY_GROUP, Base
 
 
 class FutureStoryDraft(Base):
@@ -22,7 +34,6 @@ class FutureStoryDraft(Base):
         nullable=False,
         index=True,
     )
-    answers = Column(JSONB, nullable=False, default=list)
     status = Column(String, nullable=False, default="in_progress")
 
     created_at = Column(
@@ -37,6 +48,13 @@ class FutureStoryDraft(Base):
         onupdate=func.now(),
     )
 
+    answers = relationship(
+        "FutureStoryDraftAnswer",
+        back_populates="draft",
+        cascade="all, delete-orphan",
+        order_by="FutureStoryDraftAnswer.seq",
+    )
+
 
 Index(
     "ix_future_story_drafts_user_updated",
@@ -45,6 +63,53 @@ Index(
 )
 
 
+class FutureStoryDraftAnswer(Base):
+    """
+    Ответ draft на вопрос сферы: одна строка на (draft, area_id, question),
+    сохранение ответа — один upsert по этому ключу.
+    """
+
+    __tablename__ = "future_story_draft_answers"
+    __table_args__ = (
+        UniqueConstraint(
+            "draft_id",
+            "area_id",
+            "question",
+            name="uq_future_story_draft_answers_key",
+        ),
+    )
+
+    id = Column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+    )
+    draft_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("future_story_drafts.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    area_id = Column(String, nullable=False)
+    question = Column(Text, nullable=False)
+    answer = Column(Text, nullable=False)
+    # Порядок первого ответа на вопрос; при перезаписи ответа не меняется.
+    seq = Column(BigInteger, Identity(), nullable=False)
+
+    created_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+    )
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
+
+    draft = relationship("FutureStoryDraft", back_populates="answers")
+
+
 class FutureStory(Base):
     __tablename__ = "future_stories"
 
@@ -59,10 +124,13 @@ class FutureStory(Base):
         nullable=False,
         index=True,
     )
-    horizon_3y = Column(JSONB, nullable=False)
-    horizon_5y = Column(JSONB, nullable=False)
-    key_images = Column(JSONB, nullable=False, default=list)
-    validation_notes = Column(Text, nullable=True)
+    horizon_3y = deferred(Column(JSONB, nullable=False), group=HEAVY_GROUP)
+    horizon_5y = deferred(Column(JSONB, nullable=False), group=HEAVY_GROUP)
+    key_images = deferred(
+        Column(JSONB, nullable=False, default=list),
+        group=HEAVY_GROUP,
+    )
+    validation_notes = deferred(Column(Text, nullable=True), group=HEAVY_GROUP)
 
     created_at = Column(
         DateTime(timezone=True),
@@ -80,5 +148,6 @@ Index(
 
 __all__ = [
     "FutureStoryDraft",
+    "FutureStoryDraftAnswer",
     "FutureStory",
 ]
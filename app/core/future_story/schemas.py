@@ -22,10 +22,18 @@ class FutureStoryDraftIn(BaseModel):
     answer: str = Field(..., min_length=1, max_length=10_000)
 
 
+class FutureStoryDraftAnswerPublic(BaseModel):
+    area_id: str
+    question: str
+    answer: str
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class FutureStoryDraftPublic(BaseModel):
     id: UUID
     user_id: UUID
-    answers: list[dict]
+    answers: list[FutureStoryDraftAnswerPublic]
     status: FutureStoryDraftStatus
     created_at: datetime
     updated_at: datetime
@@ -78,6 +86,7 @@ class FutureStoryAIResponse(BaseModel):
 
 __all__ = [
     "FutureStoryQuestion",
+    "FutureStoryDraftAnswerPublic",
     "FutureStoryDraftIn",
     "FutureStoryDraftPublic",
     "FutureStoryByArea",
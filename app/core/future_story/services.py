@@ -1,14 +1,20 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Sequence
 from uuid import UUID
 
-from sqlalchemy import desc
+from sqlalchemy import desc, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
-from app.core.future_story.models import FutureStory, FutureStoryDraft
+from app.core.future_story.models import (
+    FutureStory,
+    FutureStoryDraft,
+    FutureStoryDraftAnswer,
+)
 from app.response.response import APIError
+from app.utils.fieldsets import projection_options
 
 
 def _now_utc() -> datetime:
@@ -30,7 +36,6 @@ def get_or_create_draft(db: Session, user_id: UUID) -> FutureStoryDraft:
 
     draft = FutureStoryDraft(
         user_id=user_id,
-        answers=[],
         status="in_progress",
     )
     db.add(draft)
@@ -46,33 +51,46 @@ def upsert_draft_answer(
     question: str,
     answer: str,
 ) -> FutureStoryDraft:
+    """
+    Сохраняет ответ одним `INSERT ... ON CONFLICT (draft_id, area_id, question)
+    DO UPDATE`: уже записанные ответы не читаются и не переписываются.
+    """
     draft = get_or_create_draft(db, user_id)
-    answers: List[Dict[str, Any]] = list(draft.answers or [])
-
-    updated = False
-    for item in answers:
-        if item.get("area_id") == area_id and item.get("question") == question:
-            item["answer"] = answer
-            updated = True
-            break
-
-    if not updated:
-        answers.append(
-            {
-                "area_id": area_id,
-                "question": question,
-                "answer": answer,
-            }
-        )
-
-    draft.answers = answers
-    draft.updated_at = _now_utc()
-    db.add(draft)
+    stmt = pg_insert(FutureStoryDraftAnswer).values(
+        draft_id=draft.id,
+        area_id=area_id,
+        question=question,
+        answer=answer,
+    )
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_future_story_draft_answers_key",
+        set_={"answer": stmt.excluded.answer, "updated_at": func.now()},
+    )
+    db.execute(stmt)
     db.commit()
-    db.refresh(draft)
     return draft
 
 
+def get_draft_answers(db: Session, draft_id: UUID) -> List[Dict[str, Any]]:
+    """
+    Ответы draft в порядке первого сохранения.
+    """
+    rows = (
+        db.query(
+            FutureStoryDraftAnswer.area_id,
+            FutureStoryDraftAnswer.question,
+            FutureStoryDraftAnswer.answer,
+        )
+        .filter(FutureStoryDraftAnswer.draft_id == draft_id)
+        .order_by(FutureStoryDraftAnswer.seq)
+        .all()
+    )
+    return [
+        {"area_id": row.area_id, "question": row.question, "answer": row.answer}
+        for row in rows
+    ]
+
+
 def mark_draft_completed(db: Session, draft: FutureStoryDraft) -> FutureStoryDraft:
     draft.status = "completed"
     draft.updated_at = _now_utc()
@@ -112,9 +130,15 @@ def create_future_story(
     return story
 
 
-def get_latest_story(db: Session, user_id: UUID) -> FutureStory | None:
+def get_latest_story(
+    db: Session,
+    user_id: UUID,
+    *,
+    fields: Optional[Sequence[str]] = None,
+) -> FutureStory | None:
     return (
         db.query(FutureStory)
+        .options(*projection_options(FutureStory, fields))
         .filter(FutureStory.user_id == user_id)
         .order_by(desc(FutureStory.created_at))
         .first()
@@ -157,6 +181,7 @@ def update_story_horizon(
 __all__ = [
     "get_or_create_draft",
     "upsert_draft_answer",
+    "get_draft_answers",
     "mark_draft_completed",
     "get_latest_draft",
     "create_future_story",
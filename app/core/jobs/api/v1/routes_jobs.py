@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.core.auth.models import User
+from app.core.dependencies import get_current_user, get_db
+from app.core.jobs.services import (
+    JOB_MAX_WAIT_SECONDS,
+    JOB_POLL_INTERVAL_SECONDS,
+    get_job_status,
+    is_terminal,
+    poll_deadline,
+)
+from app.response import StandardResponse, make_success_response
+
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.get(
+    "/{job_id}",
+    response_model=StandardResponse,
+    summary="Статус фоновой AI-задачи",
+    description=(
+        "Возвращает статус задачи, созданной AI-эндпоинтом в режиме `?async=true`.\n\n"
+        "Статусы: `pending`, `running`, `succeeded`, `failed`.\n"
+        "- при `succeeded` в `result.result` лежит тот же payload, что вернул бы синхронный эндпоинт\n"
+        "- при `failed` в `result.error` лежат `code`/`http_code`/`message` ошибки задачи\n\n"
+        "Long-poll: параметр `wait` (секунды, до 30) держит запрос открытым, "
+        "пока задача не завершится или не истечёт время ожидания. "
+        "Соединение с БД на время ожидания не удерживается."
+    ),
+)
+async def job_status_view(
+    job_id: str,
+    wait: int = Query(
+        0,
+        ge=0,
+        le=JOB_MAX_WAIT_SECONDS,
+        description="Long-poll: сколько секунд ждать завершения задачи (0 — сразу).",
+    ),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+) -> StandardResponse:
+    user_id = user.id
+    await run_in_threadpool(db.close)
+
+    job = await run_in_threadpool(get_job_status, user_id, job_id)
+    deadline = poll_deadline(wait)
+    while not is_terminal(job) and time.monotonic() < deadline:
+        await asyncio.sleep(JOB_POLL_INTERVAL_SECONDS)
+        job = await run_in_threadpool(get_job_status, user_id, job_id)
+
+    return make_success_response(result=job.model_dump(mode="json"))
+
+
+__all__ = ["router"]
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Literal
+
+from pydantic import BaseModel, Field
+
+
+JobStatus = Literal["pending", "running", "succeeded", "failed"]
+
+
+class JobError(BaseModel):
+    code: str
+    http_code: int
+    message: str
+
+
+class JobAcceptedPublic(BaseModel):
+    job_id: str = Field(..., description="ID фоновой задачи (Celery task id).")
+    task: str = Field(..., description="Имя Celery-задачи.")
+    status: JobStatus = Field(default="pending", description="Текущий статус задачи.")
+    status_url: str = Field(
+        ..., description="Эндпоинт для проверки статуса: GET /api/v1/jobs/{job_id}."
+    )
+
+
+class JobPublic(BaseModel):
+    job_id: str
+    task: str
+    status: JobStatus
+    result: Any | None = None
+    error: JobError | None = None
+    created_at: datetime
+
+
+__all__ = [
+    "JobStatus",
+    "JobError",
+    "JobAcceptedPublic",
+    "JobPublic",
+]
@@ -0,0 +1,361 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+import uuid
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Tuple
+from uuid import UUID
+
+from celery.exceptions import TimeoutError as CeleryTimeoutError
+from celery.result import AsyncResult
+from loguru import logger
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.jobs.schemas import JobAcceptedPublic, JobError, JobPublic
+from app.core.limits.services import QuotaSpend, ResourceType, refund_quota
+from app.response.response import APIError
+from app.utils.redis_client import get_redis
+from mechtaai_bg_worker.celery_app import celery_app
+
+
+JOB_TTL_SECONDS = 24 * 60 * 60
+JOB_MAX_WAIT_SECONDS = 30
+JOB_POLL_INTERVAL_SECONDS = 0.5
+
+# Ключ в ответе worker, под которым лежит полезный результат задачи.
+JOB_RESULT_KEYS: Dict[str, str] = {
+    "wants.analyze": "analysis",
+    "future_story.generate": "story",
+    "goals.generate": "payload",
+    "steps.generate": "payload",
+    "rituals.weekly_review": "review",
+}
+
+
+SINGLE_FLIGHT_KEY_PREFIX = "singleflight"
+
+# Снимает блокировку single-flight, только если она всё ещё принадлежит задаче.
+_RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def _now_utc() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _job_key(job_id: str) -> str:
+    return f"job:{job_id}"
+
+
+def _load_job_record(job_id: str) -> Dict[str, Any] | None:
+    try:
+        raw = get_redis().get(_job_key(job_id))
+    except Exception:
+        raise APIError(
+            code="JOBS_STORAGE_UNAVAILABLE",
+            http_code=503,
+            message="Хранилище задач недоступно.",
+        )
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return None
+
+
+def _single_flight_key(user_id: UUID, task_name: str, args: List[Any]) -> str:
+    fingerprint = hashlib.sha256(
+        json.dumps(args, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    ).hexdigest()
+    return f"{SINGLE_FLIGHT_KEY_PREFIX}:{task_name}:{user_id}:{fingerprint}"
+
+
+def _claim_single_flight(key: str, job_id: str) -> Tuple[str, bool]:
+    """
+    Занимает ключ под `job_id`. Если такой же запрос уже выполняется,
+    возвращает id той задачи и `True`.
+    """
+    redis = get_redis()
+    ttl = settings.single_flight_ttl_seconds
+    for _ in range(2):
+        if redis.set(key, job_id, nx=True, ex=ttl):
+            return job_id, False
+        existing = redis.get(key)
+        if existing:
+            return existing, True
+    return job_id, False
+
+
+def submit_task(
+    user_id: UUID,
+    task_name: str,
+    args: List[Any],
+    quota: QuotaSpend | None = None,
+    *,
+    refund_on_failure: bool = False,
+) -> Tuple[str, bool]:
+    """
+    Ставит AI-задачу в очередь с single-flight по (задача, пользователь, аргументы).
+
+    Если такая же задача пользователя уже в работе, новая не создаётся:
+    возвращается id выполняющейся задачи и `True`, а списанная за этот запрос
+    квота сразу возвращается. Блокировку снимает воркер по завершении задачи
+    (`release_single_flight`), а при его падении — TTL.
+
+    `refund_on_failure` — вернуть квоту при неудаче задачи силами воркера
+    (async-режим); в синхронном режиме это делает зависимость квоты.
+    """
+    job_id = str(uuid.uuid4())
+    key = _single_flight_key(user_id, task_name, args)
+    try:
+        job_id, attached = _claim_single_flight(key, job_id)
+    except Exception:
+        raise APIError(
+            code="JOBS_STORAGE_UNAVAILABLE",
+            http_code=503,
+            message="Хранилище задач недоступно.",
+        )
+
+    if attached:
+        if quota is not None:
+            refund_quota(quota)
+        logger.info("Attached to in-flight job", job_id=job_id, task=task_name)
+        return job_id, True
+
+    record: Dict[str, Any] = {
+        "user_id": str(user_id),
+        "task": task_name,
+        "created_at": _now_utc().isoformat(),
+        "single_flight_key": key,
+    }
+    if quota is not None and refund_on_failure:
+        record["quota"] = {
+            "resource": quota.resource_type.value,
+            "period_start": quota.period_start.isoformat(),
+        }
+    try:
+        get_redis().setex(_job_key(job_id), JOB_TTL_SECONDS, json.dumps(record))
+    except Exception:
+        raise APIError(
+            code="JOBS_STORAGE_UNAVAILABLE",
+            http_code=503,
+            message="Хранилище задач недоступно.",
+        )
+
+    celery_app.send_task(task_name, args=args, task_id=job_id)
+    return job_id, False
+
+
+def enqueue_job(
+    user_id: UUID,
+    task_name: str,
+    args: List[Any],
+    quota: QuotaSpend | None = None,
+) -> JobAcceptedPublic:
+    """
+    Ставит Celery-задачу в очередь и сохраняет владельца задачи в Redis.
+
+    Запись о владельце создаётся до отправки задачи, чтобы статус был доступен
+    сразу после ответа 202. Если передан `quota`, списанная единица вернётся
+    пользователю при неудачном завершении задачи (см. `refund_job_quota`).
+    Повторный запрос во время выполнения получает тот же `job_id`.
+    """
+    job_id, _ = submit_task(
+        user_id, task_name, args, quota=quota, refund_on_failure=True
+    )
+    return JobAcceptedPublic(
+        job_id=job_id,
+        task=task_name,
+        status="pending",
+        status_url=f"/api/v1/jobs/{job_id}",
+    )
+
+
+def run_task(
+    user_id: UUID,
+    task_name: str,
+    args: List[Any],
+    quota: QuotaSpend | None = None,
+) -> AsyncResult:
+    """
+    Синхронный режим AI-эндпоинтов: задача с single-flight, результат
+    ждёт `wait_for_task_result`.
+    """
+    job_id, _ = submit_task(user_id, task_name, args, quota=quota)
+    return AsyncResult(job_id, app=celery_app)
+
+
+def release_single_flight(job_id: str) -> None:
+    try:
+        record = _load_job_record(job_id)
+    except APIError:
+        return
+    key = (record or {}).get("single_flight_key")
+    if not key:
+        return
+    try:
+        get_redis().eval(_RELEASE_LUA, 1, key, job_id)
+    except Exception:
+        return
+
+
+def refund_job_quota(job_id: str) -> bool:
+    """
+    Возвращает квоту за неудавшуюся async-задачу. Возврат выполняется
+    не более одного раза на задачу (флаг в Redis).
+    """
+    try:
+        record = _load_job_record(job_id)
+    except APIError:
+        return False
+    if record is None or not record.get("quota"):
+        return False
+    try:
+        claimed = get_redis().set(
+            f"{_job_key(job_id)}:refunded", "1", nx=True, ex=JOB_TTL_SECONDS
+        )
+    except Exception:
+        return False
+    if not claimed:
+        return False
+
+    info = record["quota"]
+    refund_quota(
+        QuotaSpend(
+            user_id=UUID(record["user_id"]),
+            resource_type=ResourceType(info["resource"]),
+            period_start=date.fromisoformat(info["period_start"]),
+        )
+    )
+    return True
+
+
+def _error_from_result(result: Dict[str, Any] | None) -> JobError:
+    error = (result or {}).get("error") or {}
+    return JobError(
+        code=error.get("code", "JOB_FAILED"),
+        http_code=error.get("http_code", 500),
+        message=error.get("message", "Job failed."),
+    )
+
+
+def get_job_status(user_id: UUID, job_id: str) -> JobPublic:
+    record = _load_job_record(job_id)
+    if record is None or record.get("user_id") != str(user_id):
+        raise APIError(
+            code="JOB_NOT_FOUND",
+            http_code=404,
+            message="Задача не найдена.",
+        )
+
+    task_name = record.get("task", "")
+    created_at = datetime.fromisoformat(record["created_at"])
+    async_result = AsyncResult(job_id, app=celery_app)
+    state = async_result.state
+
+    if state == "SUCCESS":
+        result = async_result.result
+        if not isinstance(result, dict) or not result.get("ok"):
+            return JobPublic(
+                job_id=job_id,
+                task=task_name,
+                status="failed",
+                error=_error_from_result(result if isinstance(result, dict) else None),
+                created_at=created_at,
+            )
+        return JobPublic(
+            job_id=job_id,
+            task=task_name,
+            status="succeeded",
+            result=result.get(JOB_RESULT_KEYS.get(task_name, "payload")),
+            created_at=created_at,
+        )
+
+    if state in ("FAILURE", "REVOKED"):
+        return JobPublic(
+            job_id=job_id,
+            task=task_name,
+            status="failed",
+            error=JobError(
+                code="JOB_FAILED",
+                http_code=500,
+                message=str(async_result.result or "Job failed."),
+            ),
+            created_at=created_at,
+        )
+
+    status = "running" if state in ("STARTED", "RETRY") else "pending"
+    return JobPublic(
+        job_id=job_id,
+        task=task_name,
+        status=status,
+        created_at=created_at,
+    )
+
+
+def wait_for_task_result(
+    task: AsyncResult,
+    *,
+    error_prefix: str,
+    label: str,
+    db: Session | None = None,
+) -> Dict[str, Any]:
+    """
+    Блокирующее ожидание результата задачи (режим по умолчанию у AI-эндпоинтов).
+
+    Если передан `db`, сессия закрывается до ожидания: соединение возвращается
+    в пул и не удерживается всё время генерации.
+    """
+    if db is not None:
+        db.close()
+
+    timeout_seconds = settings.ai_proxy_timeout_seconds + 30
+    try:
+        result = task.get(timeout=timeout_seconds)
+    except CeleryTimeoutError:
+        raise APIError(
+            code=f"{error_prefix}_AI_TIMEOUT",
+            http_code=504,
+            message=f"{label} timed out.",
+        )
+
+    if not result or not result.get("ok"):
+        error = (result or {}).get("error") or {}
+        raise APIError(
+            code=error.get("code", f"{error_prefix}_AI_FAILED"),
+            http_code=error.get("http_code", 500),
+            message=error.get("message", f"{label} failed."),
+            details=error.get("details"),
+        )
+    return result
+
+
+def is_terminal(job: JobPublic) -> bool:
+    return job.status in ("succeeded", "failed")
+
+
+def poll_deadline(wait_seconds: int) -> float:
+    return time.monotonic() + min(max(wait_seconds, 0), JOB_MAX_WAIT_SECONDS)
+
+
+__all__ = [
+    "JOB_MAX_WAIT_SECONDS",
+    "JOB_POLL_INTERVAL_SECONDS",
+    "enqueue_job",
+    "release_single_flight",
+    "run_task",
+    "submit_task",
+    "get_job_status",
+    "refund_job_quota",
+    "wait_for_task_result",
+    "is_terminal",
+    "poll_deadline",
+]
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, Depends, Query
 from fastapi.encoders import jsonable_encoder
@@ -14,7 +14,8 @@ from app.core.life_wheel.services import (
     get_latest_life_wheel,
     get_life_wheels_page,
 )
-from app.response import Pagination, StandardResponse, make_success_response
+from app.response import StandardResponse, make_success_response
+from app.utils.pagination import make_pagination
 
 
 router = APIRouter(prefix="/life_wheel", tags=["life_wheel"])
@@ -60,28 +61,30 @@ def get_latest_life_wheel_view(
 def list_life_wheels_view(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    with_total: bool = Query(True),
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
 ) -> StandardResponse:
-    items, total = get_life_wheels_page(
+    items, total, next_cursor = get_life_wheels_page(
         db=db,
         user_id=user.id,
         page=page,
         page_size=page_size,
+        cursor=cursor,
+        with_total=with_total,
     )
 
     result_items: List[Dict[str, Any]] = [
         LifeWheelPublic.from_orm(i).model_dump() for i in items
     ]
 
-    total_pages = (total + page_size - 1) // page_size if page_size > 0 else 1
-    pagination = Pagination(
+    pagination = make_pagination(
         page=page,
         page_size=page_size,
         total=total,
-        total_pages=total_pages,
-        has_next=page < total_pages,
-        has_prev=page > 1,
+        next_cursor=next_cursor,
+        cursor=cursor,
     )
 
     payload: Dict[str, Any] = {
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from sqlalchemy import asc, desc
 from sqlalchemy.orm import Session
@@ -9,6 +9,7 @@ from app.core.areas.models import Area
 from app.core.life_wheel.models import LifeWheel
 from app.core.life_wheel.schemas import LifeWheelCreate
 from app.response.response import APIError
+from app.utils.pagination import cached_count, invalidate_count, keyset_page
 
 
 def _fetch_active_area_ids(db: Session) -> List[str]:
@@ -41,6 +42,10 @@ def validate_scores(
         )
 
 
+def _count_key(user_id) -> str:
+    return f"life_wheel:{user_id}"
+
+
 def create_life_wheel(
     db: Session,
     user_id,
@@ -56,6 +61,7 @@ def create_life_wheel(
     db.add(life_wheel)
     db.commit()
     db.refresh(life_wheel)
+    invalidate_count(_count_key(user_id))
     return life_wheel
 
 
@@ -76,22 +82,28 @@ def get_life_wheels_page(
     user_id,
     page: int,
     page_size: int,
-) -> Tuple[List[LifeWheel], int]:
+    *,
+    cursor: Optional[str] = None,
+    with_total: bool = True,
+) -> Tuple[List[LifeWheel], Optional[int], Optional[str]]:
     if page < 1:
         page = 1
     if page_size < 1:
         page_size = 10
 
     query = db.query(LifeWheel).filter(LifeWheel.user_id == user_id)
-    total = query.count()
-
-    items = (
-        query.order_by(desc(LifeWheel.created_at))
-        .offset((page - 1) * page_size)
-        .limit(page_size)
-        .all()
+    result = keyset_page(
+        query,
+        LifeWheel.created_at,
+        LifeWheel.id,
+        limit=page_size,
+        cursor=cursor,
+        offset=(page - 1) * page_size,
     )
-    return items, total
+    total = None
+    if with_total:
+        total = cached_count(_count_key(user_id), query.count)
+    return result.items, total, result.next_cursor
 
 
 __all__ = [
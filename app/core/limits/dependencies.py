@@ -1,25 +1,49 @@
 from __future__ import annotations
 
+from typing import Generator
+
 from fastapi import Depends
 from sqlalchemy.orm import Session
 
 from app.core.auth.models import User
 from app.core.dependencies import get_current_user, get_db
-from app.core.limits.services import ResourceType, check_and_spend
+from app.core.limits.services import (
+    QuotaSpend,
+    ResourceType,
+    check_and_spend,
+    refund_quota,
+)
+
+
+def _spend_with_refund(
+    db: Session,
+    user: User,
+    resource_type: ResourceType,
+) -> Generator[QuotaSpend, None, None]:
+    """
+    Списывает единицу до обработчика и возвращает её, если обработчик упал
+    (ошибка AI, таймаут воркера, ошибка валидации и т.п.).
+    """
+    spend = check_and_spend(db, user, resource_type)
+    try:
+        yield spend
+    except Exception:
+        refund_quota(spend)
+        raise
 
 
 def check_text_quota(
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
-) -> None:
-    check_and_spend(db, user, ResourceType.AI_TEXT)
+) -> Generator[QuotaSpend, None, None]:
+    yield from _spend_with_refund(db, user, ResourceType.AI_TEXT)
 
 
 def check_image_quota(
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
-) -> None:
-    check_and_spend(db, user, ResourceType.AI_IMAGE)
+) -> Generator[QuotaSpend, None, None]:
+    yield from _spend_with_refund(db, user, ResourceType.AI_IMAGE)
 
 
 __all__ = ["check_text_quota", "check_image_quota"]
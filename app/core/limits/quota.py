@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from loguru import logger
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.limits.models import UserUsage
+from app.utils.redis_client import get_redis
+
+
+QUOTA_KEY_PREFIX = "quota"
+QUOTA_DIRTY_KEY = "quota:dirty"
+QUOTA_KEY_TTL_SECONDS = 40 * 24 * 60 * 60
+
+# Поля hash-счётчика по типу ресурса (значения ResourceType).
+QUOTA_FIELDS: Dict[str, str] = {
+    "AI_TEXT": "text",
+    "AI_IMAGE": "image",
+}
+
+# KEYS[1] — счётчик пользователя за период, KEYS[2] — множество "грязных" счётчиков.
+# ARGV: поле, лимит, ttl, член dirty-множества.
+# Возвращает {-1, 0}, если счётчика нет (нужно засеять из БД),
+# {0, used} — лимит исчерпан, {1, used} — единица списана.
+_SPEND_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+  return {-1, 0}
+end
+local current = tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '0')
+if current >= tonumber(ARGV[2]) then
+  return {0, current}
+end
+current = redis.call('HINCRBY', KEYS[1], ARGV[1], 1)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('SADD', KEYS[2], ARGV[4])
+return {1, current}
+"""
+
+# Засеивает счётчик значениями из БД, только если его ещё нет.
+_SEED_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+  redis.call('HSET', KEYS[1], 'text', ARGV[1], 'image', ARGV[2])
+  redis.call('EXPIRE', KEYS[1], ARGV[3])
+end
+return 1
+"""
+
+# Возврат единицы: не уходит ниже нуля. -1 — счётчика нет.
+_REFUND_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+  return -1
+end
+local current = tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '0')
+if current <= 0 then
+  return 0
+end
+current = redis.call('HINCRBY', KEYS[1], ARGV[1], -1)
+redis.call('SADD', KEYS[2], ARGV[2])
+return current
+"""
+
+
+def _member(user_id: UUID, period: date) -> str:
+    return f"{user_id}:{period.isoformat()}"
+
+
+def _counter_key(member: str) -> str:
+    return f"{QUOTA_KEY_PREFIX}:{member}"
+
+
+def load_db_counts(db: Session, user_id: UUID, period: date) -> Tuple[int, int]:
+    """
+    Счётчики из `user_usage` за период без записи: устаревший период читается как нули.
+    """
+    row = (
+        db.query(UserUsage.period_start, UserUsage.text_usage, UserUsage.image_usage)
+        .filter(UserUsage.user_id == user_id)
+        .first()
+    )
+    if row is None or row.period_start != period:
+        return 0, 0
+    return int(row.text_usage or 0), int(row.image_usage or 0)
+
+
+def _seed(db: Session, user_id: UUID, period: date) -> None:
+    text_used, image_used = load_db_counts(db, user_id, period)
+    get_redis().eval(
+        _SEED_LUA,
+        1,
+        _counter_key(_member(user_id, period)),
+        text_used,
+        image_used,
+        QUOTA_KEY_TTL_SECONDS,
+    )
+
+
+def spend(
+    db: Session,
+    user_id: UUID,
+    period: date,
+    resource: str,
+    limit: int,
+) -> Tuple[bool, int]:
+    """
+    Атомарно проверяет лимит и списывает единицу (один Lua-скрипт).
+
+    Возвращает (списано ли, текущее значение счётчика). Холодный счётчик
+    засеивается из `user_usage` один раз. Ошибки Redis пробрасываются —
+    вызывающий код решает, откатываться ли на БД.
+    """
+    member = _member(user_id, period)
+    key = _counter_key(member)
+    redis = get_redis()
+    for _ in range(2):
+        status, current = redis.eval(
+            _SPEND_LUA,
+            2,
+            key,
+            QUOTA_DIRTY_KEY,
+            QUOTA_FIELDS[resource],
+            limit,
+            QUOTA_KEY_TTL_SECONDS,
+            member,
+        )
+        if int(status) >= 0:
+            return int(status) == 1, int(current)
+        _seed(db, user_id, period)
+    raise RuntimeError("quota counter could not be seeded")
+
+
+def refund(user_id: UUID, period: date, resource: str) -> bool:
+    """
+    Возвращает единицу в счётчик Redis. False — счётчика в Redis нет.
+    """
+    member = _member(user_id, period)
+    result = get_redis().eval(
+        _REFUND_LUA,
+        2,
+        _counter_key(member),
+        QUOTA_DIRTY_KEY,
+        QUOTA_FIELDS[resource],
+        member,
+    )
+    return int(result) >= 0
+
+
+def read_counts(
+    db: Session,
+    user_id: UUID,
+    period: date,
+) -> Optional[Tuple[int, int]]:
+    """
+    Текущие счётчики (text, image) из Redis; None — Redis недоступен.
+    """
+    key = _counter_key(_member(user_id, period))
+    try:
+        redis = get_redis()
+        values = redis.hmget(key, "text", "image")
+        if values[0] is None and values[1] is None:
+            _seed(db, user_id, period)
+            values = redis.hmget(key, "text", "image")
+        return int(values[0] or 0), int(values[1] or 0)
+    except Exception:
+        return None
+
+
+def flush_dirty_counters(db: Session, batch_size: Optional[int] = None) -> int:
+    """
+    Переносит изменённые счётчики из Redis в `user_usage` одним upsert на пачку.
+
+    Более старый период не перезаписывает более новый, уже сохранённый в БД.
+    Возвращает число записанных строк.
+    """
+    batch_size = batch_size or settings.quota_flush_batch_size
+    redis = get_redis()
+    members: List[str] = redis.spop(QUOTA_DIRTY_KEY, batch_size) or []
+    if not members:
+        return 0
+
+    pipe = redis.pipeline()
+    for member in members:
+        pipe.hmget(_counter_key(member), "text", "image")
+    values = pipe.execute()
+
+    rows = []
+    for member, (text_used, image_used) in zip(members, values):
+        if text_used is None and image_used is None:
+            continue
+        user_id, period = member.split(":", 1)
+        rows.append(
+            {
+                "user_id": UUID(user_id),
+                "period_start": date.fromisoformat(period),
+                "text_usage": int(text_used or 0),
+                "image_usage": int(image_used or 0),
+            }
+        )
+    if not rows:
+        return 0
+
+    stmt = insert(UserUsage).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserUsage.user_id],
+        set_={
+            "period_start": stmt.excluded.period_start,
+            "text_usage": stmt.excluded.text_usage,
+            "image_usage": stmt.excluded.image_usage,
+            "updated_at": func.now(),
+        },
+        where=UserUsage.period_start <= stmt.excluded.period_start,
+    )
+    try:
+        db.execute(stmt)
+        db.commit()
+    except Exception:
+        db.rollback()
+        # Не теряем изменения: вернём счётчики в очередь на следующий проход.
+        redis.sadd(QUOTA_DIRTY_KEY, *members)
+        raise
+    logger.info("Flushed quota counters", rows=len(rows))
+    return len(rows)
+
+
+__all__ = [
+    "QUOTA_FIELDS",
+    "flush_dirty_counters",
+    "load_db_counts",
+    "read_counts",
+    "refund",
+    "spend",
+]
@@ -9,7 +9,9 @@ from uuid import UUID
 from sqlalchemy.orm import Session
 
 from app.core.auth.models import User
+from app.core.limits import quota
 from app.core.limits.models import UserUsage
+from app.database.session import SessionLocal
 from app.response.response import APIError
 from app.utils.redis_client import get_redis
 
@@ -88,15 +90,47 @@ def _maybe_reset_period(usage: UserUsage, today: date) -> bool:
     return False
 
 
-def check_and_spend(
+@dataclass
+class QuotaSpend:
+    user_id: UUID
+    resource_type: ResourceType
+    period_start: date
+    refunded: bool = False
+
+
+def _quota_exceeded(resource_type: ResourceType, current: int, limit: int) -> APIError:
+    return APIError(
+        code="QUOTA_EXCEEDED",
+        http_code=403,
+        message=(
+            f"Лимит генераций исчерпан ({current}/{limit}). "
+            "Перейдите на Pro."
+        ),
+        details={
+            "resource": resource_type.value,
+            "used": current,
+            "limit": limit,
+        },
+    )
+
+
+def _check_and_spend_db(
     db: Session,
     user: User,
     resource_type: ResourceType,
-) -> UserUsage:
-    usage = _ensure_usage(db, user.id)
+    limit: int,
+) -> None:
+    """
+    Запасной путь без Redis: строка `user_usage` блокируется на время проверки.
+    """
+    _ensure_usage(db, user.id)
+    usage = (
+        db.query(UserUsage)
+        .filter(UserUsage.user_id == user.id)
+        .with_for_update()
+        .one()
+    )
     _maybe_reset_period(usage, date.today())
-    limits = _get_limits(user)
-    limit = limits[resource_type]
 
     if resource_type == ResourceType.AI_TEXT:
         current = usage.text_usage
@@ -104,19 +138,8 @@ def check_and_spend(
         current = usage.image_usage
 
     if current >= limit:
-        raise APIError(
-            code="QUOTA_EXCEEDED",
-            http_code=403,
-            message=(
-                f"Лимит генераций исчерпан ({current}/{limit}). "
-                "Перейдите на Pro."
-            ),
-            details={
-                "resource": resource_type.value,
-                "used": current,
-                "limit": limit,
-            },
-        )
+        db.rollback()
+        raise _quota_exceeded(resource_type, current, limit)
 
     if resource_type == ResourceType.AI_TEXT:
         usage.text_usage = current + 1
@@ -125,26 +148,98 @@ def check_and_spend(
 
     db.add(usage)
     db.commit()
-    db.refresh(usage)
+
+
+def check_and_spend(
+    db: Session,
+    user: User,
+    resource_type: ResourceType,
+) -> QuotaSpend:
+    """
+    Проверяет лимит и списывает единицу ресурса.
+
+    Основной путь — атомарный Lua-скрипт над счётчиком в Redis; в `user_usage`
+    счётчики переносятся пачками задачей `limits.flush_usage`. Если Redis
+    недоступен, списание идёт через БД с блокировкой строки.
+    """
+    period = _current_period_start()
+    limit = _get_limits(user)[resource_type]
+    try:
+        spent, current = quota.spend(db, user.id, period, resource_type.value, limit)
+    except Exception:
+        _check_and_spend_db(db, user, resource_type, limit)
+    else:
+        if not spent:
+            raise _quota_exceeded(resource_type, current, limit)
 
     _invalidate_me_cache(user.id)
+    return QuotaSpend(user_id=user.id, resource_type=resource_type, period_start=period)
 
-    return usage
+
+def _refund_db(spend: QuotaSpend) -> None:
+    column = (
+        UserUsage.text_usage
+        if spend.resource_type == ResourceType.AI_TEXT
+        else UserUsage.image_usage
+    )
+    db = SessionLocal()
+    try:
+        (
+            db.query(UserUsage)
+            .filter(
+                UserUsage.user_id == spend.user_id,
+                UserUsage.period_start == spend.period_start,
+                column > 0,
+            )
+            .update({column: column - 1}, synchronize_session=False)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def refund_quota(spend: QuotaSpend) -> None:
+    """
+    Возвращает списанную единицу, если AI-задача не выполнилась.
+    Повторный вызов для того же `spend` ничего не делает.
+    """
+    if spend.refunded:
+        return
+    spend.refunded = True
+    try:
+        refunded = quota.refund(
+            spend.user_id, spend.period_start, spend.resource_type.value
+        )
+    except Exception:
+        refunded = False
+    if not refunded:
+        try:
+            _refund_db(spend)
+        except Exception:
+            return
+    _invalidate_me_cache(spend.user_id)
 
 
 def get_usage_snapshot(db: Session, user: User) -> UsageSnapshot:
-    usage = _ensure_usage(db, user.id)
-    _maybe_reset_period(usage, date.today())
-    db.add(usage)
-    db.commit()
-    db.refresh(usage)
+    """
+    Текущее использование без записи в БД.
+
+    Берётся из счётчиков Redis; без Redis — из `user_usage`, причём
+    устаревший период считается сброшенным виртуально (строка не меняется,
+    её обновит следующее списание).
+    """
+    period = _current_period_start()
+    counts = quota.read_counts(db, user.id, period)
+    if counts is None:
+        counts = quota.load_db_counts(db, user.id, period)
+    text_used, image_used = counts
 
     limits = _get_limits(user)
     return UsageSnapshot(
         plan="pro" if _is_pro(user) else "free",
-        text_used=usage.text_usage,
+        text_used=text_used,
         text_limit=limits[ResourceType.AI_TEXT],
-        image_used=usage.image_usage,
+        image_used=image_used,
         image_limit=limits[ResourceType.AI_IMAGE],
     )
 
@@ -160,6 +255,8 @@ def _invalidate_me_cache(user_id: UUID) -> None:
 __all__ = [
     "ResourceType",
     "UsageSnapshot",
+    "QuotaSpend",
     "check_and_spend",
+    "refund_quota",
     "get_usage_snapshot",
 ]
@@ -3,13 +3,12 @@ from __future__ import annotations
 from typing import Dict, List
 from uuid import UUID
 
-from celery.exceptions import TimeoutError as CeleryTimeoutError
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Response
 from sqlalchemy.orm import Session
 
 from app.core.auth.models import User
-from app.core.config import settings
 from app.core.dependencies import get_current_user, get_db
+from app.core.jobs.services import enqueue_job, run_task, wait_for_task_result
 from app.core.plan_steps.schemas import (
     StepIn,
     StepPublic,
@@ -29,9 +28,8 @@ from app.core.gamification.services import (
     build_gamification_event,
 )
 from app.core.limits.dependencies import check_text_quota
+from app.core.limits.services import QuotaSpend
 from app.response import StandardResponse, make_success_response
-from app.response.response import APIError
-from mechtaai_bg_worker.celery_app import celery_app
 
 
 router = APIRouter(prefix="/steps", tags=["steps"])
@@ -40,36 +38,37 @@ router = APIRouter(prefix="/steps", tags=["steps"])
 @router.post(
     "/generate",
     response_model=StandardResponse,
-    dependencies=[Depends(check_text_quota)],
     summary="Сгенерировать план шагов",
+    description=(
+        "С `?async=true` сразу возвращает 202 и `job_id`; "
+        "результат забирается через GET `/jobs/{job_id}`."
+    ),
 )
 def steps_generate_view(
     payload: StepsGenerateIn,
+    response: Response,
+    run_async: bool = Query(
+        False,
+        alias="async",
+        description="Вернуть 202 и job_id, не дожидаясь результата AI.",
+    ),
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
+    quota: QuotaSpend = Depends(check_text_quota),
 ) -> StandardResponse:
-    _ = db
-    task = celery_app.send_task(
-        "steps.generate",
-        args=[str(user.id), payload.model_dump()],
+    args = [str(user.id), payload.model_dump()]
+    if run_async:
+        job = enqueue_job(user.id, "steps.generate", args=args, quota=quota)
+        response.status_code = 202
+        return make_success_response(result=job)
+
+    task = run_task(user.id, "steps.generate", args, quota=quota)
+    result = wait_for_task_result(
+        task,
+        error_prefix="STEPS",
+        label="Steps generation",
+        db=db,
     )
-    timeout_seconds = settings.ai_proxy_timeout_seconds + 30
-    try:
-        result = task.get(timeout=timeout_seconds)
-    except CeleryTimeoutError:
-        raise APIError(
-            code="STEPS_AI_TIMEOUT",
-            http_code=504,
-            message="Steps generation timed out.",
-        )
-
-    if not result or not result.get("ok"):
-        error = (result or {}).get("error") or {}
-        raise APIError(
-            code=error.get("code", "STEPS_AI_FAILED"),
-            http_code=error.get("http_code", 500),
-            message=error.get("message", "Steps generation failed."),
-        )
 
     return make_success_response(result=result["payload"])
 
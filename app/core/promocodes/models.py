@@ -7,6 +7,7 @@ from sqlalchemy import (
     Column,
     DateTime,
     ForeignKey,
+    Index,
     String,
     UniqueConstraint,
     func,
@@ -57,6 +58,9 @@ class PromoCode(Base):
     )
 
 
+Index("ix_promo_codes_created_at_id", PromoCode.created_at.desc(), PromoCode.id.desc())
+
+
 class PromoRedemption(Base):
     __tablename__ = "promo_redemptions"
     __table_args__ = (
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import math
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from fastapi import Request
+from loguru import logger
+
+from app.response.response import APIError
+from app.utils.redis_client import get_redis
+
+
+RATE_LIMIT_KEY_PREFIX = "ratelimit"
+
+# Скользящее окно (sorted set с отметками времени) за один вызов Redis.
+# KEYS[1] — ключ окна; ARGV: now_ms, window_ms, limit, member.
+# Возвращает {разрешено (1/0), число запросов в окне, мс до освобождения слота}.
+_SLIDING_WINDOW_LUA = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, now - window)
+local count = redis.call('ZCARD', KEYS[1])
+if count >= limit then
+  local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+  local retry = window
+  if oldest[2] then
+    retry = tonumber(oldest[2]) + window - now
+  end
+  return {0, count, retry}
+end
+redis.call('ZADD', KEYS[1], now, ARGV[4])
+redis.call('PEXPIRE', KEYS[1], window)
+return {1, count + 1, 0}
+"""
+
+
+@dataclass(frozen=True)
+class RateLimitPolicy:
+    """
+    Политика лимита для одного маршрута: не больше `limit` запросов
+    за `window_seconds` с одного ключа (по умолчанию — IP клиента).
+    """
+
+    name: str
+    limit: int
+    window_seconds: int
+    error_code: str
+    message: str = "Слишком много запросов. Попробуйте позже."
+
+
+def client_ip(request: Request) -> Optional[str]:
+    return request.client.host if request.client else None
+
+
+def hit(policy: RateLimitPolicy, identity: str) -> None:
+    """
+    Учитывает запрос и бросает 429 с кодом политики при превышении.
+
+    Если Redis недоступен, запрос пропускается: лимитер не должен ронять вход.
+    """
+    now_ms = int(time.time() * 1000)
+    key = f"{RATE_LIMIT_KEY_PREFIX}:{policy.name}:{identity}"
+    try:
+        allowed, count, retry_ms = get_redis().eval(
+            _SLIDING_WINDOW_LUA,
+            1,
+            key,
+            now_ms,
+            policy.window_seconds * 1000,
+            policy.limit,
+            f"{now_ms}:{uuid.uuid4().hex[:8]}",
+        )
+    except Exception as exc:
+        logger.warning("Rate limiter unavailable", policy=policy.name, error=str(exc))
+        return
+
+    if int(allowed) != 1:
+        raise APIError(
+            code=policy.error_code,
+            http_code=429,
+            message=policy.message,
+            details={
+                "limit": policy.limit,
+                "window_seconds": policy.window_seconds,
+                "retry_after_seconds": max(1, math.ceil(int(retry_ms) / 1000)),
+            },
+        )
+
+
+def rate_limit(
+    policy: RateLimitPolicy,
+    key_func: Callable[[Request], Optional[str]] = client_ip,
+) -> Callable[[Request], None]:
+    """
+    FastAPI-зависимость: `dependencies=[Depends(rate_limit(POLICY))]`.
+    """
+
+    def _dependency(request: Request) -> None:
+        identity = key_func(request)
+        if identity:
+            hit(policy, identity)
+
+    return _dependency
+
+
+__all__ = ["RateLimitPolicy", "client_ip", "hit", "rate_limit"]
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+from sqlalchemy import and_, delete, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.auth.models import (
+    EmailVerificationToken,
+    LoginAttempt,
+    PasswordResetToken,
+    UserSession,
+)
+from app.core.auth.qr_status import QR_LOGIN_TOKEN_TTL_SECONDS
+from app.core.config import settings
+from app.utils.redis_client import get_redis
+
+
+RETENTION_METRICS_KEY_PREFIX = "retention:metrics:"
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@dataclass(frozen=True)
+class RetentionRule:
+    """
+    Что удалять из таблицы: `condition(now)` возвращает SQL-условие
+    для устаревших строк. Ключ пагинации — первичный ключ `id`.
+    """
+
+    table: str
+    model: Any
+    condition: Callable[[datetime], Any]
+
+
+@dataclass
+class RetentionResult:
+    table: str
+    rows_removed: int
+    batches: int
+    duration_ms: int
+    finished_at: str
+    complete: bool
+
+
+RETENTION_RULES: Dict[str, RetentionRule] = {
+    rule.table: rule
+    for rule in (
+        RetentionRule(
+            table="login_attempts",
+            model=LoginAttempt,
+            condition=lambda now: LoginAttempt.created_at
+            < now - timedelta(seconds=QR_LOGIN_TOKEN_TTL_SECONDS * 2),
+        ),
+        RetentionRule(
+            table="email_verification_tokens",
+            model=EmailVerificationToken,
+            condition=lambda now: EmailVerificationToken.expires_at <= now,
+        ),
+        RetentionRule(
+            table="password_reset_tokens",
+            model=PasswordResetToken,
+            condition=lambda now: or_(
+                PasswordResetToken.used_at.is_not(None),
+                PasswordResetToken.expires_at <= now,
+            ),
+        ),
+        # Отозванные и истёкшие сессии какое-то время остаются в БД для истории входов.
+        RetentionRule(
+            table="user_sessions",
+            model=UserSession,
+            condition=lambda now: or_(
+                UserSession.revoked_at
+                < now - timedelta(days=settings.retention_session_grace_days),
+                UserSession.expires_at
+                < now - timedelta(days=settings.retention_session_grace_days),
+            ),
+        ),
+    )
+}
+
+
+def _record_metrics(result: RetentionResult) -> None:
+    try:
+        redis = get_redis()
+        key = f"{RETENTION_METRICS_KEY_PREFIX}{result.table}"
+        pipe = redis.pipeline()
+        pipe.hset(
+            key,
+            mapping={
+                "last_rows_removed": result.rows_removed,
+                "last_batches": result.batches,
+                "last_duration_ms": result.duration_ms,
+                "last_finished_at": result.finished_at,
+                "last_complete": int(result.complete),
+            },
+        )
+        pipe.hincrby(key, "total_rows_removed", result.rows_removed)
+        pipe.hincrby(key, "runs", 1)
+        pipe.execute()
+    except Exception as exc:
+        logger.warning("Failed to record retention metrics", error=str(exc))
+
+
+def purge_table(
+    db: Session,
+    table: str,
+    *,
+    batch_size: Optional[int] = None,
+    pause_seconds: Optional[float] = None,
+    max_batches: Optional[int] = None,
+) -> RetentionResult:
+    """
+    Удаляет устаревшие строки таблицы пачками по `batch_size`.
+
+    Пачка выбирается по ключу (`id > последний id`), каждая удаляется
+    и коммитится отдельной короткой транзакцией, между пачками — пауза.
+    За один запуск — не больше `max_batches` пачек; остаток дочистит
+    следующий запуск (`complete=False`).
+    """
+    rule = RETENTION_RULES[table]
+    batch_size = batch_size or settings.retention_batch_size
+    if pause_seconds is None:
+        pause_seconds = settings.retention_batch_pause_seconds
+    max_batches = max_batches or settings.retention_max_batches
+
+    model = rule.model
+    now = _utc_now()
+    started = time.monotonic()
+    removed = 0
+    batches = 0
+    last_id = None
+    complete = False
+
+    while batches < max_batches:
+        condition = rule.condition(now)
+        if last_id is not None:
+            condition = and_(condition, model.id > last_id)
+        ids: List[Any] = list(
+            db.execute(
+                select(model.id).where(condition).order_by(model.id).limit(batch_size)
+            ).scalars()
+        )
+        if not ids:
+            complete = True
+            break
+
+        result = db.execute(
+            delete(model)
+            .where(model.id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        removed += result.rowcount or 0
+        batches += 1
+        last_id = ids[-1]
+
+        if len(ids) < batch_size:
+            complete = True
+            break
+        if pause_seconds:
+            time.sleep(pause_seconds)
+
+    outcome = RetentionResult(
+        table=table,
+        rows_removed=removed,
+        batches=batches,
+        duration_ms=int((time.monotonic() - started) * 1000),
+        finished_at=_utc_now().isoformat(),
+        complete=complete,
+    )
+    _record_metrics(outcome)
+    logger.info("Retention purge finished", **asdict(outcome))
+    return outcome
+
+
+def purge_all(db: Session) -> List[RetentionResult]:
+    """
+    Чистит все таблицы из `RETENTION_RULES`; ошибка в одной не мешает остальным.
+    """
+    results: List[RetentionResult] = []
+    for table in RETENTION_RULES:
+        try:
+            results.append(purge_table(db, table))
+        except Exception as exc:
+            db.rollback()
+            logger.error("Retention purge failed", table=table, error=str(exc))
+    return results
+
+
+__all__ = [
+    "RETENTION_RULES",
+    "RetentionResult",
+    "RetentionRule",
+    "purge_all",
+    "purge_table",
+]
@@ -4,13 +4,12 @@ from datetime import date, timedelta
 from typing import Dict, List
 from uuid import UUID
 
-from celery.exceptions import TimeoutError as CeleryTimeoutError
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
 from sqlalchemy.orm import Session
 
 from app.core.auth.models import User
-from app.core.config import settings
 from app.core.dependencies import get_current_user, get_db
+from app.core.jobs.services import enqueue_job, run_task, wait_for_task_result
 from app.core.rituals.schemas import (
     JournalEntryIn,
     JournalEntryPublic,
@@ -18,12 +17,10 @@ from app.core.rituals.schemas import (
     StepPublic,
     WeeklyAnalyzeIn,
     WeeklyCommitIn,
-    WeeklyReviewPublic,
 )
 from app.core.rituals.services import (
     commit_week_plan,
     create_journal_entry,
-    create_weekly_review,
     get_plan_suggestion,
     get_today_status_with_interception,
     get_week_bounds,
@@ -36,9 +33,8 @@ from app.core.gamification.services import (
     build_gamification_event,
 )
 from app.core.limits.dependencies import check_text_quota
+from app.core.limits.services import QuotaSpend
 from app.response import StandardResponse, make_success_response
-from app.response.response import APIError
-from mechtaai_bg_worker.celery_app import celery_app
 
 
 router = APIRouter(prefix="/rituals", tags=["rituals"])
@@ -96,71 +92,59 @@ def rituals_entry_view(
 @router.post(
     "/weekly/analyze",
     response_model=StandardResponse,
-    dependencies=[Depends(check_text_quota)],
     summary="Анализ недели (AI)",
+    description=(
+        "Ревью недели сохраняется worker-ом вместе с AI-анализом.\n\n"
+        "С `?async=true` сразу возвращает 202 и `job_id`; "
+        "результат забирается через GET `/jobs/{job_id}`."
+    ),
 )
 def weekly_analyze_view(
     payload: WeeklyAnalyzeIn,
+    response: Response,
+    run_async: bool = Query(
+        False,
+        alias="async",
+        description="Вернуть 202 и job_id, не дожидаясь результата AI.",
+    ),
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
+    quota: QuotaSpend = Depends(check_text_quota),
 ) -> StandardResponse:
     week_start, week_end = get_week_bounds(date.today() - timedelta(days=1))
     completed, failed = get_weekly_steps(db, user.id, week_start, week_end)
     mood_avg = get_week_mood_avg(db, user.id, week_start, week_end)
     week_dates = f"{week_start:%d.%m} - {week_end:%d.%m}"
 
-    task = celery_app.send_task(
-        "rituals.weekly_review",
-        args=[
-            str(user.id),
-            {
-                "week_dates": week_dates,
-                "completed_steps": [
-                    {"title": s.title, "area": None} for s in completed
-                ],
-                "failed_steps": [{"title": s.title, "area": None} for s in failed],
-                "mood_avg": mood_avg,
-                "user_reflection": payload.user_reflection,
-            },
-        ],
-    )
-    timeout_seconds = settings.ai_proxy_timeout_seconds + 30
-    try:
-        result = task.get(timeout=timeout_seconds)
-    except CeleryTimeoutError:
-        raise APIError(
-            code="RITUALS_AI_TIMEOUT",
-            http_code=504,
-            message="Weekly review timed out.",
-        )
-
-    if not result or not result.get("ok"):
-        error = (result or {}).get("error") or {}
-        raise APIError(
-            code=error.get("code", "RITUALS_AI_FAILED"),
-            http_code=error.get("http_code", 500),
-            message=error.get("message", "Weekly review failed."),
-        )
-
-    ai_analysis = result["analysis"]
-    review = create_weekly_review(
+    args = [
+        str(user.id),
+        {
+            "week_dates": week_dates,
+            "week_start": week_start.isoformat(),
+            "week_end": week_end.isoformat(),
+            "completed_steps": [
+                {"title": s.title, "area": None} for s in completed
+            ],
+            "failed_steps": [{"title": s.title, "area": None} for s in failed],
+            "completed_step_ids": [str(s.id) for s in completed],
+            "failed_step_ids": [str(s.id) for s in failed],
+            "mood_avg": mood_avg,
+            "user_reflection": payload.user_reflection,
+        },
+    ]
+    if run_async:
+        job = enqueue_job(user.id, "rituals.weekly_review", args=args, quota=quota)
+        response.status_code = 202
+        return make_success_response(result=job)
+
+    task = run_task(user.id, "rituals.weekly_review", args, quota=quota)
+    result = wait_for_task_result(
+        task,
+        error_prefix="RITUALS",
+        label="Weekly review",
         db=db,
-        user_id=user.id,
-        week_start=week_start,
-        week_end=week_end,
-        completed_steps=[str(s.id) for s in completed],
-        failed_steps=[str(s.id) for s in failed],
-        user_reflection=payload.user_reflection,
-        ai_analysis=ai_analysis,
-    )
-    award_result = award_action(db, user.id, ActionType.WEEKLY_REVIEW_COMPLETE)
-    response_payload = WeeklyReviewPublic.model_validate(review).model_dump(mode="json")
-    response_payload["ai_analysis"] = ai_analysis
-    response_payload["gamification_event"] = build_gamification_event(
-        ActionType.WEEKLY_REVIEW_COMPLETE,
-        award_result,
     )
-    return make_success_response(result=response_payload)
+    return make_success_response(result=result["review"])
 
 
 @router.get(
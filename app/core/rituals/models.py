@@ -4,8 +4,9 @@ import uuid
 
 from sqlalchemy import Column, Date, DateTime, ForeignKey, Index, Integer, String, Text, func
 from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.orm import deferred
 
-from app.database.base import Base
+from app.database.base import HEAVY_GROUP, Base
 
 
 JournalEntryType = ("morning", "evening")
@@ -55,10 +56,16 @@ class WeeklyReview(Base):
     )
     week_start = Column(Date, nullable=False)
     week_end = Column(Date, nullable=False)
-    completed_steps = Column(JSONB, nullable=False, default=list)
-    failed_steps = Column(JSONB, nullable=False, default=list)
-    user_reflection = Column(Text, nullable=True)
-    ai_analysis = Column(JSONB, nullable=True)
+    completed_steps = deferred(
+        Column(JSONB, nullable=False, default=list),
+        group=HEAVY_GROUP,
+    )
+    failed_steps = deferred(
+        Column(JSONB, nullable=False, default=list),
+        group=HEAVY_GROUP,
+    )
+    user_reflection = deferred(Column(Text, nullable=True), group=HEAVY_GROUP)
+    ai_analysis = deferred(Column(JSONB, nullable=True), group=HEAVY_GROUP)
     status = Column(String, nullable=False, default="in_progress")
 
     created_at = Column(
@@ -1,28 +1,150 @@
 from __future__ import annotations
 
+import multiprocessing
+import os
 import secrets
+import threading
 import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Optional
 
 import jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
-pwd_context = CryptContext(
-    schemes=["pbkdf2_sha256"],
-    deprecated="auto",
-)
+from app.response.response import APIError
 
 
-def hash_password(password: str) -> str:
+def _build_pwd_context(rounds: Optional[int] = None) -> CryptContext:
+    options: Dict[str, Any] = {}
+    if rounds:
+        options["pbkdf2_sha256__default_rounds"] = rounds
+    return CryptContext(
+        schemes=["pbkdf2_sha256"],
+        deprecated="auto",
+        **options,
+    )
+
+
+pwd_context = _build_pwd_context(settings.password_hash_rounds)
+
+# Пароль-заглушка для аккаунтов, созданных ботом: не является хешем,
+# поэтому с ним нельзя войти; настоящий хеш появится при сбросе пароля.
+UNUSABLE_PASSWORD_PREFIX = "!"
+
+
+def make_unusable_password() -> str:
+    return f"{UNUSABLE_PASSWORD_PREFIX}{secrets.token_urlsafe(16)}"
+
+
+def is_password_usable(hashed_password: str | None) -> bool:
+    return bool(hashed_password) and not hashed_password.startswith(
+        UNUSABLE_PASSWORD_PREFIX
+    )
+
+
+def _hash_inline(password: str) -> str:
     return pwd_context.hash(password)
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+def _verify_inline(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+class PasswordHasher:
+    """
+    Пул процессов для pbkdf2: хеширование не держит GIL и потоки API.
+
+    Очередь ограничена: если в работе и в ожидании уже
+    `workers + PASSWORD_HASH_QUEUE_SIZE` задач, запрос сразу получает 429,
+    а не копится в threadpool.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[threading.BoundedSemaphore] = None
+        self._pid: Optional[int] = None
+
+    @staticmethod
+    def workers() -> int:
+        configured = settings.password_hash_workers
+        if configured is None:
+            return os.cpu_count() or 1
+        return max(configured, 0)
+
+    def _ensure(self) -> ProcessPoolExecutor:
+        pid = os.getpid()
+        if self._executor is not None and self._pid == pid:
+            return self._executor
+        with self._lock:
+            if self._executor is None or self._pid != pid:
+                workers = self.workers()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                self._slots = threading.BoundedSemaphore(
+                    workers + settings.password_hash_queue_size
+                )
+                self._pid = pid
+        return self._executor
+
+    def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self.workers() == 0:
+            return func(*args)
+
+        executor = self._ensure()
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise APIError(
+                code="AUTH_HASHING_BUSY",
+                http_code=429,
+                message="Сервер перегружен. Повторите попытку позже.",
+                details={"retry_after_seconds": 1},
+            )
+        try:
+            future = executor.submit(func, *args)
+        except BaseException:
+            slots.release()
+            raise
+        # Слот занят, пока задача реально в пуле: cancel() не остановит уже
+        # запущенное хеширование, и после таймаута оно продолжает считаться.
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            return future.result(timeout=settings.password_hash_timeout_seconds)
+        except FutureTimeoutError:
+            future.cancel()
+            raise APIError(
+                code="AUTH_HASHING_BUSY",
+                http_code=429,
+                message="Сервер перегружен. Повторите попытку позже.",
+                details={"retry_after_seconds": 1},
+            )
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._slots = None
+
+
+password_hasher = PasswordHasher()
+
+
+def hash_password(password: str) -> str:
+    return password_hasher.run(_hash_inline, password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    if not is_password_usable(hashed_password):
+        return False
+    return password_hasher.run(_verify_inline, plain_password, hashed_password)
+
+
 def _utc_now() -> datetime:
     return datetime.now(timezone.utc)
 
@@ -92,6 +214,9 @@ def generate_random_token() -> str:
 __all__ = [
     "hash_password",
     "verify_password",
+    "make_unusable_password",
+    "is_password_usable",
+    "password_hasher",
     "create_access_token",
     "create_refresh_token",
     "decode_token",
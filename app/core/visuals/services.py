@@ -6,13 +6,14 @@ from pathlib import Path
 from typing import Dict, Tuple
 from uuid import UUID
 
-import httpx
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.core.future_story.models import FutureStory
 from app.core.visuals.models import VisualAsset
 from app.response.response import APIError
+from app.utils.ai_client import get_ai_client
+from app.utils.fieldsets import projection_options
 
 
 def _find_prompt_in_story(story: FutureStory, image_key: str) -> Tuple[str, str]:
@@ -58,10 +59,7 @@ def _call_image_proxy(prompt: str) -> str:
         "quality": "standard",
         "response_format": "url",
     }
-    with httpx.Client(timeout=settings.ai_proxy_timeout_seconds) as client:
-        response = client.post(settings.ai_proxy_image_url, json=payload)
-    response.raise_for_status()
-    data = response.json()
+    data = get_ai_client().post_json(settings.ai_proxy_image_url, payload, mode="image")
     url = data.get("url")
     if not isinstance(url, str) or not url:
         raise APIError(
@@ -73,10 +71,7 @@ def _call_image_proxy(prompt: str) -> str:
 
 
 def _download_image(url: str) -> bytes:
-    with httpx.Client(timeout=settings.ai_proxy_timeout_seconds) as client:
-        response = client.get(url)
-    response.raise_for_status()
-    return response.content
+    return get_ai_client().download(url)
 
 
 def _save_image(
@@ -101,6 +96,7 @@ def generate_and_save(
 ) -> VisualAsset:
     story = (
         db.query(FutureStory)
+        .options(*projection_options(FutureStory))
         .filter(FutureStory.id == story_id, FutureStory.user_id == user_id)
         .first()
     )
@@ -1,17 +1,23 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+import asyncio
+import json
+from typing import Any, Dict, List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Response, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from fastapi.encoders import jsonable_encoder
+from loguru import logger
 from sqlalchemy.orm import Session
-from celery.exceptions import TimeoutError as CeleryTimeoutError
 
 from app.core.auth.models import User
 from app.core.config import settings
 from app.core.dependencies import get_current_user, get_db
+from app.core.jobs.services import enqueue_job, run_task, wait_for_task_result
 from app.core.limits.dependencies import check_text_quota
+from app.core.limits.services import QuotaSpend
+from app.core.wants.models import WantsRaw
 from app.core.wants.schemas import (
     WantsAnalysisPublic,
     WantsFutureMePublic,
@@ -25,6 +31,7 @@ from app.core.wants.schemas import (
     WantsStreamStartPublic,
     WantsTextIn,
 )
+from app.core.wants.stream_buffer import StreamBuffer, flush_stream_ops, open_stream
 from app.core.wants.services import (
     append_future_me_text,
     append_stream_text,
@@ -36,26 +43,38 @@ from app.core.wants.services import (
     get_history_page,
     get_latest_analysis,
     get_or_create_draft,
+    get_progress,
+    get_stream_preview,
+    get_stream_text,
     remove_stream_line,
     set_future_me,
     start_stream,
     update_reverse,
 )
-from mechtaai_bg_worker.celery_app import celery_app
-from app.response import Pagination, StandardResponse, make_success_response
+from app.response import StandardResponse, make_success_response
 from app.response.response import APIError
+from app.utils.fieldsets import parse_fields, project
+from app.utils.pagination import make_pagination
 
 
 router = APIRouter(prefix="/wants", tags=["wants"])
 
+FIELDS_DESCRIPTION = (
+    "Поля WantsRawPublic через запятую (например `id,status,completed_at`); "
+    "`id` возвращается всегда. Без параметра — все поля."
+)
+
 
-def _preview(text: str | None, *, max_chars: int = 500) -> str | None:
-    if not text:
-        return None
-    s = text.strip()
-    if len(s) <= max_chars:
-        return s
-    return s[-max_chars:]
+def _raw_public(db: Session, wants_raw: WantsRaw) -> WantsRawPublic:
+    """
+    `WantsRawPublic` с текстом потока: у draft он собирается из `wants_raw_chunks`.
+    """
+    public = WantsRawPublic.from_orm(wants_raw)
+    if wants_raw.status == "draft":
+        public = public.model_copy(
+            update={"raw_wants_stream": get_stream_text(db, wants_raw)}
+        )
+    return public
 
 
 @router.post(
@@ -83,7 +102,7 @@ def create_or_get_draft_view(
     Используйте это как самый первый шаг перед упражнениями, если на клиенте ещё нет raw_id.
     """
     draft = get_or_create_draft(db, user.id)
-    return make_success_response(result=WantsRawPublic.from_orm(draft))
+    return make_success_response(result=_raw_public(db, draft))
 
 
 @router.get(
@@ -113,7 +132,7 @@ def get_draft_view(
             http_code=404,
             message="Draft wants_raw не найден. Создайте через POST /wants/raw.",
         )
-    return make_success_response(result=WantsRawPublic.from_orm(draft))
+    return make_success_response(result=_raw_public(db, draft))
 
 
 @router.post(
@@ -161,8 +180,8 @@ def stream_start_view(
         "Правила:\n"
         "- если draft не существует — будет создан автоматически\n"
         "- если поток ещё не стартовал — `stream_started_at` будет установлен автоматически\n"
-        "- текст дописывается в `raw_wants_stream` (через `\\n`)\n"
-        "- дополнительно создаётся запись в `wants_raw_chunks` (exercise=`stream`)\n\n"
+        "- каждая непустая строка текста добавляется записью в `wants_raw_chunks` "
+        "(exercise=`stream`); `raw_wants_stream` собирается из них при завершении wants\n\n"
         "Автозавершение:\n"
         "- если `text` равен `стоп` или `stop` (trim + casefold), то упражнение завершается:\n"
         "  - выставляется `stream_completed_at`\n"
@@ -183,7 +202,7 @@ def stream_append_view(
     result = WantsStreamAppendPublic(
         raw_id=wants_raw.id,
         is_completed=is_completed,
-        raw_wants_stream_preview=_preview(wants_raw.raw_wants_stream),
+        raw_wants_stream_preview=get_stream_preview(db, wants_raw.id),
     )
     return make_success_response(result=result)
 
@@ -194,7 +213,8 @@ def stream_append_view(
     summary="Поток: удалить строку по индексу",
     description=(
         "Удаляет одну строку из упражнения 'Поток Я хочу' по индексу.\n\n"
-        "- Индексация 0-based\n"
+        "- Индексация 0-based (среди неудалённых строк)\n"
+        "- Строка помечается удалённой в `wants_raw_chunks`, остальные не переписываются\n"
         "- Можно использовать для коррекции записанных желаний\n"
     ),
 )
@@ -213,6 +233,224 @@ def stream_remove_view(
     return make_success_response(result=result)
 
 
+WS_AUTH_TIMEOUT_SECONDS = 10
+WS_MAX_TEXT_LENGTH = 50_000
+
+
+def _ws_error(code: str, message: str) -> Dict[str, Any]:
+    return {"type": "error", "code": code, "message": message}
+
+
+async def _ws_flush(buffer: StreamBuffer) -> None:
+    """
+    Пишет накопленное; при ошибке пачка возвращается в буфер, чтобы её можно
+    было записать повторно.
+    """
+    lines = buffer.line_count
+    ops, completed = buffer.take()
+    try:
+        await run_in_threadpool(flush_stream_ops, buffer.wants_raw_id, ops, completed)
+    except Exception:
+        buffer.restore(ops)
+        raise
+    buffer.persisted = lines
+    buffer.completion_persisted = completed
+
+
+async def _ws_close(websocket: WebSocket, code: int, error: Dict[str, Any]) -> None:
+    # Клиент мог уже отключиться — тогда сообщить об ошибке некому.
+    try:
+        await websocket.send_json(error)
+        await websocket.close(code=code)
+    except Exception:
+        pass
+
+
+def _ws_apply(buffer: StreamBuffer, message: Dict[str, Any]) -> None:
+    kind = message.get("type")
+    if kind == "line":
+        text = message.get("text")
+        if not isinstance(text, str) or not text or len(text) > WS_MAX_TEXT_LENGTH:
+            raise APIError(
+                code="WANTS_STREAM_TEXT_INVALID",
+                http_code=400,
+                message="text должен быть непустой строкой до 50000 символов.",
+            )
+        buffer.add_text(text)
+    elif kind == "remove":
+        index = message.get("index")
+        if not isinstance(index, int) or isinstance(index, bool):
+            raise APIError(
+                code="WANTS_STREAM_INDEX_INVALID",
+                http_code=400,
+                message="Некорректный индекс строки.",
+            )
+        buffer.remove(index)
+    elif kind == "finish":
+        buffer.completed = True
+    else:
+        raise APIError(
+            code="WANTS_STREAM_MESSAGE_INVALID",
+            http_code=400,
+            message="Неизвестный тип сообщения.",
+        )
+
+
+@router.websocket("/stream/ws")
+async def stream_ws(websocket: WebSocket) -> None:
+    """
+    Поток «Я хочу» по WebSocket: одна аутентификация на соединение, строки
+    копятся в памяти и пишутся в `wants_raw_chunks` пачками — раз в
+    `WANTS_WS_FLUSH_INTERVAL_SECONDS` или по `WANTS_WS_FLUSH_MAX_OPS` операций.
+
+    Протокол (JSON-сообщения):
+    - клиент первым шлёт `{"type": "auth", "token": "<access token>"}`,
+      сервер отвечает `{"type": "ready", "raw_id", "lines", "preview"}`;
+    - `{"type": "line", "text": "..."}` — строка (`стоп`/`stop` завершает поток),
+      `{"type": "remove", "index": N}` — удалить строку, `{"type": "finish"}` — завершить;
+    - на каждое сообщение сервер отвечает `{"type": "ack", "lines", "persisted",
+      "preview"}` без обращения к БД. `ack` — строка принята в буфер, но ещё
+      не обязательно записана: сохранены первые `persisted` строк из `lines`;
+    - при завершении — `{"type": "completed", "raw_id"}` (всё записано)
+      и закрытие соединения; ошибки — `{"type": "error", "code", "message"}`;
+      бинарные кадры отклоняются с `WANTS_STREAM_MESSAGE_INVALID`.
+    """
+    await websocket.accept()
+    try:
+        auth = json.loads(
+            await asyncio.wait_for(websocket.receive_text(), WS_AUTH_TIMEOUT_SECONDS)
+        )
+        token = auth.get("token") if auth.get("type") == "auth" else None
+    except (asyncio.TimeoutError, ValueError, AttributeError, KeyError):
+        # KeyError — бинарный кадр вместо текстового.
+        token = None
+    except WebSocketDisconnect:
+        return
+    if not isinstance(token, str) or not token:
+        await websocket.send_json(
+            _ws_error("AUTH_NOT_AUTHENTICATED", "Первым сообщением ожидается auth с токеном.")
+        )
+        await websocket.close(code=1008)
+        return
+
+    try:
+        buffer = await run_in_threadpool(open_stream, token)
+    except APIError as exc:
+        await websocket.send_json(_ws_error(exc.code, exc.message))
+        await websocket.close(code=1008)
+        return
+    await websocket.send_json(
+        {
+            "type": "ready",
+            "raw_id": str(buffer.wants_raw_id),
+            "lines": buffer.line_count,
+            "persisted": buffer.persisted,
+            "preview": buffer.preview(),
+        }
+    )
+
+    # Чтение в отдельной задаче: ожидание очереди с таймаутом (для flush
+    # по времени) безопасно отменять, в отличие от самого receive.
+    inbox: asyncio.Queue = asyncio.Queue()
+
+    async def reader() -> None:
+        # None в очереди — конец чтения по любой причине, иначе основной цикл
+        # ждал бы очередь вечно.
+        try:
+            while True:
+                frame = await websocket.receive()
+                if frame["type"] == "websocket.disconnect":
+                    return
+                text = frame.get("text")
+                await inbox.put(text if text is not None else b"")
+        except Exception:
+            logger.debug("Wants stream socket read failed", exc_info=True)
+        finally:
+            inbox.put_nowait(None)
+
+    reader_task = asyncio.create_task(reader())
+    loop = asyncio.get_running_loop()
+    flush_at: Optional[float] = None
+    try:
+        while True:
+            timeout = None if flush_at is None else max(flush_at - loop.time(), 0)
+            try:
+                raw = await asyncio.wait_for(inbox.get(), timeout)
+            except asyncio.TimeoutError:
+                await _ws_flush(buffer)
+                flush_at = None
+                continue
+            if raw is None:
+                break
+            if isinstance(raw, bytes):
+                await websocket.send_json(
+                    _ws_error(
+                        "WANTS_STREAM_MESSAGE_INVALID",
+                        "Ожидается текстовое JSON-сообщение.",
+                    )
+                )
+                continue
+
+            try:
+                message = json.loads(raw)
+                if not isinstance(message, dict):
+                    raise ValueError
+                _ws_apply(buffer, message)
+            except ValueError:
+                await websocket.send_json(
+                    _ws_error("WANTS_STREAM_MESSAGE_INVALID", "Ожидается JSON-объект.")
+                )
+                continue
+            except APIError as exc:
+                await websocket.send_json(_ws_error(exc.code, exc.message))
+                continue
+
+            if buffer.completed:
+                await _ws_flush(buffer)
+                await websocket.send_json(
+                    {"type": "completed", "raw_id": str(buffer.wants_raw_id)}
+                )
+                await websocket.close(code=1000)
+                return
+
+            if buffer.pending >= settings.wants_ws_flush_max_ops:
+                await _ws_flush(buffer)
+                flush_at = None
+            elif buffer.pending and flush_at is None:
+                flush_at = loop.time() + settings.wants_ws_flush_interval_seconds
+
+            await websocket.send_json(
+                {
+                    "type": "ack",
+                    "lines": buffer.line_count,
+                    "persisted": buffer.persisted,
+                    "preview": buffer.preview(),
+                }
+            )
+    except APIError as exc:
+        await _ws_close(websocket, 1008, _ws_error(exc.code, exc.message))
+    except Exception:
+        # Пачка не записана (flush_stream_ops уже залогировал причину) и
+        # возвращена в буфер — ниже ещё одна попытка. Клиент должен
+        # переподключиться и получить актуальное состояние.
+        await _ws_close(
+            websocket,
+            1011,
+            _ws_error("WANTS_STREAM_FLUSH_FAILED", "Не удалось сохранить строки."),
+        )
+    finally:
+        reader_task.cancel()
+        if buffer.dirty:
+            try:
+                await _ws_flush(buffer)
+            except Exception:
+                logger.error(
+                    "Wants stream ops lost",
+                    wants_raw_id=str(buffer.wants_raw_id),
+                    ops=buffer.pending,
+                )
+
+
 @router.post(
     "/stream/finish",
     response_model=StandardResponse,
@@ -395,7 +633,7 @@ def wants_progress_view(
 
     Возвращает только статусы/флаги готовности (без тяжёлых текстов), чтобы клиенту было проще.
     """
-    wants_raw = get_or_create_draft(db, user.id)
+    wants_raw = get_progress(db, user.id)
     stream_done = wants_raw.stream_completed_at is not None
     future_me_done = wants_raw.future_me_completed_at is not None
     reverse_done = wants_raw.reverse_completed_at is not None
@@ -443,35 +681,42 @@ def wants_complete_view(
 @router.post(
     "/analyze",
     response_model=StandardResponse,
-    dependencies=[Depends(check_text_quota)],
     summary="Analyze wants via AI",
     description=(
         "Triggers AI analysis for the latest completed wants_raw and returns "
-        "the persisted wants_analysis payload."
+        "the persisted wants_analysis payload.\n\n"
+        "With `?async=true` the request returns 202 with a job id immediately; "
+        "poll GET `/jobs/{job_id}` for the result."
     ),
 )
 def wants_analyze_view(
+    response: Response,
+    run_async: bool = Query(
+        False,
+        alias="async",
+        description="Вернуть 202 и job_id, не дожидаясь результата AI.",
+    ),
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
+    quota: QuotaSpend = Depends(check_text_quota),
 ) -> StandardResponse:
-    task = celery_app.send_task("wants.analyze", args=[str(user.id)])
-    timeout_seconds = settings.ai_proxy_timeout_seconds + 30
-    try:
-        result = task.get(timeout=timeout_seconds)
-    except CeleryTimeoutError:
-        raise APIError(
-            code="WANTS_AI_TIMEOUT",
-            http_code=504,
-            message="AI analysis timed out.",
-        )
-
-    if not result or not result.get("ok"):
-        error = (result or {}).get("error") or {}
-        raise APIError(
-            code=error.get("code", "WANTS_AI_FAILED"),
-            http_code=error.get("http_code", 500),
-            message=error.get("message", "AI analysis failed."),
+    if run_async:
+        job = enqueue_job(
+            user.id,
+            "wants.analyze",
+            args=[str(user.id)],
+            quota=quota,
         )
+        response.status_code = 202
+        return make_success_response(result=job)
+
+    task = run_task(user.id, "wants.analyze", [str(user.id)], quota=quota)
+    result = wait_for_task_result(
+        task,
+        error_prefix="WANTS",
+        label="AI analysis",
+        db=db,
+    )
 
     analysis = (
         WantsAnalysisPublic.model_validate(result["analysis"]).model_dump(mode="json")
@@ -503,42 +748,55 @@ def wants_analysis_view(
     description=(
         "Возвращает список `completed` wants_raw записей текущего пользователя.\n\n"
         "Пагинация:\n"
-        "- `page` (по умолчанию 1)\n"
-        "- `page_size` (по умолчанию 20)\n\n"
+        "- `cursor` — `meta.pagination.next_cursor` предыдущей страницы\n"
+        "- `page` (по умолчанию 1; без `cursor` — номер страницы через OFFSET)\n"
+        "- `page_size` (по умолчанию 20)\n"
+        "- `with_total` — считать `total` (по умолчанию true, значение кешируется)\n\n"
+        "Поля:\n"
+        "- `fields` — вернуть только перечисленные поля; большие тексты, которые не "
+        "запрошены, не читаются из БД\n\n"
         "Результат:\n"
         "- `result.items` содержит массив wants_raw\n"
-        "- `meta.pagination` содержит расчёт пагинации\n"
+        "- `meta.pagination` содержит расчёт пагинации и `next_cursor`\n"
     ),
 )
 def wants_history_view(
     page: int = Query(1, ge=1, description="Номер страницы (1..)."),
     page_size: int = Query(20, ge=1, le=100, description="Размер страницы (1..100)."),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы."),
+    with_total: bool = Query(True, description="Считать total."),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
 ) -> StandardResponse:
     """
     История завершённых wants.
     """
-    items, total = get_history_page(
+    selected = parse_fields(fields, WantsRawPublic)
+    items, total, next_cursor = get_history_page(
         db=db,
         user_id=user.id,
         page=page,
         page_size=page_size,
+        cursor=cursor,
+        with_total=with_total,
+        fields=selected,
     )
 
-    result_items: List[Dict[str, Any]] = [
-        WantsRawPublic.from_orm(i).model_dump() for i in items
-    ]
+    if selected is None:
+        result_items: List[Dict[str, Any]] = [
+            WantsRawPublic.from_orm(i).model_dump() for i in items
+        ]
+    else:
+        result_items = [project(i, selected) for i in items]
     payload: Dict[str, Any] = {"items": result_items}
 
-    total_pages = (total + page_size - 1) // page_size if page_size > 0 else 1
-    pagination = Pagination(
+    pagination = make_pagination(
         page=page,
         page_size=page_size,
         total=total,
-        total_pages=total_pages,
-        has_next=page < total_pages,
-        has_prev=page > 1,
+        next_cursor=next_cursor,
+        cursor=cursor,
     )
     return make_success_response(
         result=jsonable_encoder(payload),
@@ -561,19 +819,23 @@ def wants_history_view(
 )
 def wants_raw_by_id_view(
     raw_id: UUID,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
 ) -> StandardResponse:
     """
     Получить конкретный completed wants_raw.
     """
-    wants_raw = get_completed_by_id(db, user.id, raw_id)
+    selected = parse_fields(fields, WantsRawPublic)
+    wants_raw = get_completed_by_id(db, user.id, raw_id, fields=selected)
     if wants_raw is None:
         raise APIError(
             code="WANTS_RAW_NOT_FOUND",
             http_code=404,
             message="wants_raw не найден.",
         )
+    if selected is not None:
+        return make_success_response(result=jsonable_encoder(project(wants_raw, selected)))
     return make_success_response(result=WantsRawPublic.from_orm(wants_raw))
 
 
@@ -3,19 +3,21 @@ from __future__ import annotations
 import uuid
 
 from sqlalchemy import (
+    BigInteger,
     Column,
     DateTime,
     Enum,
     ForeignKey,
+    Identity,
     Index,
     Integer,
     Text,
     func,
 )
 from sqlalchemy.dialects.postgresql import JSONB, UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 
-from app.database.base import Base
+from app.database.base import HEAVY_GROUP, Base
 
 
 WantsRawStatus = Enum(
@@ -49,15 +51,17 @@ class WantsRaw(Base):
 
     stream_started_at = Column(DateTime(timezone=True), nullable=True)
     stream_timer_seconds = Column(Integer, nullable=False, default=600)
-    raw_wants_stream = Column(Text, nullable=True)
+    # Для draft источник правды — строки в wants_raw_chunks (exercise=stream);
+    # текст собирается при завершении (complete_wants).
+    raw_wants_stream = deferred(Column(Text, nullable=True), group=HEAVY_GROUP)
     stream_completed_at = Column(DateTime(timezone=True), nullable=True)
 
-    raw_future_me = Column(Text, nullable=True)
+    raw_future_me = deferred(Column(Text, nullable=True), group=HEAVY_GROUP)
     future_me_completed_at = Column(DateTime(timezone=True), nullable=True)
 
-    raw_envy = Column(Text, nullable=True)
-    raw_regrets = Column(Text, nullable=True)
-    raw_what_to_do_5y = Column(Text, nullable=True)
+    raw_envy = deferred(Column(Text, nullable=True), group=HEAVY_GROUP)
+    raw_regrets = deferred(Column(Text, nullable=True), group=HEAVY_GROUP)
+    raw_what_to_do_5y = deferred(Column(Text, nullable=True), group=HEAVY_GROUP)
     reverse_completed_at = Column(DateTime(timezone=True), nullable=True)
 
     completed_at = Column(DateTime(timezone=True), nullable=True)
@@ -87,6 +91,14 @@ Index(
     WantsRaw.updated_at.desc(),
 )
 
+Index(
+    "ix_wants_raw_user_completed_created",
+    WantsRaw.user_id,
+    WantsRaw.created_at.desc(),
+    WantsRaw.id.desc(),
+    postgresql_where=(WantsRaw.status == "completed"),
+)
+
 Index(
     "uq_wants_raw_user_draft",
     WantsRaw.user_id,
@@ -111,6 +123,9 @@ class WantsRawChunk(Base):
     )
     exercise = Column(WantsRawChunkExercise, nullable=False)
     text = Column(Text, nullable=False)
+    # Порядок строк: монотонный, в отличие от created_at (совпадает в одной транзакции).
+    seq = Column(BigInteger, Identity(), nullable=False)
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
 
     created_at = Column(
         DateTime(timezone=True),
@@ -122,9 +137,11 @@ class WantsRawChunk(Base):
 
 
 Index(
-    "ix_wants_raw_chunks_wants_raw_id_created_at",
+    "ix_wants_raw_chunks_live_seq",
     WantsRawChunk.wants_raw_id,
-    WantsRawChunk.created_at.desc(),
+    WantsRawChunk.exercise,
+    WantsRawChunk.seq,
+    postgresql_where=WantsRawChunk.deleted_at.is_(None),
 )
 
 
@@ -1,21 +1,23 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from uuid import UUID
 
-from sqlalchemy import desc
+from sqlalchemy import desc, select, update
 from sqlalchemy.orm import Session
 
 from app.core.wants.models import WantsAnalysis, WantsRaw, WantsRawChunk
 from app.response.response import APIError
+from app.utils.fieldsets import projection_options
+from app.utils.pagination import cached_count, invalidate_count, keyset_page
 
 
 def _now_utc() -> datetime:
     return datetime.now(timezone.utc)
 
 
-def _is_stop_word(text: str) -> bool:
+def is_stop_word(text: str) -> bool:
     t = text.strip().casefold()
     return t in {"стоп", "stop"}
 
@@ -29,9 +31,32 @@ def _ensure_draft_mutable(wants_raw: WantsRaw) -> None:
         )
 
 
-def get_draft(db: Session, user_id: UUID) -> WantsRaw | None:
+# Колонки, которых хватает потоку «Я хочу» (строки живут в wants_raw_chunks).
+STREAM_FIELDS = (
+    "status",
+    "stream_started_at",
+    "stream_timer_seconds",
+    "stream_completed_at",
+)
+
+# Колонки для чеклиста прогресса: тексты упражнений не читаются.
+PROGRESS_FIELDS = (
+    "status",
+    "stream_completed_at",
+    "future_me_completed_at",
+    "reverse_completed_at",
+)
+
+
+def get_draft(
+    db: Session,
+    user_id: UUID,
+    *,
+    fields: Optional[Sequence[str]] = None,
+) -> WantsRaw | None:
     return (
         db.query(WantsRaw)
+        .options(*projection_options(WantsRaw, fields))
         .filter(
             WantsRaw.user_id == user_id,
             WantsRaw.status == "draft",
@@ -41,8 +66,13 @@ def get_draft(db: Session, user_id: UUID) -> WantsRaw | None:
     )
 
 
-def get_or_create_draft(db: Session, user_id: UUID) -> WantsRaw:
-    existing = get_draft(db, user_id)
+def get_or_create_draft(
+    db: Session,
+    user_id: UUID,
+    *,
+    fields: Optional[Sequence[str]] = None,
+) -> WantsRaw:
+    existing = get_draft(db, user_id, fields=fields)
     if existing is not None:
         return existing
 
@@ -54,10 +84,15 @@ def get_or_create_draft(db: Session, user_id: UUID) -> WantsRaw:
 
 
 def get_completed_by_id(
-    db: Session, user_id: UUID, raw_id: UUID
+    db: Session,
+    user_id: UUID,
+    raw_id: UUID,
+    *,
+    fields: Optional[Sequence[str]] = None,
 ) -> WantsRaw | None:
     return (
         db.query(WantsRaw)
+        .options(*projection_options(WantsRaw, fields))
         .filter(
             WantsRaw.user_id == user_id,
             WantsRaw.id == raw_id,
@@ -70,6 +105,7 @@ def get_completed_by_id(
 def get_latest_completed(db: Session, user_id: UUID) -> WantsRaw | None:
     return (
         db.query(WantsRaw)
+        .options(*projection_options(WantsRaw))
         .filter(
             WantsRaw.user_id == user_id,
             WantsRaw.status == "completed",
@@ -80,7 +116,7 @@ def get_latest_completed(db: Session, user_id: UUID) -> WantsRaw | None:
 
 
 def start_stream(db: Session, user_id: UUID) -> WantsRaw:
-    wants_raw = get_or_create_draft(db, user_id)
+    wants_raw = get_or_create_draft(db, user_id, fields=STREAM_FIELDS)
     _ensure_draft_mutable(wants_raw)
 
     if wants_raw.stream_started_at is None:
@@ -92,40 +128,99 @@ def start_stream(db: Session, user_id: UUID) -> WantsRaw:
     return wants_raw
 
 
+def _live_stream_chunks(wants_raw_id: UUID, column):
+    return select(column).where(
+        WantsRawChunk.wants_raw_id == wants_raw_id,
+        WantsRawChunk.exercise == "stream",
+        WantsRawChunk.deleted_at.is_(None),
+    )
+
+
+def get_stream_lines(db: Session, wants_raw_id: UUID) -> List[str]:
+    """
+    Строки потока из `wants_raw_chunks` в порядке добавления (без удалённых).
+    """
+    stmt = _live_stream_chunks(wants_raw_id, WantsRawChunk.text)
+    return list(db.execute(stmt.order_by(WantsRawChunk.seq)).scalars())
+
+
+def get_stream_text(db: Session, wants_raw: WantsRaw) -> Optional[str]:
+    """
+    Текст потока: у completed — сохранённый `raw_wants_stream`, у draft —
+    собранный из строк в `wants_raw_chunks`.
+    """
+    if wants_raw.status == "completed":
+        return wants_raw.raw_wants_stream
+    lines = get_stream_lines(db, wants_raw.id)
+    return "\n".join(lines) if lines else None
+
+
+def get_stream_preview(
+    db: Session,
+    wants_raw_id: UUID,
+    *,
+    max_chars: int = 500,
+    max_lines: int = 50,
+) -> Optional[str]:
+    """
+    Хвост потока для UI: последние строки по индексу, без сборки всего текста.
+    """
+    stmt = (
+        _live_stream_chunks(wants_raw_id, WantsRawChunk.text)
+        .order_by(WantsRawChunk.seq.desc())
+        .limit(max_lines)
+    )
+    lines = list(db.execute(stmt).scalars())
+    if not lines:
+        return None
+    text = "\n".join(reversed(lines)).strip()
+    return text[-max_chars:]
+
+
+def _split_lines(text: str) -> List[str]:
+    return [line for line in text.split("\n") if line.strip()]
+
+
+def add_stream_lines(db: Session, wants_raw: WantsRaw, lines: List[str]) -> None:
+    """
+    Дописывает строки потока в `wants_raw_chunks` (одна строка — один chunk).
+    Строка `wants_raw` не переписывается; коммит — на вызывающем.
+    """
+    if wants_raw.stream_started_at is None:
+        wants_raw.stream_started_at = _now_utc()
+        db.add(wants_raw)
+    db.add_all(
+        WantsRawChunk(wants_raw_id=wants_raw.id, exercise="stream", text=line)
+        for line in lines
+    )
+
+
+def mark_stream_completed(db: Session, wants_raw: WantsRaw) -> None:
+    if wants_raw.stream_started_at is None:
+        wants_raw.stream_started_at = _now_utc()
+    if wants_raw.stream_completed_at is None:
+        wants_raw.stream_completed_at = _now_utc()
+    db.add(wants_raw)
+
+
 def append_stream_text(
     db: Session, user_id: UUID, text: str
 ) -> Tuple[WantsRaw, bool]:
-    wants_raw = get_or_create_draft(db, user_id)
+    wants_raw = get_or_create_draft(db, user_id, fields=STREAM_FIELDS)
     _ensure_draft_mutable(wants_raw)
 
-    if wants_raw.stream_started_at is None:
-        wants_raw.stream_started_at = _now_utc()
-
-    if _is_stop_word(text):
-        if wants_raw.stream_completed_at is None:
-            wants_raw.stream_completed_at = _now_utc()
-        db.add(wants_raw)
+    if is_stop_word(text):
+        mark_stream_completed(db, wants_raw)
         db.commit()
-        db.refresh(wants_raw)
         return wants_raw, True
 
-    current = (wants_raw.raw_wants_stream or "").rstrip()
-    wants_raw.raw_wants_stream = f"{current}\n{text}".lstrip() if current else text
-
-    chunk = WantsRawChunk(
-        wants_raw_id=wants_raw.id,
-        exercise="stream",
-        text=text,
-    )
-    db.add(chunk)
-    db.add(wants_raw)
+    add_stream_lines(db, wants_raw, _split_lines(text))
     db.commit()
-    db.refresh(wants_raw)
     return wants_raw, False
 
 
 def finish_stream(db: Session, user_id: UUID) -> WantsRaw:
-    wants_raw = get_or_create_draft(db, user_id)
+    wants_raw = get_or_create_draft(db, user_id, fields=STREAM_FIELDS)
     _ensure_draft_mutable(wants_raw)
 
     if wants_raw.stream_completed_at is None:
@@ -137,29 +232,86 @@ def finish_stream(db: Session, user_id: UUID) -> WantsRaw:
     return wants_raw
 
 
+def delete_stream_line(db: Session, wants_raw_id: UUID, index: int) -> None:
+    """
+    Soft-delete строки потока по 0-based индексу среди неудалённых.
+    Коммит — на вызывающем.
+    """
+    chunk_id = db.execute(
+        _live_stream_chunks(wants_raw_id, WantsRawChunk.id)
+        .order_by(WantsRawChunk.seq)
+        .offset(index)
+        .limit(1)
+    ).scalar()
+    if chunk_id is None:
+        raise APIError(
+            code="WANTS_STREAM_INDEX_INVALID",
+            http_code=400,
+            message="Некорректный индекс строки.",
+        )
+    db.execute(
+        update(WantsRawChunk)
+        .where(WantsRawChunk.id == chunk_id)
+        .values(deleted_at=_now_utc())
+    )
+
+
+def apply_stream_ops(
+    db: Session,
+    wants_raw_id: UUID,
+    ops: List[Tuple[str, Any]],
+    *,
+    completed: bool = False,
+) -> None:
+    """
+    Применяет пачку операций потока по порядку: `("line", text)` —
+    добавить строку, `("remove", index)` — удалить строку по индексу;
+    `completed` — отметить поток завершённым. Коммит — на вызывающем.
+    """
+    wants_raw = db.get(WantsRaw, wants_raw_id)
+    if wants_raw is None:
+        raise APIError(
+            code="WANTS_DRAFT_NOT_FOUND",
+            http_code=404,
+            message="Draft wants_raw не найден.",
+        )
+    _ensure_draft_mutable(wants_raw)
+
+    lines: List[str] = []
+    for kind, value in ops:
+        if kind == "line":
+            lines.append(value)
+            continue
+        if lines:
+            add_stream_lines(db, wants_raw, lines)
+            db.flush()
+            lines = []
+        delete_stream_line(db, wants_raw_id, value)
+    if lines:
+        add_stream_lines(db, wants_raw, lines)
+    if completed:
+        mark_stream_completed(db, wants_raw)
+
+
+def open_stream_draft(db: Session, user_id: UUID) -> Tuple[WantsRaw, List[str]]:
+    """
+    Draft пользователя (создаётся при необходимости) и его текущие строки потока.
+    """
+    wants_raw = get_or_create_draft(db, user_id, fields=STREAM_FIELDS)
+    _ensure_draft_mutable(wants_raw)
+    return wants_raw, get_stream_lines(db, wants_raw.id)
+
+
 def remove_stream_line(
     db: Session,
     user_id: UUID,
     index: int,
 ) -> WantsRaw:
-    wants_raw = get_or_create_draft(db, user_id)
+    wants_raw = get_or_create_draft(db, user_id, fields=STREAM_FIELDS)
     _ensure_draft_mutable(wants_raw)
 
-    lines = (wants_raw.raw_wants_stream or "").split("\n")
-    lines = [line for line in lines if line.strip() != ""]
-
-    if index < 0 or index >= len(lines):
-        raise APIError(
-            code="WANTS_STREAM_INDEX_INVALID",
-            http_code=400,
-            message="Некорректный индекс строки.",
-        )
-
-    lines.pop(index)
-    wants_raw.raw_wants_stream = "\n".join(lines) if lines else None
-    db.add(wants_raw)
+    delete_stream_line(db, wants_raw.id, index)
     db.commit()
-    db.refresh(wants_raw)
     return wants_raw
 
 
@@ -235,12 +387,15 @@ def update_reverse(
 
 
 def get_progress(db: Session, user_id: UUID) -> WantsRaw:
-    wants_raw = get_or_create_draft(db, user_id)
+    wants_raw = get_or_create_draft(db, user_id, fields=PROGRESS_FIELDS)
     _ensure_draft_mutable(wants_raw)
     return wants_raw
 
 
 def _validate_complete(wants_raw: WantsRaw) -> None:
+    """
+    Проверка перед завершением; `raw_wants_stream` уже собран из chunks.
+    """
     missing_fields: Dict[str, List[str]] = {}
 
     if wants_raw.stream_completed_at is None or not (wants_raw.raw_wants_stream or "").strip():
@@ -270,6 +425,7 @@ def complete_wants(db: Session, user_id: UUID) -> WantsRaw:
     wants_raw = get_or_create_draft(db, user_id)
     _ensure_draft_mutable(wants_raw)
 
+    wants_raw.raw_wants_stream = get_stream_text(db, wants_raw)
     _validate_complete(wants_raw)
 
     wants_raw.status = "completed"
@@ -278,15 +434,29 @@ def complete_wants(db: Session, user_id: UUID) -> WantsRaw:
     db.add(wants_raw)
     db.commit()
     db.refresh(wants_raw)
+    invalidate_count(_history_count_key(wants_raw.user_id))
     return wants_raw
 
 
+def _history_count_key(user_id: UUID) -> str:
+    return f"wants:history:{user_id}"
+
+
 def get_history_page(
     db: Session,
     user_id: UUID,
     page: int,
     page_size: int,
-) -> Tuple[List[WantsRaw], int]:
+    *,
+    cursor: Optional[str] = None,
+    with_total: bool = True,
+    fields: Optional[Sequence[str]] = None,
+) -> Tuple[List[WantsRaw], Optional[int], Optional[str]]:
+    """
+    Страница истории по курсору; без курсора `page` > 1 — старый OFFSET.
+    С `fields` читаются только эти колонки.
+    Возвращает (записи, total или None, next_cursor).
+    """
     if page < 1:
         page = 1
     if page_size < 1:
@@ -299,15 +469,18 @@ def get_history_page(
             WantsRaw.status == "completed",
         )
     )
-    total = query.count()
-
-    items = (
-        query.order_by(desc(WantsRaw.created_at))
-        .offset((page - 1) * page_size)
-        .limit(page_size)
-        .all()
+    result = keyset_page(
+        query.options(*projection_options(WantsRaw, fields, extra=("created_at",))),
+        WantsRaw.created_at,
+        WantsRaw.id,
+        limit=page_size,
+        cursor=cursor,
+        offset=(page - 1) * page_size,
     )
-    return items, total
+    total = None
+    if with_total:
+        total = cached_count(_history_count_key(user_id), query.count)
+    return result.items, total, result.next_cursor
 
 
 def create_wants_analysis(
@@ -345,13 +518,24 @@ __all__ = [
     "get_completed_by_id",
     "get_latest_completed",
     "start_stream",
+    "add_stream_lines",
     "append_stream_text",
+    "apply_stream_ops",
+    "delete_stream_line",
     "finish_stream",
+    "get_stream_lines",
+    "get_stream_preview",
+    "get_stream_text",
+    "is_stop_word",
+    "mark_stream_completed",
+    "open_stream_draft",
     "remove_stream_line",
     "set_future_me",
     "append_future_me_text",
     "finish_future_me",
     "update_reverse",
+    "PROGRESS_FIELDS",
+    "STREAM_FIELDS",
     "get_progress",
     "complete_wants",
     "get_history_page",
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, List, Optional, Tuple, Union
+from uuid import UUID
+
+from loguru import logger
+
+from app.core.dependencies import authenticate_access_token
+from app.core.wants.services import apply_stream_ops, is_stop_word, open_stream_draft
+from app.database.session import SessionLocal
+from app.response.response import APIError
+
+
+PREVIEW_MAX_CHARS = 500
+PREVIEW_MAX_LINES = 50
+
+# Операции в порядке поступления: строка или удаление по индексу.
+StreamOp = Union[Tuple[str, str], Tuple[str, int]]
+
+
+@dataclass
+class StreamBuffer:
+    """
+    Состояние потока «Я хочу» на время WebSocket-соединения.
+
+    Строки и удаления копятся в памяти и пишутся в `wants_raw_chunks` одной
+    транзакцией (`flush_stream_ops`). Число строк и хвост для превью ведутся здесь же,
+    поэтому подтверждение клиенту не требует запроса к БД. `persisted` — число
+    строк на момент последней успешной записи.
+    """
+
+    wants_raw_id: UUID
+    line_count: int
+    persisted: int = 0
+    completion_persisted: bool = False
+    tail: Deque[str] = field(default_factory=lambda: deque(maxlen=PREVIEW_MAX_LINES))
+    ops: List[StreamOp] = field(default_factory=list)
+    completed: bool = False
+
+    def add_text(self, text: str) -> bool:
+        """
+        Добавляет строки текста. `True` — пришло стоп-слово, поток завершён.
+        """
+        if is_stop_word(text):
+            self.completed = True
+            return True
+        for line in text.split("\n"):
+            if line.strip():
+                self.ops.append(("line", line))
+                self.tail.append(line)
+                self.line_count += 1
+        return False
+
+    def remove(self, index: int) -> None:
+        if index < 0 or index >= self.line_count:
+            raise APIError(
+                code="WANTS_STREAM_INDEX_INVALID",
+                http_code=400,
+                message="Некорректный индекс строки.",
+            )
+        self.ops.append(("remove", index))
+        tail_start = self.line_count - len(self.tail)
+        if index >= tail_start:
+            del self.tail[index - tail_start]
+        self.line_count -= 1
+
+    @property
+    def pending(self) -> int:
+        return len(self.ops)
+
+    @property
+    def dirty(self) -> bool:
+        """
+        Есть незаписанные операции или незаписанное завершение потока.
+        """
+        return bool(self.ops) or (self.completed and not self.completion_persisted)
+
+    def preview(self) -> Optional[str]:
+        text = "\n".join(self.tail).strip()
+        return text[-PREVIEW_MAX_CHARS:] if text else None
+
+    def take(self) -> Tuple[List[StreamOp], bool]:
+        ops, self.ops = self.ops, []
+        return ops, self.completed
+
+    def restore(self, ops: List[StreamOp]) -> None:
+        """
+        Возвращает невыполненную пачку в начало очереди (запись не удалась).
+        """
+        self.ops[:0] = ops
+
+
+def open_stream(token: str) -> StreamBuffer:
+    """
+    Аутентификация по access-токену и загрузка draft один раз на соединение.
+    Соединение с БД после этого не удерживается.
+    """
+    db = SessionLocal()
+    try:
+        user = authenticate_access_token(db, token)
+        wants_raw, lines = open_stream_draft(db, user.id)
+        buffer = StreamBuffer(
+            wants_raw_id=wants_raw.id,
+            line_count=len(lines),
+            persisted=len(lines),
+        )
+        buffer.tail.extend(lines)
+        return buffer
+    finally:
+        db.close()
+
+
+def flush_stream_ops(wants_raw_id: UUID, ops: List[StreamOp], completed: bool) -> None:
+    """
+    Пишет накопленные операции одной короткой транзакцией.
+    """
+    if not ops and not completed:
+        return
+    db = SessionLocal()
+    try:
+        apply_stream_ops(db, wants_raw_id, ops, completed=completed)
+        db.commit()
+    except Exception:
+        db.rollback()
+        logger.warning("Wants stream flush failed", wants_raw_id=str(wants_raw_id))
+        raise
+    finally:
+        db.close()
+
+
+__all__ = ["StreamBuffer", "flush_stream_ops", "open_stream"]
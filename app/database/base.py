@@ -5,6 +5,9 @@ from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
 
+# Группа отложенных колонок (большие Text/JSONB): не читаются, пока не
+# запрошены явно (`undefer_group`/`load_only`) или не понадобились объекту.
+HEAVY_GROUP = "heavy"
 
-__all__ = ["Base"]
 
+__all__ = ["Base", "HEAVY_GROUP"]
@@ -45,6 +45,7 @@ from app.core.admin.api.v1.routes_admin import (
 from app.core.promocodes.api.v1.routes_promocodes import (
     router as promocodes_router,
 )
+from app.core.jobs.api.v1.routes_jobs import router as jobs_router
 from app.database.session import SessionLocal
 from app.utils.redis_client import get_redis
 from mechtaai_bg_worker.celery_app import celery_app
@@ -278,6 +279,7 @@ app.include_router(esoterics_router, prefix="/api/v1")
 app.include_router(billing_router, prefix="/api/v1")
 app.include_router(admin_router, prefix="/api/v1")
 app.include_router(promocodes_router, prefix="/api/v1")
+app.include_router(jobs_router, prefix="/api/v1")
 
 
 __all__ = ["app"]
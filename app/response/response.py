@@ -28,10 +28,13 @@ from pydantic import BaseModel, Field
 class Pagination(BaseModel):
     page: int
     page_size: int
-    total: int
-    total_pages: int
+    # None, если клиент отказался от подсчёта (with_total=false).
+    total: Optional[int] = None
+    total_pages: Optional[int] = None
     has_next: bool
     has_prev: bool
+    # Курсор следующей страницы (передаётся как `cursor`), None — страница последняя.
+    next_cursor: Optional[str] = None
 
 
 class Meta(BaseModel):
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.utils.redis_client import get_redis
+
+
+CACHE_KEY_PREFIX = "ai:cache:"
+CACHE_INDEX_KEY = "ai:cache:index"
+
+
+def _canonical_json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+# Тексты промптов приходят из реестра одними и теми же объектами str,
+# поэтому повторный вызов не пересчитывает sha256.
+@lru_cache(maxsize=128)
+def prompt_version(system_prompt: str) -> str:
+    return hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16]
+
+
+def make_cache_key(
+    *,
+    prompt_version: str,
+    model: str,
+    temperature: float,
+    payload: Any,
+) -> str:
+    """
+    Ключ кеша — хеш от (версия промпта, модель, температура, канонический JSON payload).
+
+    Канонический JSON (sort_keys, без пробелов) даёт один и тот же ключ
+    независимо от порядка ключей во входном словаре.
+    """
+    material = _canonical_json(
+        {
+            "prompt_version": prompt_version,
+            "model": model,
+            "temperature": temperature,
+            "payload": payload,
+        }
+    )
+    digest = hashlib.sha256(material.encode("utf-8")).hexdigest()
+    return f"{CACHE_KEY_PREFIX}{digest}"
+
+
+def get_cached(key: str) -> Optional[str]:
+    if not settings.ai_cache_enabled:
+        return None
+    try:
+        redis = get_redis()
+        value = redis.get(key)
+        if value is not None:
+            # Обновляем позицию в индексе: вытесняются давно не читанные записи.
+            redis.zadd(CACHE_INDEX_KEY, {key: time.time()})
+        return value
+    except Exception:
+        return None
+
+
+def set_cached(key: str, value: str) -> None:
+    if not settings.ai_cache_enabled:
+        return
+    if len(value.encode("utf-8")) > settings.ai_cache_max_value_bytes:
+        return
+    try:
+        redis = get_redis()
+        pipe = redis.pipeline()
+        pipe.setex(key, settings.ai_cache_ttl_seconds, value)
+        pipe.zadd(CACHE_INDEX_KEY, {key: time.time()})
+        pipe.zcard(CACHE_INDEX_KEY)
+        _, _, size = pipe.execute()
+        overflow = int(size) - settings.ai_cache_max_entries
+        if overflow > 0:
+            evicted = [member for member, _ in redis.zpopmin(CACHE_INDEX_KEY, overflow)]
+            if evicted:
+                redis.delete(*evicted)
+    except Exception:
+        pass
+
+
+def cache_key_for_chat(body: Dict[str, Any]) -> str:
+    messages = body.get("messages") or []
+    system_prompt = next(
+        (m.get("content", "") for m in messages if m.get("role") == "system"),
+        "",
+    )
+    payload = [m for m in messages if m.get("role") != "system"]
+    return make_cache_key(
+        prompt_version=prompt_version(system_prompt),
+        model=body.get("model", ""),
+        temperature=body.get("temperature", 0),
+        payload={"messages": payload, "response_format": body.get("response_format")},
+    )
+
+
+__all__ = [
+    "prompt_version",
+    "make_cache_key",
+    "cache_key_for_chat",
+    "get_cached",
+    "set_cached",
+]
@@ -0,0 +1,649 @@
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+import httpx
+from loguru import logger
+
+from app.core.config import settings
+from app.utils import ai_cache, prompt_budget
+from app.utils.ai_guard import ai_guard
+
+
+# Таймауты по режимам (секунды). Всё, чего здесь нет, использует
+# AI_PROXY_TIMEOUT_SECONDS; значения можно переопределить через
+# AI_PROXY_MODE_TIMEOUTS='{"daily_tip": 10}'.
+DEFAULT_MODE_TIMEOUTS: Dict[str, float] = {
+    "daily_tip": 20,
+    "image_download": 30,
+}
+
+# Окно последних задержек на режим, по которому считаются перцентили.
+LATENCY_WINDOW_SIZE = 512
+# Запас бюджета хеджирования: столько повторов можно сделать подряд,
+# прежде чем бюджет начнёт пополняться только долей обычных запросов.
+HEDGE_BUDGET_BURST = 10.0
+
+
+@dataclass
+class AICallStats:
+    calls: int = 0
+    errors: int = 0
+    cache_hits: int = 0
+    total_latency_ms: float = 0.0
+    max_latency_ms: float = 0.0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+    prompt_tokens: int = 0
+    tokens_saved: int = 0
+    latencies_ms: Deque[float] = field(
+        default_factory=lambda: deque(maxlen=LATENCY_WINDOW_SIZE)
+    )
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.latencies_ms:
+            return None
+        ordered = sorted(self.latencies_ms)
+        index = min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))
+        return ordered[index]
+
+    def as_dict(self) -> Dict[str, Any]:
+        avg = self.total_latency_ms / self.calls if self.calls else 0.0
+        result: Dict[str, Any] = {
+            "calls": self.calls,
+            "errors": self.errors,
+            "cache_hits": self.cache_hits,
+            "avg_latency_ms": round(avg, 1),
+            "max_latency_ms": round(self.max_latency_ms, 1),
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "prompt_tokens": self.prompt_tokens,
+            "tokens_saved": self.tokens_saved,
+        }
+        for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+            value = self.percentile(q)
+            result[f"{name}_latency_ms"] = round(value, 1) if value is not None else None
+        return result
+
+
+@dataclass
+class _StatsRegistry:
+    by_mode: Dict[str, AICallStats] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def record(
+        self,
+        mode: str,
+        *,
+        latency_ms: float,
+        bytes_sent: int,
+        bytes_received: int,
+        failed: bool,
+    ) -> None:
+        with self.lock:
+            stats = self.by_mode.setdefault(mode, AICallStats())
+            stats.calls += 1
+            stats.errors += int(failed)
+            stats.total_latency_ms += latency_ms
+            stats.max_latency_ms = max(stats.max_latency_ms, latency_ms)
+            stats.bytes_sent += bytes_sent
+            stats.bytes_received += bytes_received
+            if not failed:
+                stats.latencies_ms.append(latency_ms)
+
+    def record_hedge(self, mode: str, *, won: bool) -> None:
+        with self.lock:
+            stats = self.by_mode.setdefault(mode, AICallStats())
+            stats.hedges += 1
+            stats.hedge_wins += int(won)
+
+    def record_prompt(self, mode: str, *, tokens: int, saved: int) -> None:
+        with self.lock:
+            stats = self.by_mode.setdefault(mode, AICallStats())
+            stats.prompt_tokens += tokens
+            stats.tokens_saved += saved
+
+    def latency_percentile(self, mode: str, q: float, min_samples: int) -> Optional[float]:
+        with self.lock:
+            stats = self.by_mode.get(mode)
+            if stats is None or len(stats.latencies_ms) < min_samples:
+                return None
+            return stats.percentile(q)
+
+    def record_cache_hit(self, mode: str) -> None:
+        with self.lock:
+            self.by_mode.setdefault(mode, AICallStats()).cache_hits += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self.lock:
+            return {mode: s.as_dict() for mode, s in self.by_mode.items()}
+
+
+class _HedgeBudget:
+    """
+    Ограничение доли повторных (хеджирующих) запросов: каждый запрос в
+    режиме с хеджированием добавляет `ratio` токена (не больше
+    `HEDGE_BUDGET_BURST`), повтор тратит один токен.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._tokens = HEDGE_BUDGET_BURST
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(
+                HEDGE_BUDGET_BURST,
+                self._tokens + settings.ai_hedge_budget_ratio,
+            )
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+def _hedge_modes() -> List[str]:
+    return [mode.strip() for mode in settings.ai_hedge_modes.split(",") if mode.strip()]
+
+
+def _loop_running() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _greenlet_local() -> bool:
+    monkey = sys.modules.get("gevent.monkey")
+    return monkey is not None and monkey.is_module_patched("threading")
+
+
+def _http2_enabled() -> bool:
+    if not settings.ai_proxy_http2:
+        return False
+    if importlib.util.find_spec("h2") is None:
+        logger.warning("AI_PROXY_HTTP2 is set but 'h2' is not installed; using HTTP/1.1")
+        return False
+    return True
+
+
+def _build_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.ai_proxy_max_connections,
+        max_keepalive_connections=settings.ai_proxy_max_keepalive_connections,
+        keepalive_expiry=settings.ai_proxy_keepalive_expiry_seconds,
+    )
+
+
+def _chat_body(
+    messages: List[Dict[str, str]],
+    *,
+    temperature: float,
+    json_response: bool,
+) -> Dict[str, Any]:
+    body: Dict[str, Any] = {
+        "model": settings.ai_proxy_model,
+        "messages": messages,
+        "temperature": temperature,
+    }
+    if json_response:
+        body["response_format"] = {"type": "json_object"}
+    return body
+
+
+def _json_messages(system_prompt: str, payload: Dict[str, Any]) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
+    ]
+
+
+def _json_cache_key(
+    system_prompt: str,
+    payload: Dict[str, Any],
+    temperature: float,
+) -> str:
+    return ai_cache.make_cache_key(
+        prompt_version=ai_cache.prompt_version(system_prompt),
+        model=settings.ai_proxy_model,
+        temperature=temperature,
+        payload=payload,
+    )
+
+
+def _extract_content(data: Dict[str, Any]) -> str:
+    content = data.get("content")
+    if not isinstance(content, str) or not content.strip():
+        raise ValueError("AI proxy returned empty content")
+    return content
+
+
+class AIClient:
+    """
+    Клиент AI-прокси с долгоживущим пулом соединений на процесс.
+
+    Синхронный `httpx.Client` используется воркерами и sync-эндпоинтами,
+    асинхронный `httpx.AsyncClient` — из async-кода, свой на каждый event
+    loop. Все создаются лениво; после fork (prefork-пул Celery) синхронный
+    пул пересоздаётся, чтобы дочерние процессы не делили сокеты родителя.
+
+    Синхронные вызовы в режимах с хеджированием выполняются в собственном
+    event loop потока: проигравший запрос там можно отменить.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._sync_client: Optional[httpx.Client] = None
+        self._async_clients: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, httpx.AsyncClient
+        ] = weakref.WeakKeyDictionary()
+        self._local = threading.local()
+        self._pid = os.getpid()
+        self.stats = _StatsRegistry()
+        self.hedge_budget = _HedgeBudget()
+
+    def timeout_for(self, mode: str) -> httpx.Timeout:
+        overrides = {**DEFAULT_MODE_TIMEOUTS, **(settings.ai_proxy_mode_timeouts or {})}
+        total = float(overrides.get(mode, settings.ai_proxy_timeout_seconds))
+        return httpx.Timeout(total, connect=min(total, settings.ai_proxy_connect_timeout_seconds))
+
+    def _client(self) -> httpx.Client:
+        pid = os.getpid()
+        if self._sync_client is not None and self._pid == pid:
+            return self._sync_client
+        with self._lock:
+            if self._sync_client is None or self._pid != pid:
+                self._pid = pid
+                self._sync_client = httpx.Client(
+                    limits=_build_limits(),
+                    http2=_http2_enabled(),
+                    timeout=settings.ai_proxy_timeout_seconds,
+                )
+        return self._sync_client
+
+    def _aclient(self) -> httpx.AsyncClient:
+        # Соединения AsyncClient привязаны к loop, в котором открыты, поэтому
+        # клиент — свой на каждый loop и уходит вместе с ним.
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = httpx.AsyncClient(
+                    limits=_build_limits(),
+                    http2=_http2_enabled(),
+                    timeout=settings.ai_proxy_timeout_seconds,
+                )
+                self._async_clients[loop] = client
+        return client
+
+    def _run_sync(self, coro: Awaitable[httpx.Response]) -> httpx.Response:
+        """
+        Выполняет корутину в собственном event loop потока. Loop живёт вместе
+        с потоком, поэтому соединения его AsyncClient переиспользуются между
+        задачами. Под gevent `threading.local` привязан к гринлету, а гринлет
+        у каждой задачи свой — там loop и клиент закрываются после вызова.
+        """
+        if _greenlet_local():
+            loop = asyncio.new_event_loop()
+            try:
+                return loop.run_until_complete(coro)
+            finally:
+                loop.run_until_complete(self.aclose())
+                loop.close()
+
+        pid = os.getpid()
+        loop = getattr(self._local, "loop", None)
+        if loop is None or loop.is_closed() or self._local.pid != pid:
+            loop = asyncio.new_event_loop()
+            self._local.loop = loop
+            self._local.pid = pid
+        return loop.run_until_complete(coro)
+
+    def _record(
+        self,
+        mode: str,
+        started: float,
+        request: Optional[httpx.Request],
+        response: Optional[httpx.Response],
+    ) -> None:
+        latency_ms = (time.perf_counter() - started) * 1000
+        bytes_sent = len(request.content) if request is not None else 0
+        bytes_received = len(response.content) if response is not None else 0
+        failed = response is None or response.is_error
+        self.stats.record(
+            mode,
+            latency_ms=latency_ms,
+            bytes_sent=bytes_sent,
+            bytes_received=bytes_received,
+            failed=failed,
+        )
+        logger.info(
+            "AI proxy call",
+            mode=mode,
+            latency_ms=round(latency_ms, 1),
+            bytes_sent=bytes_sent,
+            bytes_received=bytes_received,
+            status=response.status_code if response is not None else None,
+        )
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        mode: str,
+        json_body: Optional[Dict[str, Any]] = None,
+        guarded: bool = True,
+    ) -> httpx.Response:
+        """
+        Вызов AI-прокси через общий лимит параллельности и circuit breaker
+        (`AIUnavailableError`, если прокси перегружен). `guarded=False` —
+        для запросов не к прокси (скачивание картинок с CDN).
+
+        Режимы из `AI_HEDGE_MODES` уходят в `arequest` в event loop потока:
+        блокирующий httpx-запрос нельзя прервать, а асинхронный проигравший
+        отменяется и сразу отдаёт соединение и слот `ai_guard`. Из потока с
+        работающим loop вложенный не запустить — там вызов без хеджирования.
+        """
+        if not guarded:
+            return self._send(method, url, mode=mode, json_body=json_body)
+        if mode in _hedge_modes() and not _loop_running():
+            return self._run_sync(
+                self.arequest(method, url, mode=mode, json_body=json_body)
+            )
+        with ai_guard.slot():
+            return self._send(method, url, mode=mode, json_body=json_body)
+
+    def _hedge_delay(self, mode: str) -> Optional[float]:
+        """
+        Через сколько секунд без ответа отправлять повтор: наблюдаемый
+        перцентиль `AI_HEDGE_PERCENTILE` задержки режима. `None` — режим
+        не хеджируется или статистики пока мало.
+        """
+        if mode not in _hedge_modes():
+            return None
+        self.hedge_budget.deposit()
+        latency_ms = self.stats.latency_percentile(
+            mode,
+            settings.ai_hedge_percentile,
+            settings.ai_hedge_min_samples,
+        )
+        return latency_ms / 1000 if latency_ms is not None else None
+
+    def _send(
+        self,
+        method: str,
+        url: str,
+        *,
+        mode: str,
+        json_body: Optional[Dict[str, Any]],
+    ) -> httpx.Response:
+        client = self._client()
+        request = client.build_request(
+            method, url, json=json_body, timeout=self.timeout_for(mode)
+        )
+        started = time.perf_counter()
+        response: Optional[httpx.Response] = None
+        try:
+            response = client.send(request)
+            response.raise_for_status()
+            return response
+        finally:
+            self._record(mode, started, request, response)
+
+    async def arequest(
+        self,
+        method: str,
+        url: str,
+        *,
+        mode: str,
+        json_body: Optional[Dict[str, Any]] = None,
+        guarded: bool = True,
+    ) -> httpx.Response:
+        if not guarded:
+            return await self._asend(method, url, mode=mode, json_body=json_body)
+
+        async def attempt() -> httpx.Response:
+            async with ai_guard.aslot():
+                return await self._asend(method, url, mode=mode, json_body=json_body)
+
+        delay = self._hedge_delay(mode)
+        if delay is None:
+            return await attempt()
+        return await self._ahedged(attempt, mode=mode, delay=delay)
+
+    async def _ahedged(
+        self,
+        attempt: Callable[[], Awaitable[httpx.Response]],
+        *,
+        mode: str,
+        delay: float,
+    ) -> httpx.Response:
+        """
+        Хеджированный вызов: если первый запрос не ответил за `delay`,
+        параллельно уходит второй такой же, берётся первый успешный ответ;
+        проигравший отменяется до возврата (соединение и слот `ai_guard`
+        освобождаются).
+        """
+        primary = asyncio.ensure_future(attempt())
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or not self.hedge_budget.try_spend():
+            return await primary
+
+        hedge = asyncio.ensure_future(attempt())
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        self.stats.record_hedge(mode, won=task is hedge)
+                        return task.result()
+            self.stats.record_hedge(mode, won=False)
+            return await primary
+        finally:
+            losers = [task for task in (primary, hedge) if not task.done()]
+            for task in losers:
+                task.cancel()
+            # Дожидаемся отмены: иначе в loop потока (см. `request`) она
+            # выполнилась бы только при следующем вызове.
+            await asyncio.gather(*losers, return_exceptions=True)
+
+    async def _asend(
+        self,
+        method: str,
+        url: str,
+        *,
+        mode: str,
+        json_body: Optional[Dict[str, Any]],
+    ) -> httpx.Response:
+        client = self._aclient()
+        request = client.build_request(
+            method, url, json=json_body, timeout=self.timeout_for(mode)
+        )
+        started = time.perf_counter()
+        response: Optional[httpx.Response] = None
+        try:
+            response = await client.send(request)
+            response.raise_for_status()
+            return response
+        finally:
+            self._record(mode, started, request, response)
+
+    def _cached(self, mode: str, cache_key: Optional[str]) -> Optional[str]:
+        if cache_key is None:
+            return None
+        cached = ai_cache.get_cached(cache_key)
+        if cached is not None:
+            self.stats.record_cache_hit(mode)
+            logger.info("AI proxy cache hit", mode=mode)
+        return cached
+
+    def chat(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        mode: str,
+        temperature: float,
+        json_response: bool = False,
+        cache: bool = False,
+        cache_key: Optional[str] = None,
+    ) -> str:
+        body = _chat_body(messages, temperature=temperature, json_response=json_response)
+        if cache and cache_key is None:
+            cache_key = ai_cache.cache_key_for_chat(body)
+        cached = self._cached(mode, cache_key if cache else None)
+        if cached is not None:
+            return cached
+
+        response = self.request("POST", settings.ai_proxy_url, mode=mode, json_body=body)
+        content = _extract_content(response.json())
+        if cache:
+            ai_cache.set_cached(cache_key, content)
+        return content
+
+    async def achat(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        mode: str,
+        temperature: float,
+        json_response: bool = False,
+        cache: bool = False,
+        cache_key: Optional[str] = None,
+    ) -> str:
+        body = _chat_body(messages, temperature=temperature, json_response=json_response)
+        if cache and cache_key is None:
+            cache_key = ai_cache.cache_key_for_chat(body)
+        cached = self._cached(mode, cache_key if cache else None)
+        if cached is not None:
+            return cached
+
+        response = await self.arequest(
+            "POST", settings.ai_proxy_url, mode=mode, json_body=body
+        )
+        content = _extract_content(response.json())
+        if cache:
+            ai_cache.set_cached(cache_key, content)
+        return content
+
+    def _fit_budget(
+        self,
+        system_prompt: str,
+        payload: Dict[str, Any],
+        mode: str,
+    ) -> Dict[str, Any]:
+        """
+        Бюджет токенов на вход (см. `prompt_budget`): слишком большой payload
+        детерминированно обрезается до бюджета режима.
+        """
+        result = prompt_budget.fit_payload(mode, system_prompt, payload)
+        self.stats.record_prompt(mode, tokens=result.tokens_after, saved=result.tokens_saved)
+        if result.tokens_saved:
+            logger.info(
+                "AI prompt trimmed",
+                mode=mode,
+                budget=result.budget,
+                tokens_before=result.tokens_before,
+                tokens_after=result.tokens_after,
+            )
+        return result.payload
+
+    def chat_json(
+        self,
+        system_prompt: str,
+        payload: Dict[str, Any],
+        *,
+        mode: str,
+        temperature: float,
+        cache: bool = False,
+    ) -> str:
+        payload = self._fit_budget(system_prompt, payload, mode)
+        return self.chat(
+            _json_messages(system_prompt, payload),
+            mode=mode,
+            temperature=temperature,
+            json_response=True,
+            cache=cache,
+            cache_key=_json_cache_key(system_prompt, payload, temperature) if cache else None,
+        )
+
+    async def achat_json(
+        self,
+        system_prompt: str,
+        payload: Dict[str, Any],
+        *,
+        mode: str,
+        temperature: float,
+        cache: bool = False,
+    ) -> str:
+        payload = self._fit_budget(system_prompt, payload, mode)
+        return await self.achat(
+            _json_messages(system_prompt, payload),
+            mode=mode,
+            temperature=temperature,
+            json_response=True,
+            cache=cache,
+            cache_key=_json_cache_key(system_prompt, payload, temperature) if cache else None,
+        )
+
+    def post_json(
+        self,
+        url: str,
+        body: Dict[str, Any],
+        *,
+        mode: str,
+    ) -> Dict[str, Any]:
+        return self.request("POST", url, mode=mode, json_body=body).json()
+
+    def download(self, url: str, *, mode: str = "image_download") -> bytes:
+        return self.request("GET", url, mode=mode, guarded=False).content
+
+    def close(self) -> None:
+        with self._lock:
+            if self._sync_client is not None:
+                self._sync_client.close()
+                self._sync_client = None
+
+    async def aclose(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+
+_ai_client: Optional[AIClient] = None
+_ai_client_lock = threading.Lock()
+
+
+def get_ai_client() -> AIClient:
+    global _ai_client
+    if _ai_client is None:
+        with _ai_client_lock:
+            if _ai_client is None:
+                _ai_client = AIClient()
+    return _ai_client
+
+
+__all__ = ["AIClient", "AICallStats", "get_ai_client"]
@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator, Optional
+
+import httpx
+from loguru import logger
+
+from app.core.config import settings
+from app.response.response import APIError
+from app.utils.redis_client import get_redis
+
+
+GUARD_KEY_PREFIX = "ai:guard"
+_LIMIT_KEY = f"{GUARD_KEY_PREFIX}:limit"
+_INFLIGHT_KEY = f"{GUARD_KEY_PREFIX}:inflight"
+_DECREASE_KEY = f"{GUARD_KEY_PREFIX}:decreased"
+_OPEN_KEY = f"{GUARD_KEY_PREFIX}:open"
+_HALF_OPEN_KEY = f"{GUARD_KEY_PREFIX}:half_open"
+_PROBE_KEY = f"{GUARD_KEY_PREFIX}:probe"
+_WINDOW_KEY_PREFIX = f"{GUARD_KEY_PREFIX}:window"
+
+_ACQUIRE_POLL_SECONDS = 0.05
+_PROBE_LEASE_PREFIX = "probe:"
+
+# Общий на все процессы лимит одновременных вызовов: ZSET «аренд» с
+# временем истечения (аренда упавшего процесса освобождается сама).
+# KEYS[1] — аренды, KEYS[2] — текущий лимит; ARGV: now_ms, id аренды,
+# срок аренды (мс), начальный лимит.
+_ACQUIRE_LUA = """
+local now = tonumber(ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, now)
+local limit = tonumber(redis.call('GET', KEYS[2]) or ARGV[4])
+if redis.call('ZCARD', KEYS[1]) < math.floor(limit) then
+  redis.call('ZADD', KEYS[1], now + tonumber(ARGV[3]), ARGV[2])
+  redis.call('PEXPIRE', KEYS[1], tonumber(ARGV[3]))
+  return 1
+end
+return 0
+"""
+
+# AIMD: +1/limit за быстрый успешный вызов, *factor при перегрузке
+# (не чаще раза в cooldown, иначе одновременные таймауты всех воркеров
+# обрушили бы лимит до минимума). KEYS[1] — лимит, KEYS[2] — cooldown;
+# ARGV: перегрузка (1/0), min, max, начальный, factor, cooldown_ms.
+_ADJUST_LUA = """
+local limit = tonumber(redis.call('GET', KEYS[1]) or ARGV[4])
+if ARGV[1] == '1' then
+  if redis.call('SET', KEYS[2], '1', 'NX', 'PX', tonumber(ARGV[6])) then
+    limit = limit * tonumber(ARGV[5])
+  end
+else
+  limit = limit + 1 / limit
+end
+limit = math.max(tonumber(ARGV[2]), math.min(tonumber(ARGV[3]), limit))
+redis.call('SET', KEYS[1], tostring(limit))
+return tostring(limit)
+"""
+
+
+class AIUnavailableError(APIError):
+    """
+    AI-прокси перегружен или circuit breaker открыт: запрос отклонён сразу,
+    `details.retry_after_seconds` — когда имеет смысл повторить.
+    """
+
+    def __init__(self, code: str, message: str, retry_after_seconds: int) -> None:
+        super().__init__(
+            code=code,
+            http_code=503,
+            message=message,
+            details={"retry_after_seconds": retry_after_seconds},
+        )
+        self.retry_after_seconds = retry_after_seconds
+
+
+def _is_failure(exc: Optional[BaseException]) -> bool:
+    """
+    Сбой апстрима: таймаут, сетевая ошибка, 5xx или 429. Прочие 4xx —
+    ошибка запроса, а не прокси, и breaker не открывают.
+    """
+    if exc is None:
+        return False
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status >= 500 or status == 429
+    return isinstance(exc, httpx.TransportError)
+
+
+class AIGuard:
+    """
+    Адаптивный лимит параллельных вызовов AI-прокси и circuit breaker,
+    общие для всех процессов через Redis.
+
+    Без Redis охрана отключается (вызовы идут как раньше).
+    """
+
+    def _open_error(self, retry_after_ms: int) -> AIUnavailableError:
+        return AIUnavailableError(
+            "AI_CIRCUIT_OPEN",
+            "AI-сервис временно недоступен. Попробуйте позже.",
+            max(1, math.ceil(retry_after_ms / 1000)),
+        )
+
+    def _check_circuit(self) -> bool:
+        """
+        Бросает ошибку, если breaker открыт. Возвращает `True`, если этот
+        вызов — пробный (half-open).
+        """
+        redis = get_redis()
+        retry_ms = redis.pttl(_OPEN_KEY)
+        if retry_ms and retry_ms > 0:
+            raise self._open_error(retry_ms)
+        if not redis.exists(_HALF_OPEN_KEY):
+            return False
+        probe_ms = int(settings.ai_proxy_timeout_seconds * 1000)
+        if redis.set(_PROBE_KEY, "1", nx=True, px=probe_ms):
+            return True
+        raise self._open_error(1000)
+
+    def _try_acquire(self, lease_id: str) -> bool:
+        lease_ms = int((settings.ai_proxy_timeout_seconds + 30) * 1000)
+        return bool(
+            get_redis().eval(
+                _ACQUIRE_LUA,
+                2,
+                _INFLIGHT_KEY,
+                _LIMIT_KEY,
+                int(time.time() * 1000),
+                lease_id,
+                lease_ms,
+                settings.ai_guard_initial_concurrency,
+            )
+        )
+
+    def _overloaded(self) -> AIUnavailableError:
+        return AIUnavailableError(
+            "AI_OVERLOADED",
+            "AI-сервис перегружен. Попробуйте позже.",
+            max(1, math.ceil(settings.ai_guard_acquire_timeout_seconds)),
+        )
+
+    def _enter(self) -> Optional[str]:
+        """
+        Проверки до ожидания слота. Возвращает id аренды (у пробного вызова
+        half-open — с префиксом), `None` — охрана недоступна, вызов идёт без неё.
+        """
+        if not settings.ai_guard_enabled:
+            return None
+        try:
+            probe = self._check_circuit()
+        except AIUnavailableError:
+            raise
+        except Exception as exc:
+            logger.warning("AI guard unavailable", error=str(exc))
+            return None
+        lease_id = uuid.uuid4().hex
+        return f"{_PROBE_LEASE_PREFIX}{lease_id}" if probe else lease_id
+
+    def _release(
+        self,
+        lease_id: str,
+        latency_ms: float,
+        exc: Optional[BaseException],
+    ) -> None:
+        failed = _is_failure(exc)
+        overloaded = failed or latency_ms > settings.ai_guard_latency_target_ms
+        try:
+            redis = get_redis()
+            redis.zrem(_INFLIGHT_KEY, lease_id)
+            redis.eval(
+                _ADJUST_LUA,
+                2,
+                _LIMIT_KEY,
+                _DECREASE_KEY,
+                "1" if overloaded else "0",
+                settings.ai_guard_min_concurrency,
+                settings.ai_guard_max_concurrency,
+                settings.ai_guard_initial_concurrency,
+                settings.ai_guard_decrease_factor,
+                int(settings.ai_guard_latency_target_ms),
+            )
+            self._record_outcome(failed, lease_id.startswith(_PROBE_LEASE_PREFIX))
+        except Exception as exc_:
+            logger.warning("AI guard release failed", error=str(exc_))
+
+    def _record_outcome(self, failed: bool, probe: bool) -> None:
+        redis = get_redis()
+        if probe:
+            redis.delete(_PROBE_KEY)
+            if failed:
+                self._open(redis)
+            else:
+                redis.delete(_HALF_OPEN_KEY)
+                logger.info("AI circuit closed")
+            return
+
+        window = settings.ai_guard_window_seconds
+        key = f"{_WINDOW_KEY_PREFIX}:{int(time.time()) // window}"
+        pipe = redis.pipeline()
+        pipe.hincrby(key, "calls", 1)
+        pipe.hincrby(key, "failures", int(failed))
+        pipe.expire(key, window * 2)
+        calls, failures, _ = pipe.execute()
+        if (
+            failed
+            and calls >= settings.ai_guard_min_calls
+            and failures / calls >= settings.ai_guard_failure_threshold
+        ):
+            self._open(redis)
+            redis.delete(key)
+
+    def _open(self, redis) -> None:
+        open_ms = settings.ai_guard_open_seconds * 1000
+        pipe = redis.pipeline()
+        pipe.set(_OPEN_KEY, "1", px=open_ms)
+        pipe.set(_HALF_OPEN_KEY, "1", px=open_ms + 10 * 60 * 1000)
+        pipe.execute()
+        logger.warning("AI circuit opened", open_seconds=settings.ai_guard_open_seconds)
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        lease_id = self._enter()
+        if lease_id is None:
+            yield
+            return
+        deadline = time.monotonic() + settings.ai_guard_acquire_timeout_seconds
+        try:
+            while not self._try_acquire(lease_id):
+                if time.monotonic() >= deadline:
+                    raise self._overloaded()
+                time.sleep(_ACQUIRE_POLL_SECONDS)
+        except AIUnavailableError:
+            raise
+        except Exception as exc:
+            logger.warning("AI guard unavailable", error=str(exc))
+            yield
+            return
+
+        started = time.perf_counter()
+        error: Optional[BaseException] = None
+        try:
+            yield
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            self._release(lease_id, (time.perf_counter() - started) * 1000, error)
+
+    @asynccontextmanager
+    async def aslot(self) -> AsyncIterator[None]:
+        lease_id = self._enter()
+        if lease_id is None:
+            yield
+            return
+        deadline = time.monotonic() + settings.ai_guard_acquire_timeout_seconds
+        try:
+            while not self._try_acquire(lease_id):
+                if time.monotonic() >= deadline:
+                    raise self._overloaded()
+                await asyncio.sleep(_ACQUIRE_POLL_SECONDS)
+        except AIUnavailableError:
+            raise
+        except Exception as exc:
+            logger.warning("AI guard unavailable", error=str(exc))
+            yield
+            return
+
+        started = time.perf_counter()
+        error: Optional[BaseException] = None
+        try:
+            yield
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            self._release(lease_id, (time.perf_counter() - started) * 1000, error)
+
+
+ai_guard = AIGuard()
+
+
+__all__ = ["AIGuard", "AIUnavailableError", "ai_guard"]
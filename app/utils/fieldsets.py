@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Type
+
+from pydantic import BaseModel
+from sqlalchemy.orm import load_only, undefer_group
+
+from app.database.base import HEAVY_GROUP
+from app.response.response import APIError
+
+
+def parse_fields(
+    fields: Optional[str],
+    schema: Type[BaseModel],
+    *,
+    required: Iterable[str] = ("id",),
+) -> Optional[List[str]]:
+    """
+    Разбирает `?fields=a,b,c` в список полей схемы (в порядке схемы).
+    `None` — параметр не передан, нужен полный объект.
+    """
+    if fields is None:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    invalid = sorted(requested - set(schema.model_fields))
+    if invalid:
+        raise APIError(
+            code="FIELDS_INVALID",
+            http_code=400,
+            message="Неизвестные поля в fields.",
+            fields={"fields": invalid},
+        )
+    requested.update(required)
+    return [name for name in schema.model_fields if name in requested]
+
+
+def projection_options(
+    model: Any,
+    fields: Optional[Sequence[str]] = None,
+    *,
+    extra: Iterable[str] = (),
+) -> List[Any]:
+    """
+    Опции загрузки для `query.options(...)`: без `fields` — вся строка
+    вместе с отложенной группой одним запросом, с `fields` — только эти
+    колонки (плюс `id` и `extra`, нужные самому сервису).
+    """
+    if fields is None:
+        return [undefer_group(HEAVY_GROUP)]
+    names = {"id", *extra, *fields}
+    columns = [
+        getattr(model, column.key)
+        for column in model.__table__.columns
+        if column.key in names
+    ]
+    return [load_only(*columns)]
+
+
+def project(obj: Any, fields: Sequence[str]) -> Dict[str, Any]:
+    return {name: getattr(obj, name) for name in fields}
+
+
+__all__ = ["parse_fields", "project", "projection_options"]
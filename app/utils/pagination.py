@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import or_, text
+from sqlalchemy.orm import Query, Session
+
+from app.core.config import settings
+from app.response import Pagination
+from app.response.response import APIError
+from app.utils.redis_client import get_redis
+
+
+COUNT_KEY_PREFIX = "pagination:count:"
+
+
+def encode_cursor(created_at: datetime, item_id: UUID) -> str:
+    raw = json.dumps([created_at.isoformat(), str(item_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), UUID(item_id)
+    except (AttributeError, TypeError, ValueError):
+        raise APIError(
+            code="PAGINATION_CURSOR_INVALID",
+            http_code=400,
+            message="Некорректный cursor.",
+        )
+
+
+@dataclass
+class KeysetPage:
+    items: List[Any]
+    next_cursor: Optional[str]
+
+
+def keyset_page(
+    query: Query,
+    created_col: Any,
+    id_col: Any,
+    *,
+    limit: int,
+    cursor: Optional[str] = None,
+    offset: int = 0,
+    key: Callable[[Any], Any] = lambda item: item,
+) -> KeysetPage:
+    """
+    Страница по ключу (created_at desc, id desc): вместо OFFSET — условие
+    «строго после курсора», поэтому глубокие страницы не дороже первой.
+
+    Условие записано как `created_at <= c AND (created_at < c OR id < i)`:
+    первая часть идёт в диапазон индексов `(..., created_at desc)`, id
+    только разрешает совпадения времени. `offset` оставлен для старых
+    клиентов с `page` без курсора. `key` достаёт модель из строки запроса,
+    если запрос возвращает кортежи.
+    """
+    if cursor is not None:
+        created_at, item_id = decode_cursor(cursor)
+        query = query.filter(
+            created_col <= created_at,
+            or_(created_col < created_at, id_col < item_id),
+        )
+    # ORDER BY до OFFSET/LIMIT: Query не даёт сортировать после них.
+    query = query.order_by(created_col.desc(), id_col.desc())
+    if cursor is None and offset > 0:
+        query = query.offset(offset)
+
+    rows = query.limit(limit + 1).all()
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = key(items[-1])
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return KeysetPage(items=items, next_cursor=next_cursor)
+
+
+def cached_count(cache_key: str, count: Callable[[], int]) -> int:
+    """
+    COUNT(*) с кешем в Redis на `PAGINATION_COUNT_CACHE_TTL_SECONDS`.
+    Без Redis считается напрямую.
+    """
+    ttl = settings.pagination_count_cache_ttl_seconds
+    if ttl <= 0:
+        return count()
+    redis_key = f"{COUNT_KEY_PREFIX}{cache_key}"
+    try:
+        cached = get_redis().get(redis_key)
+    except Exception:
+        return count()
+    if cached is not None:
+        return int(cached)
+    total = count()
+    try:
+        get_redis().setex(redis_key, ttl, total)
+    except Exception:
+        pass
+    return total
+
+
+def invalidate_count(cache_key: str) -> None:
+    try:
+        get_redis().delete(f"{COUNT_KEY_PREFIX}{cache_key}")
+    except Exception:
+        return
+
+
+def estimated_table_count(db: Session, table_name: str, count: Callable[[], int]) -> int:
+    """
+    Размер всей таблицы: оценка планировщика (`pg_class.reltuples`) для
+    больших таблиц, точный COUNT(*) — пока строк меньше
+    `PAGINATION_EXACT_COUNT_LIMIT` или статистика ещё не собрана.
+    """
+    estimate = db.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:name)"),
+        {"name": table_name},
+    ).scalar()
+    if estimate is None or estimate < settings.pagination_exact_count_limit:
+        return count()
+    return int(estimate)
+
+
+def make_pagination(
+    *,
+    page: int,
+    page_size: int,
+    total: Optional[int],
+    next_cursor: Optional[str],
+    cursor: Optional[str] = None,
+) -> Pagination:
+    total_pages = None
+    if total is not None:
+        total_pages = (total + page_size - 1) // page_size if page_size > 0 else 1
+    return Pagination(
+        page=page,
+        page_size=page_size,
+        total=total,
+        total_pages=total_pages,
+        has_next=next_cursor is not None,
+        has_prev=page > 1 or cursor is not None,
+        next_cursor=next_cursor,
+    )
+
+
+__all__ = [
+    "KeysetPage",
+    "cached_count",
+    "decode_cursor",
+    "encode_cursor",
+    "estimated_table_count",
+    "invalidate_count",
+    "keyset_page",
+    "make_pagination",
+]
@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import copy
+import importlib.util
+import json
+import math
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+
+# Бюджет входа (системный промпт + payload) по режимам, в токенах.
+# Режимы без бюджета не обрезаются; значения переопределяются через
+# AI_PROMPT_BUDGETS='{"diagnose_wants": 4000}' (0 — без ограничения).
+DEFAULT_MODE_BUDGETS: Dict[str, int] = {
+    "diagnose_wants": 6000,
+    "build_future_story": 8000,
+    "generate_goals": 6000,
+    "plan_steps": 6000,
+    "weekly_review": 6000,
+}
+
+# Без tiktoken: ~3 символа на токен для смеси русского текста и JSON
+# (оценка с запасом — лучше обрезать чуть больше, чем превысить бюджет).
+CHARS_PER_TOKEN = 3.0
+TRUNCATION_MARK = "…"
+
+
+@lru_cache(maxsize=1)
+def _encoding() -> Optional[Any]:
+    if importlib.util.find_spec("tiktoken") is None:
+        return None
+    import tiktoken
+
+    return tiktoken.get_encoding("o200k_base")
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def estimate_payload_tokens(system_prompt: str, payload: Any) -> int:
+    return estimate_tokens(system_prompt) + estimate_tokens(
+        json.dumps(payload, ensure_ascii=False)
+    )
+
+
+def budget_for(mode: str) -> int:
+    budgets = {**DEFAULT_MODE_BUDGETS, **(settings.ai_prompt_budgets or {})}
+    return int(budgets.get(mode, 0))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Обрезает текст до `max_tokens` по границе слова и помечает обрезку.
+    """
+    tokens = estimate_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+    keep = int(len(text) * max_tokens / tokens)
+    cut = text[:keep]
+    space = cut.rfind(" ")
+    if space > keep // 2:
+        cut = cut[:space]
+    return cut.rstrip() + TRUNCATION_MARK
+
+
+def drop_oldest_lines(text: str, excess: int) -> Tuple[str, int]:
+    """
+    Убирает самые старые строки потока, пока не сэкономлено `excess`
+    токенов (последняя строка остаётся всегда). Вместо убранных строк —
+    одна строка-сводка, чтобы модель знала о пропуске.
+    Возвращает новый текст и оставшийся избыток.
+    """
+    lines = text.split("\n")
+    dropped = 0
+    saved = 0
+    while saved < excess and dropped < len(lines) - 1:
+        saved += estimate_tokens(lines[dropped]) + 1
+        dropped += 1
+    if not dropped:
+        return text, excess
+    summary = f"[пропущено ранних строк: {dropped}]"
+    saved -= estimate_tokens(summary) + 1
+    return "\n".join([summary, *lines[dropped:]]), max(excess - saved, 0)
+
+
+def _water_level(sizes: List[int], target_total: int) -> int:
+    """
+    Наибольший общий потолок `cap`, при котором sum(min(size, cap)) <= target_total:
+    длинные значения режутся до одного уровня, короткие не трогаются.
+    """
+    if sum(sizes) <= target_total:
+        return max(sizes, default=0)
+    remaining = target_total
+    ordered = sorted(sizes)
+    for index, size in enumerate(ordered):
+        share = remaining // (len(ordered) - index)
+        if size > share:
+            return share
+        remaining -= size
+    return ordered[-1]
+
+
+def _cap_strings(
+    items: List[Tuple[Any, Any]],
+    excess: int,
+) -> int:
+    """
+    Режет строки `container[key]` (пары из `items`) до общего потолка так,
+    чтобы в сумме сэкономить `excess` токенов. Возвращает остаток избытка.
+    """
+    if excess <= 0 or not items:
+        return max(excess, 0)
+    sizes = [estimate_tokens(container[key]) for container, key in items]
+    total = sum(sizes)
+    cap = _water_level(sizes, max(total - excess, 0))
+    saved = 0
+    for (container, key), size in zip(items, sizes):
+        if size > cap:
+            container[key] = truncate_to_tokens(container[key], cap)
+            saved += size - estimate_tokens(container[key])
+    return max(excess - saved, 0)
+
+
+def _string_leaves(value: Any) -> List[Tuple[Any, Any]]:
+    if isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, list):
+        items = enumerate(value)
+    else:
+        return []
+    leaves: List[Tuple[Any, Any]] = []
+    for key, item in items:
+        if isinstance(item, str):
+            leaves.append((value, key))
+        else:
+            leaves.extend(_string_leaves(item))
+    return leaves
+
+
+def _trim_generic(payload: Dict[str, Any], excess: int) -> int:
+    return _cap_strings(_string_leaves(payload), excess)
+
+
+_WANTS_FIELDS = (
+    "raw_future_me",
+    "raw_envy",
+    "raw_regrets",
+    "raw_what_to_do_5y",
+)
+
+
+def _trim_wants(payload: Dict[str, Any], excess: int) -> int:
+    """
+    Общий потолок на все ответы упражнений; поток «Я хочу» сверх потолка
+    сокращается с самых старых строк, остальные тексты — обрезкой конца.
+    """
+    raw = payload.get("payload") or {}
+    stream = raw.get("raw_wants_stream")
+    fields = [(raw, key) for key in _WANTS_FIELDS if isinstance(raw.get(key), str)]
+    if not isinstance(stream, str) or not stream:
+        return _cap_strings(fields, excess)
+
+    stream_size = estimate_tokens(stream)
+    sizes = [stream_size, *(estimate_tokens(raw[key]) for _, key in fields)]
+    cap = _water_level(sizes, max(sum(sizes) - excess, 0))
+    if stream_size > cap:
+        raw["raw_wants_stream"], left = drop_oldest_lines(stream, stream_size - cap)
+        excess -= stream_size - cap - left
+    return _cap_strings(fields, excess)
+
+
+def _trim_future_story(payload: Dict[str, Any], excess: int) -> int:
+    """
+    Потолок на сферу: самые «длинные» сферы режутся до общего уровня,
+    внутри сферы — самые длинные ответы.
+    """
+    areas = (payload.get("payload") or {}).get("answers_by_area") or []
+    answers = [
+        [(qa, "answer") for qa in area.get("qa") or [] if isinstance(qa.get("answer"), str)]
+        for area in areas
+    ]
+    sizes = [
+        sum(estimate_tokens(qa[key]) for qa, key in area_answers)
+        for area_answers in answers
+    ]
+    cap = _water_level(sizes, max(sum(sizes) - excess, 0))
+    for area_answers, size in zip(answers, sizes):
+        if size > cap:
+            target = size - cap
+            excess -= target - _cap_strings(area_answers, target)
+    return max(excess, 0)
+
+
+TRIMMERS: Dict[str, Callable[[Dict[str, Any], int], int]] = {
+    "diagnose_wants": _trim_wants,
+    "build_future_story": _trim_future_story,
+}
+
+
+@dataclass
+class BudgetResult:
+    payload: Dict[str, Any]
+    budget: int
+    tokens_before: int
+    tokens_after: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(self.tokens_before - self.tokens_after, 0)
+
+
+def fit_payload(mode: str, system_prompt: str, payload: Dict[str, Any]) -> BudgetResult:
+    """
+    Укладывает payload в бюджет режима. Обрезка детерминирована (одинаковый
+    вход даёт одинаковый результат, ключ кеша AI стабилен): сначала
+    стратегия режима из `TRIMMERS`, затем, если не хватило, общий потолок
+    на все строки. Исходный payload не меняется.
+    """
+    budget = budget_for(mode)
+    tokens = estimate_payload_tokens(system_prompt, payload)
+    if budget <= 0 or tokens <= budget:
+        return BudgetResult(payload, budget, tokens, tokens)
+
+    trimmed = copy.deepcopy(payload)
+    trimmer = TRIMMERS.get(mode)
+    if trimmer is not None:
+        trimmer(trimmed, tokens - budget)
+    after = estimate_payload_tokens(system_prompt, trimmed)
+    if after > budget:
+        _trim_generic(trimmed, after - budget)
+        after = estimate_payload_tokens(system_prompt, trimmed)
+    return BudgetResult(trimmed, budget, tokens, after)
+
+
+__all__ = [
+    "BudgetResult",
+    "DEFAULT_MODE_BUDGETS",
+    "TRIMMERS",
+    "budget_for",
+    "drop_oldest_lines",
+    "estimate_payload_tokens",
+    "estimate_tokens",
+    "fit_payload",
+    "truncate_to_tokens",
+]
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import os
+import string
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from app.core.config import settings
+from app.utils.ai_cache import prompt_version
+
+
+# Промпты из файлов: имя (= режим AI-клиента) -> поле настроек с путём.
+FILE_PROMPTS: Dict[str, str] = {
+    "diagnose_wants": "wants_ai_system_prompt_path",
+    "build_future_story": "future_story_system_prompt_path",
+    "generate_goals": "generate_goals_system_prompt_path",
+    "plan_steps": "plan_steps_system_prompt_path",
+    "weekly_review": "weekly_review_system_prompt_path",
+}
+
+# (литерал, имя поля, спецификатор формата) — шаблон, разобранный один раз.
+_Segment = Tuple[str, Optional[str], str]
+
+
+def _compile(text: str) -> List[_Segment]:
+    return [
+        (literal, name, spec or "")
+        for literal, name, spec, _ in string.Formatter().parse(text)
+    ]
+
+
+@dataclass(frozen=True)
+class Prompt:
+    name: str
+    text: str
+    version: str
+    path: Optional[str] = None
+    mtime: Optional[float] = None
+    segments: List[_Segment] = field(default_factory=list, compare=False)
+
+    def render(self, **values: Any) -> str:
+        """
+        Подстановка `{поле}` по заранее разобранному шаблону (как `str.format`,
+        без повторного разбора текста на каждый вызов).
+        """
+        parts: List[str] = []
+        for literal, name, spec in self.segments:
+            parts.append(literal)
+            if name is not None:
+                parts.append(format(values[name], spec))
+        return "".join(parts)
+
+
+def _build(
+    name: str,
+    text: str,
+    *,
+    path: Optional[str] = None,
+    mtime: Optional[float] = None,
+    template: bool = False,
+) -> Prompt:
+    return Prompt(
+        name=name,
+        text=text,
+        version=prompt_version(text),
+        path=path,
+        mtime=mtime,
+        segments=_compile(text) if template else [],
+    )
+
+
+class PromptRegistry:
+    """
+    Системные промпты AI, загруженные один раз на процесс.
+
+    Файловые промпты перечитываются, только если изменился mtime файла
+    (mtime проверяется не чаще раза в `PROMPT_RELOAD_CHECK_SECONDS`).
+    `Prompt.version` — хеш текста, тот же, что входит в ключ кеша AI;
+    смена версии пишется в лог.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._prompts: Dict[str, Prompt] = {}
+        self._checked_at: Dict[str, float] = {}
+
+    def register_text(self, name: str, text: str, *, template: bool = False) -> Prompt:
+        prompt = _build(name, text, template=template)
+        with self._lock:
+            self._prompts[name] = prompt
+        return prompt
+
+    def _path(self, name: str) -> str:
+        return getattr(settings, FILE_PROMPTS[name])
+
+    def _load_file(self, name: str, path: str, mtime: float) -> Prompt:
+        with open(path, "r", encoding="utf-8") as handle:
+            text = handle.read().strip()
+        prompt = _build(name, text, path=path, mtime=mtime)
+        previous = self._prompts.get(name)
+        self._prompts[name] = prompt
+        if previous is None:
+            logger.info("Prompt loaded", name=name, version=prompt.version, path=path)
+        elif previous.version != prompt.version:
+            logger.info(
+                "Prompt changed",
+                name=name,
+                version=prompt.version,
+                previous_version=previous.version,
+                path=path,
+            )
+        return prompt
+
+    def get(self, name: str) -> Prompt:
+        """
+        Промпт по имени. Для файловых — `FileNotFoundError`, если файла нет.
+        """
+        if name not in FILE_PROMPTS:
+            return self._prompts[name]
+
+        now = time.monotonic()
+        prompt = self._prompts.get(name)
+        if (
+            prompt is not None
+            and now - self._checked_at.get(name, 0.0) < settings.prompt_reload_check_seconds
+        ):
+            return prompt
+
+        path = self._path(name)
+        mtime = os.stat(path).st_mtime
+        with self._lock:
+            self._checked_at[name] = now
+            prompt = self._prompts.get(name)
+            if prompt is not None and prompt.path == path and prompt.mtime == mtime:
+                return prompt
+            return self._load_file(name, path, mtime)
+
+    def preload(self) -> None:
+        """
+        Загружает все файловые промпты (при старте процесса воркера).
+        Отсутствующий файл не мешает старту: задача упадёт с понятной ошибкой.
+        """
+        for name in FILE_PROMPTS:
+            try:
+                self.get(name)
+            except OSError as exc:
+                logger.warning("Prompt not loaded", name=name, error=str(exc))
+
+    def versions(self) -> Dict[str, str]:
+        with self._lock:
+            return {name: prompt.version for name, prompt in self._prompts.items()}
+
+
+prompt_registry = PromptRegistry()
+
+
+def get_prompt(name: str) -> Prompt:
+    return prompt_registry.get(name)
+
+
+__all__ = [
+    "FILE_PROMPTS",
+    "Prompt",
+    "PromptRegistry",
+    "get_prompt",
+    "prompt_registry",
+]
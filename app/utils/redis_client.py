@@ -4,12 +4,15 @@ import socket
 from typing import Optional
 
 from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
 from redis.exceptions import ConnectionError as RedisConnectionError
 
 from app.core.config import settings
 
 
 _redis_client: Optional[Redis] = None
+_redis_url: Optional[str] = None
+_async_redis_client: Optional[AsyncRedis] = None
 
 
 def _create_redis_client() -> Redis:
@@ -18,16 +21,19 @@ def _create_redis_client() -> Redis:
     а при ошибке DNS/коннекта — падает обратно на localhost:6379.
     Так работает и в docker-compose (host=redis), и при запуске uvicorn с хоста.
     """
+    global _redis_url
     primary_url = settings.celery_broker_url
     try:
         client = Redis.from_url(primary_url, decode_responses=True)
         client.ping()
+        _redis_url = primary_url
         return client
     except (RedisConnectionError, socket.gaierror):
         pass
     fallback_url = "redis://localhost:6379/0"
     client = Redis.from_url(fallback_url, decode_responses=True)
     client.ping()
+    _redis_url = fallback_url
     return client
 
 
@@ -38,4 +44,16 @@ def get_redis() -> Redis:
     return _redis_client
 
 
-__all__ = ["get_redis"]
+def get_async_redis() -> AsyncRedis:
+    """
+    Асинхронный клиент для ожидания в event loop (pub/sub, long-poll).
+    Адрес берётся тот же, к которому подключился синхронный клиент.
+    """
+    global _async_redis_client
+    if _async_redis_client is None:
+        get_redis()
+        _async_redis_client = AsyncRedis.from_url(_redis_url, decode_responses=True)
+    return _async_redis_client
+
+
+__all__ = ["get_redis", "get_async_redis"]
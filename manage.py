@@ -23,6 +23,17 @@ def cmd_downgrade(revision: str) -> None:
     command.downgrade(cfg, revision)
 
 
+def cmd_build_ephemeris(path: str, start_year: int, end_year: int) -> None:
+    from app.core.esoterics.ephemeris import MoonEphemeris
+
+    ephemeris = MoonEphemeris.build(start_year, end_year)
+    ephemeris.write(path)
+    print(
+        f"Moon ephemeris {ephemeris.first_date}..{ephemeris.last_date} "
+        f"({ephemeris.days} days) written to {path}"
+    )
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(
         description="Simple Alembic migration runner"
@@ -51,6 +62,13 @@ def main() -> None:
         help="Populate revision with schema diff from models",
     )
 
+    ephemeris_parser = subparsers.add_parser(
+        "build-ephemeris", help="Generate moon ephemeris file for esoterics"
+    )
+    ephemeris_parser.add_argument("path", help="Output file (ESOTERICS_EPHEMERIS_PATH)")
+    ephemeris_parser.add_argument("--start-year", type=int, default=2000)
+    ephemeris_parser.add_argument("--end-year", type=int, default=2100)
+
     args = parser.parse_args()
 
     if args.command == "upgrade" or args.command is None:
@@ -64,6 +82,8 @@ def main() -> None:
             message=args.message,
             autogenerate=args.autogenerate,
         )
+    elif args.command == "build-ephemeris":
+        cmd_build_ephemeris(args.path, args.start_year, args.end_year)
     else:
         parser.print_help()
 
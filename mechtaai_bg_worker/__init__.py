@@ -1,6 +1,17 @@
 from __future__ import annotations
 
-from .celery_app import celery_app
+from typing import Any
 
-__all__ = ["celery_app"]
 
+def __getattr__(name: str) -> Any:
+    # celery_app импортируется лениво: `python -m mechtaai_bg_worker.main`
+    # сначала выполняет этот файл, а gevent должен пропатчить сокеты раньше,
+    # чем celery/redis/ssl попадут в sys.modules.
+    if name == "celery_app":
+        from .celery_app import celery_app
+
+        return celery_app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ["celery_app"]
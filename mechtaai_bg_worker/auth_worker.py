@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from typing import Any, Dict
+
+from loguru import logger
+
+from app.core.auth.session_store import flush_dirty_sessions
+from app.database.session import SessionLocal
+from mechtaai_bg_worker.celery_app import celery_app
+
+
+@celery_app.task(name="auth.flush_sessions")
+def flush_sessions() -> Dict[str, Any]:
+    """
+    Переносит сессии из Redis в `user_sessions` пачками до опустошения очереди.
+    """
+    db = SessionLocal()
+    flushed = 0
+    try:
+        while True:
+            items = flush_dirty_sessions(db)
+            if not items:
+                break
+            flushed += items
+    except Exception as exc:
+        logger.error("Failed to flush sessions", error=str(exc))
+        return {"ok": False, "flushed": flushed}
+    finally:
+        db.close()
+    return {"ok": True, "flushed": flushed}
+
+
+__all__ = ["flush_sessions"]
@@ -0,0 +1,169 @@
+"""
+Пропускная способность Celery-воркера на I/O-задачах при разных пулах.
+
+Поднимает локальный фейковый AI-прокси с задержкой `--latency`, затем для
+каждой конфигурации `пул:параллельность` запускает отдельный воркер
+(очередь `bench`), ставит `--tasks` задач, каждая из которых делает один
+вызов AI через `AIClient`, и печатает задач/сек.
+
+Нужен запущенный Redis (CELERY_BROKER_URL).
+
+Запуск: python -m mechtaai_bg_worker.benchmark [--pools solo:1 threads:20 prefork:4 gevent:50]
+        [--tasks 200] [--latency 0.5]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+from celery import Celery
+
+from mechtaai_bg_worker.celery_app import broker_url
+
+
+BENCH_QUEUE = "bench"
+
+bench_app = Celery("mechtaai_bench", broker=broker_url, backend=broker_url)
+bench_app.conf.update(
+    task_default_queue=BENCH_QUEUE,
+    worker_prefetch_multiplier=1,
+    result_expires=60 * 60,
+)
+
+
+@bench_app.task(name="bench.ai_call")
+def ai_call(index: int) -> int:
+    from app.utils.ai_client import get_ai_client
+
+    get_ai_client().chat_json(
+        "benchmark",
+        {"index": index},
+        mode="bench",
+        temperature=0.0,
+    )
+    return index
+
+
+def _start_fake_proxy(latency: float) -> Tuple[ThreadingHTTPServer, str]:
+    body = json.dumps({"content": json.dumps({"ok": True})}).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self) -> None:
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args: object) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1/chat"
+
+
+def _start_worker(pool: str, concurrency: int, proxy_url: str) -> Tuple[subprocess.Popen, str]:
+    hostname = f"bench-{pool}-{uuid.uuid4().hex[:6]}@{socket.gethostname()}"
+    env = {
+        **os.environ,
+        "AI_PROXY_URL": proxy_url,
+        "AI_CACHE_ENABLED": "false",
+        "AI_PROXY_MAX_CONNECTIONS": str(max(concurrency, 1)),
+    }
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "celery",
+            "-A",
+            "mechtaai_bg_worker.benchmark:bench_app",
+            "worker",
+            "-P",
+            pool,
+            f"--concurrency={concurrency}",
+            "-Q",
+            BENCH_QUEUE,
+            "-n",
+            hostname,
+            "--loglevel=warning",
+        ],
+        env=env,
+    )
+    return process, hostname
+
+
+def _wait_ready(hostname: str, timeout: float = 60.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if bench_app.control.ping(destination=[hostname], timeout=1.0):
+            return True
+    return False
+
+
+def _run(pool: str, concurrency: int, tasks: int, proxy_url: str) -> float:
+    process, hostname = _start_worker(pool, concurrency, proxy_url)
+    try:
+        if not _wait_ready(hostname):
+            raise RuntimeError(f"worker {hostname} did not start")
+        # Прогрев: соединения и импорты в каждом потоке/процессе.
+        for result in [ai_call.delay(-1) for _ in range(concurrency)]:
+            result.get(timeout=120)
+
+        started = time.perf_counter()
+        results = [ai_call.delay(i) for i in range(tasks)]
+        for result in results:
+            result.get(timeout=600)
+        return tasks / (time.perf_counter() - started)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--pools",
+        nargs="+",
+        default=["solo:1", "threads:8", "threads:20", "prefork:4"],
+        help="Конфигурации вида пул:параллельность.",
+    )
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.5,
+        help="Задержка ответа фейкового AI-прокси, сек.",
+    )
+    args = parser.parse_args()
+
+    server, proxy_url = _start_fake_proxy(args.latency)
+    print(f"fake proxy={proxy_url} latency={args.latency}s tasks={args.tasks}")
+    print(f"{'pool':>10} {'concurrency':>12} {'tasks/s':>10} {'ideal':>10}")
+    try:
+        for spec in args.pools:
+            pool, _, raw_concurrency = spec.partition(":")
+            concurrency = int(raw_concurrency or 1)
+            throughput = _run(pool, concurrency, args.tasks, proxy_url)
+            ideal = concurrency / args.latency
+            print(f"{pool:>10} {concurrency:>12} {throughput:>10.1f} {ideal:>10.1f}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,16 @@ from __future__ import annotations
 import socket
 
 from celery import Celery
+from celery.schedules import crontab
 from redis import Redis
 from redis.exceptions import ConnectionError as RedisConnectionError
 
 from mechtaai_bg_worker.config import settings
+from mechtaai_bg_worker.queues import (
+    PRIORITY_NORMAL,
+    QUEUE_MAINTENANCE,
+    TASK_ROUTES,
+)
 
 
 def _choose_broker_url() -> str:
@@ -37,6 +43,48 @@ celery_app = Celery(
     backend=broker_url,
 )
 
+celery_app.conf.update(
+    # STARTED нужен для статуса `running` в GET /api/v1/jobs/{job_id}.
+    task_track_started=True,
+    result_expires=24 * 60 * 60,
+    # Долгие AI-задачи не должны держать в префетче чужие задачи (письма и т.п.).
+    worker_prefetch_multiplier=settings.celery_prefetch_multiplier,
+    timezone="UTC",
+    # Очереди по классу нагрузки (email / ai_text / ai_image / maintenance),
+    # чтобы долгие AI-генерации не задерживали письма: см. queues.py.
+    task_routes=TASK_ROUTES,
+    task_default_queue=QUEUE_MAINTENANCE,
+    task_default_priority=PRIORITY_NORMAL,
+    # Приоритет сообщений внутри очереди задают только priority_steps.
+    # queue_order_strategy не трогаем: по умолчанию воркер обходит очереди
+    # по кругу, и maintenance не ждёт, пока разберут очередь ai_text.
+    broker_transport_options={
+        "priority_steps": list(range(10)),
+    },
+    beat_schedule={
+        # Ночное заполнение общего пула советов дня (GET /esoterics/today).
+        "esoterics-fill-tip-pool": {
+            "task": "esoterics.fill_tip_pool",
+            "schedule": crontab(minute=0, hour=settings.esoterics_tip_pool_hour_utc),
+        },
+        # Перенос счётчиков квот из Redis в user_usage.
+        "limits-flush-usage": {
+            "task": "limits.flush_usage",
+            "schedule": settings.quota_flush_interval_seconds,
+        },
+        # Запись сессий из Redis в user_sessions (SESSION_STORE_BACKEND=redis).
+        "auth-flush-sessions": {
+            "task": "auth.flush_sessions",
+            "schedule": settings.session_store_flush_interval_seconds,
+        },
+        # Пакетная очистка устаревших строк auth-таблиц.
+        "retention-purge": {
+            "task": "retention.purge",
+            "schedule": settings.retention_interval_seconds,
+        },
+    },
+)
+
 celery_app.autodiscover_tasks(
     packages=["mechtaai_bg_worker"],
 )
@@ -6,7 +6,7 @@ from email.message import EmailMessage
 from loguru import logger
 
 from app.core.config import settings
-from app.core.auth.models import EmailVerificationToken
+from app.core.retention.services import purge_table
 from app.database.session import SessionLocal
 from mechtaai_bg_worker.celery_app import celery_app
 
@@ -49,18 +49,10 @@ def send_verification_email(email: str, code: str, token: str) -> None:
 
 @celery_app.task(name="email.cleanup_verification_tokens")
 def cleanup_verification_tokens() -> None:
-    from app.core.auth.services import _utc_now
-
     logger.info("Running cleanup_verification_tokens task")
     db = SessionLocal()
     try:
-        now = _utc_now()
-        (
-            db.query(EmailVerificationToken)
-            .filter(EmailVerificationToken.expires_at <= now)
-            .delete(synchronize_session=False)
-        )
-        db.commit()
+        purge_table(db, "email_verification_tokens")
     except Exception as exc:
         logger.error("Failed to cleanup email verification tokens", exc_info=exc)
         db.rollback()
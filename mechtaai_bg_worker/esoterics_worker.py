@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from typing import Any, Dict
+
+import httpx
+from celery import group
+from loguru import logger
+
+from app.core.config import settings
+from app.core.esoterics.schemas import MoonPhaseEnum
+from app.core.esoterics.services import fill_tip_pool, iter_tip_pool_keys
+from app.utils.ai_guard import AIUnavailableError
+from mechtaai_bg_worker.celery_app import celery_app
+
+
+@celery_app.task(name="esoterics.fill_tip_pool")
+def fill_tip_pool_task(force: bool = False) -> Dict[str, Any]:
+    """
+    Ночное заполнение общего пула советов дня.
+
+    Раздаёт по подзадаче `esoterics.fill_tip_pool_key` на каждую из 648
+    комбинаций (фаза Луны, личный год, личный день) и не ждёт их: каждая
+    комбинация повторяется и ограничивается по времени сама по себе, поэтому
+    медленный или сбойный прокси задерживает только свои комбинации.
+    """
+    keys = list(iter_tip_pool_keys())
+    group(
+        fill_tip_pool_key_task.s(moon_phase.value, personal_year, personal_day, force)
+        for moon_phase, personal_year, personal_day in keys
+    ).apply_async()
+    logger.info("Esoterics tip pool refill dispatched", keys=len(keys))
+    return {"ok": True, "dispatched": len(keys)}
+
+
+@celery_app.task(
+    name="esoterics.fill_tip_pool_key",
+    autoretry_for=(httpx.HTTPError, AIUnavailableError),
+    retry_backoff=30,
+    retry_backoff_max=600,
+    retry_jitter=True,
+    max_retries=settings.esoterics_tip_pool_max_retries,
+    soft_time_limit=settings.esoterics_tip_pool_task_time_limit_seconds,
+    time_limit=settings.esoterics_tip_pool_task_time_limit_seconds + 30,
+)
+def fill_tip_pool_key_task(
+    moon_phase: str,
+    personal_year: int,
+    personal_day: int,
+    force: bool = False,
+) -> Dict[str, Any]:
+    """
+    Догенерирует варианты одной комбинации, если её пул пуст, неполон или
+    скоро истечёт. Ошибки прокси повторяются с экспоненциальной паузой.
+
+    `soft_time_limit`/`time_limit` Celery применяет только в пулах
+    prefork/gevent. В пуле по умолчанию (`threads`) задачу ограничивает
+    таймаут AI-клиента для режима `daily_tip` (`AI_PROXY_MODE_TIMEOUTS`):
+    не больше `ESOTERICS_TIP_POOL_VARIANTS` вызовов по нему на комбинацию.
+    """
+    generated = fill_tip_pool(
+        MoonPhaseEnum(moon_phase),
+        personal_year,
+        personal_day,
+        force=force,
+    )
+    if generated:
+        logger.info(
+            "Esoterics tip pool key filled",
+            moon_phase=moon_phase,
+            personal_year=personal_year,
+            personal_day=personal_day,
+            generated=generated,
+        )
+    return {"ok": True, "generated": generated}
+
+
+__all__ = ["fill_tip_pool_key_task", "fill_tip_pool_task"]
@@ -11,15 +11,18 @@ from sqlalchemy.orm import Session
 
 from app.core.areas.models import Area
 from app.core.auth.models import User
-from app.core.config import settings
 from app.core.future_story.schemas import FutureStoryAIResponse, FutureStoryPublic
 from app.core.future_story.services import (
     create_future_story,
+    get_draft_answers,
     get_latest_draft,
     mark_draft_completed,
 )
 from app.core.wants.services import get_latest_analysis
 from app.database.session import SessionLocal
+from app.utils.ai_client import get_ai_client
+from app.utils.ai_guard import AIUnavailableError
+from app.utils.prompts import get_prompt
 from mechtaai_bg_worker.celery_app import celery_app
 
 
@@ -34,9 +37,7 @@ def _calc_age(birth_date: date | None) -> int | None:
 
 
 def _load_system_prompt() -> str:
-    path = settings.future_story_system_prompt_path
-    with open(path, "r", encoding="utf-8") as handle:
-        return handle.read().strip()
+    return get_prompt("build_future_story").text
 
 
 def _fetch_active_areas(db: Session) -> Dict[str, str]:
@@ -76,37 +77,19 @@ def _group_answers(
     return list(grouped.values())
 
 
-def _call_ai_proxy(system_prompt: str, payload: Dict[str, Any]) -> str:
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
-    ]
-
-    request_body = {
-        "model": settings.ai_proxy_model,
-        "messages": messages,
-        "temperature": 0.3,
-        "response_format": {"type": "json_object"},
-    }
-
-    with httpx.Client(timeout=settings.ai_proxy_timeout_seconds) as client:
-        response = client.post(settings.ai_proxy_url, json=request_body)
-    response.raise_for_status()
-
-    data = response.json()
-    content = data.get("content")
-    if not isinstance(content, str) or not content.strip():
-        raise ValueError("AI proxy returned empty content")
-    return content
-
-
-def _error(code: str, message: str, http_code: int = 400) -> Dict[str, Any]:
+def _error(
+    code: str,
+    message: str,
+    http_code: int = 400,
+    details: Dict[str, Any] | None = None,
+) -> Dict[str, Any]:
     return {
         "ok": False,
         "error": {
             "code": code,
             "message": message,
             "http_code": http_code,
+            "details": details,
         },
     }
 
@@ -125,7 +108,8 @@ def generate_future_story_task(user_id: str) -> Dict[str, Any]:
             return _error("FUTURE_STORY_USER_NOT_FOUND", "User not found.", 404)
 
         draft = get_latest_draft(db, user_uuid)
-        if draft is None or not draft.answers:
+        answers = get_draft_answers(db, draft.id) if draft is not None else []
+        if not answers:
             return _error(
                 "FUTURE_STORY_DRAFT_NOT_FOUND",
                 "No draft answers found.",
@@ -133,7 +117,7 @@ def generate_future_story_task(user_id: str) -> Dict[str, Any]:
             )
 
         area_titles = _fetch_active_areas(db)
-        answers_by_area = _group_answers(draft.answers or [], area_titles)
+        answers_by_area = _group_answers(answers, area_titles)
         if not answers_by_area:
             return _error(
                 "FUTURE_STORY_EMPTY_ANSWERS",
@@ -171,7 +155,13 @@ def generate_future_story_task(user_id: str) -> Dict[str, Any]:
         }
 
         system_prompt = _load_system_prompt()
-        ai_content = _call_ai_proxy(system_prompt, payload)
+        ai_content = get_ai_client().chat_json(
+            system_prompt,
+            payload,
+            mode="build_future_story",
+            temperature=0.3,
+            cache=True,
+        )
 
         parsed = json.loads(ai_content)
         ai_response = FutureStoryAIResponse.model_validate(parsed).model_dump()
@@ -190,6 +180,8 @@ def generate_future_story_task(user_id: str) -> Dict[str, Any]:
         return {"ok": True, "story": story_public}
     except FileNotFoundError as exc:
         return _error("FUTURE_STORY_PROMPT_NOT_FOUND", str(exc), 500)
+    except AIUnavailableError as exc:
+        return _error(exc.code, exc.message, exc.http_code, exc.details)
     except httpx.HTTPError as exc:
         return _error("FUTURE_STORY_AI_PROXY_ERROR", str(exc), 502)
     except (json.JSONDecodeError, ValueError) as exc:
@@ -10,12 +10,14 @@ from sqlalchemy.orm import Session
 
 from app.core.areas.models import Area
 from app.core.auth.models import User
-from app.core.config import settings
 from app.core.future_story.services import get_latest_story
 from app.core.generate_goals.schemas import GoalsAIResponse
 from app.core.generate_goals.services import create_generation_log
 from app.core.wants.services import get_latest_analysis
 from app.database.session import SessionLocal
+from app.utils.ai_client import get_ai_client
+from app.utils.ai_guard import AIUnavailableError
+from app.utils.prompts import get_prompt
 from mechtaai_bg_worker.celery_app import celery_app
 
 
@@ -30,9 +32,7 @@ def _calc_age(birth_date: date | None) -> int | None:
 
 
 def _load_system_prompt() -> str:
-    path = settings.generate_goals_system_prompt_path
-    with open(path, "r", encoding="utf-8") as handle:
-        return handle.read().strip()
+    return get_prompt("generate_goals").text
 
 
 def _fetch_areas(db: Session) -> List[Dict[str, str]]:
@@ -40,37 +40,19 @@ def _fetch_areas(db: Session) -> List[Dict[str, str]]:
     return [{"id": row.id, "title": row.title} for row in rows]
 
 
-def _call_ai_proxy(system_prompt: str, payload: Dict[str, Any]) -> str:
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
-    ]
-
-    request_body = {
-        "model": settings.ai_proxy_model,
-        "messages": messages,
-        "temperature": 0.2,
-        "response_format": {"type": "json_object"},
-    }
-
-    with httpx.Client(timeout=settings.ai_proxy_timeout_seconds) as client:
-        response = client.post(settings.ai_proxy_url, json=request_body)
-    response.raise_for_status()
-
-    data = response.json()
-    content = data.get("content")
-    if not isinstance(content, str) or not content.strip():
-        raise ValueError("AI proxy returned empty content")
-    return content
-
-
-def _error(code: str, message: str, http_code: int = 400) -> Dict[str, Any]:
+def _error(
+    code: str,
+    message: str,
+    http_code: int = 400,
+    details: Dict[str, Any] | None = None,
+) -> Dict[str, Any]:
     return {
         "ok": False,
         "error": {
             "code": code,
             "message": message,
             "http_code": http_code,
+            "details": details,
         },
     }
 
@@ -136,7 +118,13 @@ def generate_goals_task(
         }
 
         system_prompt = _load_system_prompt()
-        ai_content = _call_ai_proxy(system_prompt, payload)
+        ai_content = get_ai_client().chat_json(
+            system_prompt,
+            payload,
+            mode="generate_goals",
+            temperature=0.2,
+            cache=True,
+        )
 
         parsed = json.loads(ai_content)
         ai_response = GoalsAIResponse.model_validate(parsed).model_dump()
@@ -162,6 +150,8 @@ def generate_goals_task(
         return {"ok": True, "payload": payload_out}
     except FileNotFoundError as exc:
         return _error("GOALS_PROMPT_NOT_FOUND", str(exc), 500)
+    except AIUnavailableError as exc:
+        return _error(exc.code, exc.message, exc.http_code, exc.details)
     except httpx.HTTPError as exc:
         return _error("GOALS_AI_PROXY_ERROR", str(exc), 502)
     except (json.JSONDecodeError, ValueError) as exc:
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from typing import Any
+
+from celery.signals import task_postrun
+
+from app.core.jobs.services import JOB_RESULT_KEYS, release_single_flight
+
+
+@task_postrun.connect
+def release_job_single_flight(
+    task_id: str | None = None,
+    task: Any = None,
+    **_: Any,
+) -> None:
+    """
+    AI-задача завершилась (успешно или нет) — следующий такой же запрос
+    пользователя снова запустит генерацию, а не присоединится к этой.
+    """
+    if task is None or task.name not in JOB_RESULT_KEYS or task_id is None:
+        return
+    release_single_flight(task_id)
+
+
+__all__ = ["release_job_single_flight"]
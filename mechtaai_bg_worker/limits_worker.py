@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from typing import Any, Dict
+
+from celery.signals import task_postrun
+from loguru import logger
+
+from app.core.jobs.services import JOB_RESULT_KEYS, refund_job_quota
+from app.core.limits.quota import flush_dirty_counters
+from app.database.session import SessionLocal
+from mechtaai_bg_worker.celery_app import celery_app
+
+
+@celery_app.task(name="limits.flush_usage")
+def flush_usage() -> Dict[str, Any]:
+    """
+    Переносит счётчики квот из Redis в `user_usage` пачками до опустошения очереди.
+    """
+    db = SessionLocal()
+    flushed = 0
+    try:
+        while True:
+            rows = flush_dirty_counters(db)
+            if not rows:
+                break
+            flushed += rows
+    except Exception as exc:
+        logger.error("Failed to flush quota counters", error=str(exc))
+        return {"ok": False, "flushed": flushed}
+    finally:
+        db.close()
+    return {"ok": True, "flushed": flushed}
+
+
+@task_postrun.connect
+def refund_failed_job_quota(
+    task_id: str | None = None,
+    task: Any = None,
+    retval: Any = None,
+    state: str | None = None,
+    **_: Any,
+) -> None:
+    """
+    Async-задача (POST ...?async=true) завершилась ошибкой — возвращаем квоту.
+
+    В синхронном режиме записи о задаче нет, квоту возвращает зависимость
+    `check_text_quota` в API.
+    """
+    if task is None or task.name not in JOB_RESULT_KEYS or task_id is None:
+        return
+    succeeded = state == "SUCCESS" and isinstance(retval, dict) and retval.get("ok")
+    if succeeded:
+        return
+    if refund_job_quota(task_id):
+        logger.info("Refunded quota for failed job", job_id=task_id, task=task.name)
+
+
+__all__ = ["flush_usage", "refund_failed_job_quota"]
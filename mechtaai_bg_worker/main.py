@@ -1,19 +1,52 @@
 from __future__ import annotations
 
+import importlib.util
+import os
 import sys
 
-from mechtaai_bg_worker.celery_app import celery_app
+# gevent должен пропатчить сокеты до первого импорта celery/redis/ssl.
+# `mechtaai_bg_worker/__init__.py` ничего не импортирует, поэтому это первый
+# код пакета. Пул читается прямо из окружения; CELERY_POOL=gevent только в
+# .env не сработает — resolve_pool увидит непропатченный процесс и выберет
+# потоки. Если celery уже импортирован (main подключён не как точка входа),
+# патчить поздно — тоже остаёмся на потоках.
+if (
+    os.environ.get("CELERY_POOL", "").strip().lower() == "gevent"
+    and importlib.util.find_spec("gevent") is not None
+    and "celery" not in sys.modules
+):
+    from gevent import monkey
+
+    monkey.patch_all()
+
+from loguru import logger  # noqa: E402
+
+from mechtaai_bg_worker.pool import resolve_worker_config  # noqa: E402
+
+WORKER_CONFIG = resolve_worker_config()
+
+from mechtaai_bg_worker.celery_app import celery_app  # noqa: E402
 from mechtaai_bg_worker import email_worker  # noqa: F401  импорт для регистрации задач
 from mechtaai_bg_worker import wants_worker  # noqa: F401  импорт для регистрации задач
 from mechtaai_bg_worker import future_story_worker  # noqa: F401  импорт для регистрации задач
 from mechtaai_bg_worker import generate_goals_worker  # noqa: F401  импорт для регистрации задач
 from mechtaai_bg_worker import plan_steps_worker  # noqa: F401  импорт для регистрации задач
 from mechtaai_bg_worker import rituals_worker  # noqa: F401  импорт для регистрации задач
+from mechtaai_bg_worker import esoterics_worker  # noqa: F401  импорт для регистрации задач
+from mechtaai_bg_worker import limits_worker  # noqa: F401  импорт для регистрации задач
+from mechtaai_bg_worker import jobs_worker  # noqa: F401  импорт для регистрации задач
+from mechtaai_bg_worker import auth_worker  # noqa: F401  импорт для регистрации задач
+from mechtaai_bg_worker import retention_worker  # noqa: F401  импорт для регистрации задач
+from app.utils.prompts import prompt_registry  # noqa: E402
 
 
 def main() -> None:
-    # На Windows Celery не поддерживает prefork нормально, поэтому используем solo-пул.
-    argv = ["worker", "--loglevel=info", "-P", "solo"]
+    # Пул и параллельность — из CELERY_POOL / CELERY_CONCURRENCY / CELERY_AUTOSCALE_*
+    # (см. mechtaai_bg_worker/pool.py).
+    argv = ["worker", "--loglevel=info", *WORKER_CONFIG.argv()]
+    # Промпты читаются с диска один раз; дочерние процессы prefork их наследуют.
+    prompt_registry.preload()
+    logger.info("Starting Celery worker", argv=argv)
     celery_app.worker_main(argv)
 
 
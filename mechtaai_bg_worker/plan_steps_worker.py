@@ -8,50 +8,32 @@ from uuid import UUID
 import httpx
 from sqlalchemy.orm import Session
 
-from app.core.config import settings
 from app.core.generate_goals.models import Goal
 from app.core.plan_steps.schemas import PlanStepsAIResponse
 from app.database.session import SessionLocal
+from app.utils.ai_client import get_ai_client
+from app.utils.ai_guard import AIUnavailableError
+from app.utils.prompts import get_prompt
 from mechtaai_bg_worker.celery_app import celery_app
 
 
 def _load_system_prompt() -> str:
-    path = settings.plan_steps_system_prompt_path
-    with open(path, "r", encoding="utf-8") as handle:
-        return handle.read().strip()
-
-
-def _call_ai_proxy(system_prompt: str, payload: Dict[str, Any]) -> str:
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
-    ]
-
-    request_body = {
-        "model": settings.ai_proxy_model,
-        "messages": messages,
-        "temperature": 0.2,
-        "response_format": {"type": "json_object"},
-    }
-
-    with httpx.Client(timeout=settings.ai_proxy_timeout_seconds) as client:
-        response = client.post(settings.ai_proxy_url, json=request_body)
-    response.raise_for_status()
-
-    data = response.json()
-    content = data.get("content")
-    if not isinstance(content, str) or not content.strip():
-        raise ValueError("AI proxy returned empty content")
-    return content
+    return get_prompt("plan_steps").text
 
 
-def _error(code: str, message: str, http_code: int = 400) -> Dict[str, Any]:
+def _error(
+    code: str,
+    message: str,
+    http_code: int = 400,
+    details: Dict[str, Any] | None = None,
+) -> Dict[str, Any]:
     return {
         "ok": False,
         "error": {
             "code": code,
             "message": message,
             "http_code": http_code,
+            "details": details,
         },
     }
 
@@ -116,13 +98,21 @@ def generate_steps_task(
         }
 
         system_prompt = _load_system_prompt()
-        ai_content = _call_ai_proxy(system_prompt, payload)
+        ai_content = get_ai_client().chat_json(
+            system_prompt,
+            payload,
+            mode="plan_steps",
+            temperature=0.2,
+            cache=True,
+        )
 
         parsed = json.loads(ai_content)
         ai_response = PlanStepsAIResponse.model_validate(parsed).model_dump()
         return {"ok": True, "payload": ai_response}
     except FileNotFoundError as exc:
         return _error("STEPS_PROMPT_NOT_FOUND", str(exc), 500)
+    except AIUnavailableError as exc:
+        return _error(exc.code, exc.message, exc.http_code, exc.details)
     except httpx.HTTPError as exc:
         return _error("STEPS_AI_PROXY_ERROR", str(exc), 502)
     except (json.JSONDecodeError, ValueError) as exc:
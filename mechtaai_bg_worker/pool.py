@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import importlib.util
+import os
+import sys
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+from mechtaai_bg_worker.config import settings
+from mechtaai_bg_worker.queues import queue_profiles, worker_queues
+
+
+POOL_CHOICES = ("auto", "prefork", "threads", "gevent", "solo")
+
+
+@dataclass(frozen=True)
+class WorkerPoolConfig:
+    pool: str
+    concurrency: int
+    queues: Tuple[str, ...] = ()
+    autoscale: Optional[Tuple[int, int]] = None
+    max_tasks_per_child: Optional[int] = None
+
+    def argv(self) -> List[str]:
+        args = ["-P", self.pool]
+        if self.queues:
+            args.extend(["-Q", ",".join(self.queues)])
+        if self.autoscale is not None:
+            low, high = self.autoscale
+            args.append(f"--autoscale={high},{low}")
+        else:
+            args.append(f"--concurrency={self.concurrency}")
+        if self.max_tasks_per_child:
+            args.append(f"--max-tasks-per-child={self.max_tasks_per_child}")
+        return args
+
+
+def resolve_pool(name: Optional[str] = None) -> str:
+    """
+    `auto` — потоки на любой платформе: задачи воркера почти всё время
+    ждут AI-прокси и SMTP, а prefork на Windows не работает.
+    `gevent` без установленного пакета или без monkey-patch при старте
+    (CELERY_POOL должен быть в окружении процесса, см. main.py) откатывается
+    на потоки.
+    """
+    pool = (name or settings.celery_pool or "auto").lower()
+    if pool not in POOL_CHOICES:
+        logger.warning("Unknown CELERY_POOL, using auto", pool=pool)
+        pool = "auto"
+    if pool == "auto":
+        return "threads"
+    if pool == "prefork" and sys.platform == "win32":
+        logger.warning("prefork pool is not supported on Windows, using threads")
+        return "threads"
+    if pool == "gevent" and importlib.util.find_spec("gevent") is None:
+        logger.warning("CELERY_POOL=gevent but gevent is not installed, using threads")
+        return "threads"
+    if pool == "gevent" and not _gevent_patched():
+        logger.warning(
+            "CELERY_POOL=gevent but sockets are not monkey-patched "
+            "(set CELERY_POOL in the process environment), using threads"
+        )
+        return "threads"
+    return pool
+
+
+def _gevent_patched() -> bool:
+    monkey = sys.modules.get("gevent.monkey")
+    return monkey is not None and monkey.is_module_patched("socket")
+
+
+def default_concurrency(pool: str, queues: Sequence[str] = ()) -> int:
+    if pool == "solo":
+        return 1
+    if pool == "prefork":
+        return os.cpu_count() or 1
+    # Для потоков/гринлетов — сумма профилей слушаемых очередей; для ai_text
+    # это размер пула соединений AI-клиента: больше потоков только ждали бы сокет.
+    profiles = queue_profiles()
+    total = sum(profiles[q].concurrency for q in queues if q in profiles)
+    return total or settings.ai_proxy_max_connections
+
+
+def resolve_worker_config() -> WorkerPoolConfig:
+    pool = resolve_pool()
+    queues = tuple(worker_queues())
+    concurrency = settings.celery_concurrency or default_concurrency(pool, queues)
+    if pool == "solo":
+        concurrency = 1
+
+    autoscale = None
+    if settings.celery_autoscale_max:
+        if pool == "prefork":
+            low = min(settings.celery_autoscale_min, settings.celery_autoscale_max)
+            autoscale = (low, settings.celery_autoscale_max)
+        else:
+            logger.warning("CELERY_AUTOSCALE_* is supported only by prefork pool", pool=pool)
+
+    max_tasks_per_child = None
+    if settings.celery_max_tasks_per_child and pool == "prefork":
+        max_tasks_per_child = settings.celery_max_tasks_per_child
+
+    return WorkerPoolConfig(
+        pool=pool,
+        concurrency=concurrency,
+        queues=queues,
+        autoscale=autoscale,
+        max_tasks_per_child=max_tasks_per_child,
+    )
+
+
+__all__ = [
+    "POOL_CHOICES",
+    "WorkerPoolConfig",
+    "default_concurrency",
+    "resolve_pool",
+    "resolve_worker_config",
+]
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+from mechtaai_bg_worker.config import settings
+
+
+QUEUE_EMAIL = "email"
+QUEUE_AI_TEXT = "ai_text"
+QUEUE_AI_IMAGE = "ai_image"
+QUEUE_MAINTENANCE = "maintenance"
+
+ALL_QUEUES = (QUEUE_EMAIL, QUEUE_AI_TEXT, QUEUE_AI_IMAGE, QUEUE_MAINTENANCE)
+
+# Приоритеты внутри очереди. В Redis-транспорте Celery 0 — самый высокий.
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 9
+
+# Маршруты по имени задачи: send_task/delay сами попадают в нужную очередь.
+TASK_ROUTES: Dict[str, Dict[str, Any]] = {
+    "email.send_verification_email": {"queue": QUEUE_EMAIL, "priority": PRIORITY_HIGH},
+    "email.*": {"queue": QUEUE_EMAIL},
+    "wants.*": {"queue": QUEUE_AI_TEXT},
+    "future_story.*": {"queue": QUEUE_AI_TEXT},
+    "goals.*": {"queue": QUEUE_AI_TEXT},
+    "steps.*": {"queue": QUEUE_AI_TEXT},
+    "rituals.*": {"queue": QUEUE_AI_TEXT},
+    "visuals.*": {"queue": QUEUE_AI_IMAGE},
+    "esoterics.fill_tip_pool_key": {"queue": QUEUE_AI_TEXT, "priority": PRIORITY_LOW},
+    "esoterics.*": {"queue": QUEUE_MAINTENANCE, "priority": PRIORITY_LOW},
+    "limits.*": {"queue": QUEUE_MAINTENANCE},
+    "auth.*": {"queue": QUEUE_MAINTENANCE},
+    "retention.*": {"queue": QUEUE_MAINTENANCE, "priority": PRIORITY_LOW},
+}
+
+
+@dataclass(frozen=True)
+class QueueProfile:
+    """
+    Параллельность по умолчанию для воркера, который слушает очередь
+    (если CELERY_CONCURRENCY не задан и пул не prefork).
+    """
+
+    concurrency: int
+
+
+def queue_profiles() -> Dict[str, QueueProfile]:
+    return {
+        QUEUE_EMAIL: QueueProfile(concurrency=4),
+        QUEUE_AI_TEXT: QueueProfile(concurrency=settings.ai_proxy_max_connections),
+        QUEUE_AI_IMAGE: QueueProfile(concurrency=4),
+        QUEUE_MAINTENANCE: QueueProfile(concurrency=2),
+    }
+
+
+def worker_queues() -> List[str]:
+    """
+    Очереди, которые слушает этот воркер: CELERY_QUEUES="email,maintenance",
+    по умолчанию — все.
+    """
+    raw = settings.celery_queues or ""
+    queues = [q.strip() for q in raw.split(",") if q.strip()]
+    return queues or list(ALL_QUEUES)
+
+
+__all__ = [
+    "ALL_QUEUES",
+    "PRIORITY_HIGH",
+    "PRIORITY_LOW",
+    "PRIORITY_NORMAL",
+    "QUEUE_AI_IMAGE",
+    "QUEUE_AI_TEXT",
+    "QUEUE_EMAIL",
+    "QUEUE_MAINTENANCE",
+    "QueueProfile",
+    "TASK_ROUTES",
+    "queue_profiles",
+    "worker_queues",
+]
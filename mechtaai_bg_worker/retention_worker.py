@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from dataclasses import asdict
+from typing import Any, Dict
+
+from app.core.retention.services import purge_all
+from app.database.session import SessionLocal
+from mechtaai_bg_worker.celery_app import celery_app
+
+
+@celery_app.task(name="retention.purge")
+def purge_expired_rows() -> Dict[str, Any]:
+    """
+    Удаляет устаревшие строки из login_attempts, email_verification_tokens,
+    password_reset_tokens и user_sessions пачками; метрики по таблицам
+    пишутся в Redis (`retention:metrics:{table}`) и в лог.
+    """
+    db = SessionLocal()
+    try:
+        results = purge_all(db)
+    finally:
+        db.close()
+    return {"ok": True, "tables": [asdict(result) for result in results]}
+
+
+__all__ = ["purge_expired_rows"]
@@ -1,62 +1,87 @@
 from __future__ import annotations
 
 import json
+from datetime import date
 from typing import Any, Dict
+from uuid import UUID
 
 import httpx
 
-from app.core.config import settings
-from app.core.rituals.schemas import WeeklyReviewAIResponse
+from app.core.gamification.services import (
+    ActionType,
+    award_action,
+    build_gamification_event,
+)
+from app.core.rituals.schemas import WeeklyReviewAIResponse, WeeklyReviewPublic
+from app.core.rituals.services import create_weekly_review
+from app.database.session import SessionLocal
+from app.utils.ai_client import get_ai_client
+from app.utils.ai_guard import AIUnavailableError
+from app.utils.prompts import get_prompt
 from mechtaai_bg_worker.celery_app import celery_app
 
 
 def _load_system_prompt() -> str:
-    path = settings.weekly_review_system_prompt_path
-    with open(path, "r", encoding="utf-8") as handle:
-        return handle.read().strip()
+    return get_prompt("weekly_review").text
 
 
-def _call_ai_proxy(system_prompt: str, payload: Dict[str, Any]) -> str:
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
-    ]
-
-    request_body = {
-        "model": settings.ai_proxy_model,
-        "messages": messages,
-        "temperature": 0.2,
-        "response_format": {"type": "json_object"},
-    }
-
-    with httpx.Client(timeout=settings.ai_proxy_timeout_seconds) as client:
-        response = client.post(settings.ai_proxy_url, json=request_body)
-    response.raise_for_status()
-
-    data = response.json()
-    content = data.get("content")
-    if not isinstance(content, str) or not content.strip():
-        raise ValueError("AI proxy returned empty content")
-    return content
-
-
-def _error(code: str, message: str, http_code: int = 400) -> Dict[str, Any]:
+def _error(
+    code: str,
+    message: str,
+    http_code: int = 400,
+    details: Dict[str, Any] | None = None,
+) -> Dict[str, Any]:
     return {
         "ok": False,
         "error": {
             "code": code,
             "message": message,
             "http_code": http_code,
+            "details": details,
         },
     }
 
 
+def _save_weekly_review(
+    user_uuid: UUID,
+    payload_in: Dict[str, Any],
+    ai_response: Dict[str, Any],
+) -> Dict[str, Any]:
+    db = SessionLocal()
+    try:
+        review = create_weekly_review(
+            db=db,
+            user_id=user_uuid,
+            week_start=date.fromisoformat(payload_in["week_start"]),
+            week_end=date.fromisoformat(payload_in["week_end"]),
+            completed_steps=payload_in.get("completed_step_ids") or [],
+            failed_steps=payload_in.get("failed_step_ids") or [],
+            user_reflection=payload_in.get("user_reflection"),
+            ai_analysis=ai_response,
+        )
+        award_result = award_action(db, user_uuid, ActionType.WEEKLY_REVIEW_COMPLETE)
+        review_public = WeeklyReviewPublic.model_validate(review).model_dump(mode="json")
+        review_public["ai_analysis"] = ai_response
+        review_public["gamification_event"] = build_gamification_event(
+            ActionType.WEEKLY_REVIEW_COMPLETE,
+            award_result,
+        )
+        return review_public
+    finally:
+        db.close()
+
+
 @celery_app.task(name="rituals.weekly_review")
 def weekly_review_task(
     user_id: str,
     payload_in: Dict[str, Any],
 ) -> Dict[str, Any]:
     try:
+        try:
+            user_uuid = UUID(user_id)
+        except ValueError:
+            return _error("RITUALS_INVALID_USER_ID", "Invalid user_id.", 400)
+
         payload = {
             "mode": "weekly_review",
             "user_profile": {"name": payload_in.get("user_name") or "User"},
@@ -70,12 +95,24 @@ def weekly_review_task(
         }
 
         system_prompt = _load_system_prompt()
-        ai_content = _call_ai_proxy(system_prompt, payload)
+        ai_content = get_ai_client().chat_json(
+            system_prompt,
+            payload,
+            mode="weekly_review",
+            temperature=0.2,
+            cache=True,
+        )
         parsed = json.loads(ai_content)
         ai_response = WeeklyReviewAIResponse.model_validate(parsed).model_dump()
-        return {"ok": True, "analysis": ai_response}
+
+        review = None
+        if payload_in.get("week_start") and payload_in.get("week_end"):
+            review = _save_weekly_review(user_uuid, payload_in, ai_response)
+        return {"ok": True, "analysis": ai_response, "review": review}
     except FileNotFoundError as exc:
         return _error("RITUALS_PROMPT_NOT_FOUND", str(exc), 500)
+    except AIUnavailableError as exc:
+        return _error(exc.code, exc.message, exc.http_code, exc.details)
     except httpx.HTTPError as exc:
         return _error("RITUALS_AI_PROXY_ERROR", str(exc), 502)
     except (json.JSONDecodeError, ValueError) as exc:
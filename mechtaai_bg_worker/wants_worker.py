@@ -11,10 +11,12 @@ from sqlalchemy.orm import Session
 
 from app.core.auth.models import User
 from app.core.areas.models import Area
-from app.core.config import settings
 from app.core.wants.schemas import WantsAnalysisPayload, WantsAnalysisPublic
 from app.core.wants.services import create_wants_analysis, get_latest_completed
 from app.database.session import SessionLocal
+from app.utils.ai_client import get_ai_client
+from app.utils.ai_guard import AIUnavailableError
+from app.utils.prompts import get_prompt
 from mechtaai_bg_worker.celery_app import celery_app
 
 
@@ -29,9 +31,7 @@ def _calc_age(birth_date: date | None) -> int | None:
 
 
 def _load_system_prompt() -> str:
-    path = settings.wants_ai_system_prompt_path
-    with open(path, "r", encoding="utf-8") as handle:
-        return handle.read().strip()
+    return get_prompt("diagnose_wants").text
 
 
 def _fetch_active_areas(db: Session) -> list[dict[str, Any]]:
@@ -68,37 +68,19 @@ def _build_payload(user: User, wants_raw) -> Dict[str, Any]:
     }
 
 
-def _call_ai_proxy(system_prompt: str, payload: Dict[str, Any]) -> str:
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
-    ]
-
-    request_body = {
-        "model": settings.ai_proxy_model,
-        "messages": messages,
-        "temperature": 0.2,
-        "response_format": {"type": "json_object"},
-    }
-
-    with httpx.Client(timeout=settings.ai_proxy_timeout_seconds) as client:
-        response = client.post(settings.ai_proxy_url, json=request_body)
-    response.raise_for_status()
-
-    data = response.json()
-    content = data.get("content")
-    if not isinstance(content, str) or not content.strip():
-        raise ValueError("AI proxy returned empty content")
-    return content
-
-
-def _error(code: str, message: str, http_code: int = 400) -> Dict[str, Any]:
+def _error(
+    code: str,
+    message: str,
+    http_code: int = 400,
+    details: Dict[str, Any] | None = None,
+) -> Dict[str, Any]:
     return {
         "ok": False,
         "error": {
             "code": code,
             "message": message,
             "http_code": http_code,
+            "details": details,
         },
     }
 
@@ -147,7 +129,13 @@ def analyze_wants_task(user_id: str) -> Dict[str, Any]:
         payload["payload"]["areas"] = areas
 
         system_prompt = _load_system_prompt()
-        ai_content = _call_ai_proxy(system_prompt, payload)
+        ai_content = get_ai_client().chat_json(
+            system_prompt,
+            payload,
+            mode="diagnose_wants",
+            temperature=0.2,
+            cache=True,
+        )
 
         parsed = json.loads(ai_content)
         analysis_payload = WantsAnalysisPayload.model_validate(parsed).model_dump()
@@ -162,6 +150,8 @@ def analyze_wants_task(user_id: str) -> Dict[str, Any]:
         }
     except FileNotFoundError as exc:
         return _error("WANTS_AI_PROMPT_NOT_FOUND", str(exc), 500)
+    except AIUnavailableError as exc:
+        return _error(exc.code, exc.message, exc.http_code, exc.details)
     except httpx.HTTPError as exc:
         return _error("WANTS_AI_PROXY_ERROR", str(exc), 502)
     except (json.JSONDecodeError, ValueError) as exc:
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+sqlalchemy = pytest.importorskip("sqlalchemy")
+pytest.importorskip("pydantic_settings")
+pytest.importorskip("redis")
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import Column, DateTime, Uuid, create_engine  # noqa: E402
+from sqlalchemy.orm import Session, declarative_base  # noqa: E402
+
+from app.utils.pagination import keyset_page  # noqa: E402
+
+
+Base = declarative_base()
+
+
+class Item(Base):
+    __tablename__ = "items"
+
+    id = Column(Uuid, primary_key=True)
+    created_at = Column(DateTime, nullable=False)
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    start = datetime(2024, 1, 1)
+    with Session(engine) as session:
+        session.add_all(
+            Item(id=uuid.uuid4(), created_at=start + timedelta(minutes=i))
+            for i in range(5)
+        )
+        session.commit()
+        yield session
+
+
+def test_page_two_without_cursor_uses_offset(db):
+    first = keyset_page(db.query(Item), Item.created_at, Item.id, limit=2)
+    second = keyset_page(
+        db.query(Item), Item.created_at, Item.id, limit=2, offset=2
+    )
+
+    assert [item.created_at.minute for item in first.items] == [4, 3]
+    assert [item.created_at.minute for item in second.items] == [2, 1]
+    assert second.next_cursor is not None
+
+
+def test_cursor_continues_after_last_item(db):
+    first = keyset_page(db.query(Item), Item.created_at, Item.id, limit=2)
+    second = keyset_page(
+        db.query(Item),
+        Item.created_at,
+        Item.id,
+        limit=2,
+        cursor=first.next_cursor,
+    )
+
+    assert [item.created_at.minute for item in second.items] == [2, 1]